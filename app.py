@@ -1,6 +1,6 @@
 import os
 import logging
-from tempfile import mkdtemp
+from tempfile import mkdtemp, SpooledTemporaryFile
 from dotenv import load_dotenv
 from collections import defaultdict
 
@@ -35,35 +35,40 @@ def verify_env_vars():
 env_check_passed = verify_env_vars()
 
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for
-from werkzeug.utils import secure_filename
+from flask import Flask, Request, render_template, request, jsonify, session, flash, redirect, url_for, Response, stream_with_context, send_file
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_bcrypt import Bcrypt
-import uuid
+import click
 import stripe
 import json
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import io
 import base64
 from datetime import datetime
-from models import db, User, CVUpload, AnalysisResult
+from models import db, User, CVUpload, AnalysisResult, ensure_schema
 from forms import LoginForm, RegistrationForm, UserProfileForm, ChangePasswordForm
-from utils.pdf_extraction import extract_text_from_pdf
+from utils.pdf_extraction import extract_text_from_pdf, PDFRejected, PDFExtractionFailed
+from utils.sandbox_pool import SandboxBusy
+from utils.cv_templates import warm_up as warm_up_templates
+from utils.pdf_render_cache import pdf_render_cache
+from utils.pdf_render_service import pdf_render_service, RenderOverloaded, RenderTimeout
+from utils.cv_preview import cv_preview_renderer, validate_preview_data
+from utils.cv_upload_store import cv_upload_store, hash_upload_stream, hash_pasted_text, OPTIMIZED_CV_TYPES
+from utils.cv_structure import (parse_cv_document, render_for_prompt, truncate_document, truncate_at_line,
+                                compare_documents)
 from utils.openrouter_api import (
     optimize_cv, generate_recruiter_feedback, generate_cover_letter,
-    analyze_job_url, ats_optimization_check, generate_interview_questions,
+    ats_optimization_check, generate_interview_questions,
     analyze_cv_strengths, analyze_cv_score, analyze_keywords_match,
     check_grammar_and_style, optimize_for_position, generate_interview_tips)
-from utils.rate_limiter import rate_limit
+from utils.rate_limiter import rate_limit, rate_limiter
+from utils.server_session import DatabaseSessionInterface, CompactCookieSessionInterface, SESSION_BACKEND
 from utils.encryption import encryption
 from utils.security_middleware import security_middleware
 from utils.notifications import notification_system
 from utils.analytics import analytics
 from utils.cv_validator import cv_validator
+from utils.job_store import job_store
+from utils.cv_content_catalog import cv_content_catalog, CV_CATALOG_REFRESH_LIMIT
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -120,6 +125,9 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 
 # Initialize extensions
 db.init_app(app)
+if SESSION_BACKEND == 'database':
+    # Dane sesji w bazie, w cookie tylko podpisany identyfikator (utils/server_session.py)
+    app.session_interface = DatabaseSessionInterface(db)
 bcrypt = Bcrypt(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -170,6 +178,19 @@ app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 *
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 logger.info(f"📁 Upload folder: {UPLOAD_FOLDER}")
 
+# Przesłane pliki do tego rozmiaru zostają w pamięci, większe są buforowane w UPLOAD_FOLDER
+UPLOAD_SPOOL_MAX_MEMORY = int(os.environ.get('UPLOAD_SPOOL_MAX_MEMORY', 4 * 1024 * 1024))
+
+
+class UploadRequest(Request):
+    """Request, który trzyma przesyłane pliki w pamięci aż do UPLOAD_SPOOL_MAX_MEMORY"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY, mode='rb+', dir=UPLOAD_FOLDER)
+
+
+app.request_class = UploadRequest
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit(
@@ -192,10 +213,21 @@ def add_watermark_to_cv(cv_text):
     return watermarked_cv
 
 
-def optimize_session_data():
+def session_is_server_side():
+    """Czy dane sesji są po stronie serwera (bez limitu rozmiaru cookie)"""
+    return getattr(session, 'server_side', False)
+
+
+def optimize_session_data(current_session=None):
     """
     Optymalizuj dane w sesji, aby zmieścić się w limicie 4000 bajtów
+    (tylko sesja w cookie - sesja po stronie serwera przechowuje pełne teksty).
+    current_session: sesja do optymalizacji, domyślnie sesja bieżącego żądania
     """
+    current_session = session if current_session is None else current_session
+    if getattr(current_session, 'server_side', False):
+        return
+
     # Lista kluczy do skrócenia/usunięcia
     keys_to_optimize = [
         'cv_text', 'original_cv_text', 'last_optimized_cv', 'cv_data',
@@ -203,12 +235,12 @@ def optimize_session_data():
     ]
 
     for key in keys_to_optimize:
-        if key in session:
-            value = session[key]
+        if key in current_session:
+            value = current_session[key]
 
-            # Jeśli to tekst, skróć do maksymalnie 1000 znaków
+            # Jeśli to tekst, skróć do maksymalnie 1000 znaków (na końcu linii)
             if isinstance(value, str) and len(value) > 1000:
-                session[key] = value[:1000] + "...[skrócono]"
+                current_session[key] = truncate_at_line(value, 1000)
 
             # Jeśli to słownik, zachowaj tylko kluczowe informacje
             elif isinstance(value, dict):
@@ -220,20 +252,83 @@ def optimize_session_data():
                         'email': value.get('email', ''),
                         'jobTitle': value.get('jobTitle', '')
                     }
-                    session[key] = optimized
+                    current_session[key] = optimized
 
     # Usuń stare, nieużywane klucze
     old_keys = [
         'large_cv_analysis', 'full_job_description', 'detailed_analysis'
     ]
     for old_key in old_keys:
-        session.pop(old_key, None)
+        current_session.pop(old_key, None)
+
+
+def get_request_cv_upload(cv_upload_id=None):
+    """
+    Przesłane CV zalogowanego użytkownika (utils.cv_upload_store.get_upload - pełny tekst
+    i struktura z pamięci procesu) wskazane w żądaniu albo w sesji (cv_upload_id) lub None
+    """
+    cv_upload_id = cv_upload_id or session.get('cv_upload_id')
+    if not cv_upload_id or not current_user.is_authenticated:
+        return None
+    return cv_upload_store.get_upload(cv_upload_id, current_user.id)
+
+
+def resolve_cv_document(cv_text, cv_upload_id=None):
+    """
+    Struktura CV dla promptów: zapisana przy przesłaniu, jeśli użytkownik nie zmienił
+    tekstu (albo przysłał tylko cv_upload_id lub skróconą wersję z sesji), inaczej liczona
+    z przesłanego tekstu. None, gdy nie ma ani przesłanego CV, ani tekstu.
+    """
+    cv_upload = get_request_cv_upload(cv_upload_id)
+    if cv_upload is not None:
+        document = cv_upload['document']
+        if not cv_text or cv_text.strip() in (document['text'], session.get('cv_text')):
+            return document
+    cv_text = cv_text or session.get('cv_text')
+    return parse_cv_document(cv_text) if cv_text else None
 
 
-def clean_session_before_new_data():
+# Wygenerowane PDF są pobierane osobnym żądaniem (plik z cache) zamiast base64 w JSON
+PDF_DOWNLOAD_TOKEN_TTL = int(os.environ.get('PDF_DOWNLOAD_TOKEN_TTL', '900'))
+pdf_download_signer = URLSafeTimedSerializer(app.secret_key, salt='cv-pdf-download')
+
+
+def pdf_download_payload(cv_data, template, render, filename):
+    """
+    Pola odpowiedzi JSON z wygenerowanym PDF: krótkotrwały download_url do pliku w cache.
+    Gdy PDF nie trafił do cache (wyłączony, błąd zapisu), zwraca pdf_data w base64 jak dawniej.
+    """
+    key, pdf_bytes = pdf_render_cache.ensure_rendered(cv_data, template, render)
+    if pdf_bytes is not None:
+        return {'pdf_data': base64.b64encode(pdf_bytes).decode(), 'filename': filename}
+
+    token = pdf_download_signer.dumps({'k': key, 'u': current_user.id, 'f': filename})
+    return {
+        'download_url': url_for('download_cv_pdf', token=token),
+        'filename': filename,
+        'expires_in': PDF_DOWNLOAD_TOKEN_TTL
+    }
+
+
+def pdf_overloaded_response(error, message='Serwer generuje teraz wiele dokumentów. Spróbuj ponownie za chwilę.'):
+    """503 z Retry-After, gdy kolejka renderowania lub piaskownica ekstrakcji PDF jest pełna"""
+    logger.warning(f"PDF job rejected: {error}")
+    response = jsonify({
+        'success': False,
+        'message': message,
+        'retry_after': error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def clean_session_before_new_data(current_session=None):
     """
     Wyczyść sesję przed dodaniem nowych danych - zachowaj Flask-Login
+    (current_session domyślnie sesja bieżącego żądania)
     """
+    current_session = session if current_session is None else current_session
     # Zachowaj kluczowe informacje Flask-Login i aplikacji
     keys_to_keep = [
         '_user_id', '_fresh', 'csrf_token', 'payment_verified', 'cv_upload_id',
@@ -249,9 +344,9 @@ def clean_session_before_new_data():
     ]
 
     # Iterate through the session keys and remove those not in keys_to_keep AND are in keys_to_remove
-    for key in list(session.keys()):  # Iterate over a copy of the keys
+    for key in list(current_session.keys()):  # Iterate over a copy of the keys
         if key not in keys_to_keep and key in keys_to_remove:
-            session.pop(key)
+            current_session.pop(key)
 
 
 def parse_ai_json_response(ai_result):
@@ -293,30 +388,10 @@ def parse_ai_json_response(ai_result):
         return ai_result
 
 
-@app.before_request
-def monitor_session_size():
-    """
-    Monitoruj rozmiar sesji przed każdym requestem
-    """
-    try:
-        import pickle
-        session_size = len(pickle.dumps(dict(session)))
-
-        # Jeśli sesja zbliża się do limitu, optymalizuj
-        if session_size > 9500:  # 9.5KB - ostrzeżenie
-            logger.warning(
-                f"Sesja zbliża się do limitu: {session_size} bajtów")
-            optimize_session_data()
-
-        # Jeśli nadal za duża, wyczyść
-        if session_size > 10000:  # 10KB - wymuszenie czyszczenia
-            logger.error(
-                f"Sesja przekracza limit: {session_size} bajtów - wymuszam czyszczenie"
-            )
-            clean_session_before_new_data()
-
-    except Exception as e:
-        logger.error(f"Błąd podczas monitorowania sesji: {e}")
+if SESSION_BACKEND == 'cookie':
+    # Rozmiar cookie sprawdzany przy zapisie zmienionej sesji; przycinanie tylko po przekroczeniu limitu
+    app.session_interface = CompactCookieSessionInterface(
+        trim_steps=(optimize_session_data, clean_session_before_new_data))
 
 
 @app.route('/')
@@ -662,6 +737,33 @@ def debug_session():
     return f"<pre>{json.dumps(debug_info, indent=2, default=str)}</pre>"
 
 
+@app.route('/debug-stats')
+@login_required
+def debug_stats():
+    """Statystyki wydajności bieżącego procesu: ekstrakcja PDF, piaskownica, cache PDF i analiz ofert"""
+    if current_user.username != 'developer':
+        return "Access denied", 403
+
+    from utils.pdf_extraction import pdf_engine, pdf_sandbox
+    from utils.job_pipeline import job_pipeline
+    from utils.openrouter_api import job_stage_cache
+
+    return jsonify({
+        'pid': os.getpid(),
+        'cv_uploads': cv_upload_store.stats(),
+        'pdf_extraction': pdf_engine.stats.snapshot(),
+        'pdf_sandbox': pdf_sandbox.stats() if pdf_sandbox else None,
+        'pdf_render_cache': pdf_render_cache.stats(),
+        'pdf_render': pdf_render_service.stats(),
+        'cv_preview': cv_preview_renderer.stats(),
+        'cv_content_catalog': cv_content_catalog.stats(),
+        'session': app.session_interface.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'job_pipeline': job_pipeline.stats(),
+        'job_stage_cache': job_stage_cache.stats()
+    })
+
+
 @app.route('/privacy')
 def privacy():
     """Privacy policy page"""
@@ -807,21 +909,35 @@ def payment_success():
 
 @app.route('/compare-cv-versions')
 def compare_cv_versions():
-    original_cv = session.get('original_cv_text', 'Brak oryginalnego CV')
-    optimized_cv = session.get('last_optimized_cv',
-                               'Brak zoptymalizowanego CV')
+    """
+    Oryginał i zoptymalizowane CV. Pełne teksty z bazy (przez pamięć procesu) według
+    cv_upload_id i result_id z parametrów albo z sesji; skrócone kopie z sesji tylko awaryjnie.
+    """
+    cv_upload = get_request_cv_upload(request.args.get('cv_upload_id'))
+    result_id = request.args.get('result_id') or session.get('last_result_id')
+    saved_result = cv_upload_store.get_result(result_id, current_user.id) \
+        if result_id and current_user.is_authenticated else None
+
+    original_cv = cv_upload['text'] if cv_upload is not None else session.get('original_cv_text')
+    optimized_cv = saved_result['text'] if saved_result and saved_result['text'] else session.get('last_optimized_cv')
+
+    # Porównanie sekcja po sekcji względem struktury zapisanej przy przesłaniu CV
+    section_changes = None
+    if cv_upload is not None and isinstance(optimized_cv, str):
+        section_changes = compare_documents(cv_upload['document'],
+                                            parse_cv_document(optimized_cv))
 
     return jsonify({
         'success':
         True,
         'original':
-        original_cv,
+        original_cv or 'Brak oryginalnego CV',
         'optimized':
-        optimized_cv,
+        optimized_cv or 'Brak zoptymalizowanego CV',
+        'section_changes':
+        section_changes,
         'has_both_versions':
-        bool(
-            session.get('original_cv_text')
-            and session.get('last_optimized_cv'))
+        bool(original_cv and optimized_cv)
     })
 
 
@@ -849,28 +965,32 @@ def upload_cv():
 
         if file and file.filename and file.filename != '' and allowed_file(
                 file.filename):
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-
-            # Save the file
-            file.save(file_path)
-
-            try:
-                # Extract text from PDF
-                cv_text = extract_text_from_pdf(file_path)
-                # Remove the file after extraction
-                os.remove(file_path)
-            except Exception as e:
-                logger.error(f"Error processing PDF: {str(e)}")
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                return jsonify({
-                    'success':
-                    False,
-                    'message':
-                    f"Błąd podczas przetwarzania PDF: {str(e)}"
-                }), 500
+            # Ten sam plik przesłany ponownie nie jest parsowany drugi raz
+            content_digest = hash_upload_stream(file.stream)
+            cv_text = cv_upload_store.cached_text(content_digest)
+            if cv_text is None:
+                try:
+                    # Ekstrakcja bezpośrednio ze strumienia przesłanego pliku (bez zapisu na dysk)
+                    cv_text = extract_text_from_pdf(file.stream, max_chars=cv_validator.max_length)
+                except (PDFRejected, PDFExtractionFailed) as e:
+                    logger.warning(f"PDF rejected: {str(e)}")
+                    return jsonify({
+                        'success': False,
+                        'message': str(e)
+                    }), 400
+                except SandboxBusy as e:
+                    return pdf_overloaded_response(
+                        e, 'Serwer przetwarza teraz wiele plików. Spróbuj ponownie za chwilę.')
+                except Exception as e:
+                    logger.error(f"Error processing PDF: {str(e)}")
+                    return jsonify({
+                        'success':
+                        False,
+                        'message':
+                        f"Błąd podczas przetwarzania PDF: {str(e)}"
+                    }), 500
+                # Zapamiętywany jest tylko poprawnie wyodrębniony tekst - błędy są wyjątkami
+                cv_upload_store.remember_text(content_digest, cv_text)
 
         elif file and file.filename != '':
             return jsonify({
@@ -880,6 +1000,9 @@ def upload_cv():
                 'Nieprawidłowy format pliku. Obsługiwane formaty: PDF'
             }), 400
 
+        else:
+            content_digest = hash_pasted_text(cv_text)
+
         if not cv_text.strip():
             return jsonify({
                 'success':
@@ -888,15 +1011,23 @@ def upload_cv():
                 'CV jest puste lub nie udało się wyodrębnić tekstu'
             }), 400
 
-        # Validate CV quality
-        validation_results = cv_validator.validate_cv(cv_text)
+        # Struktura CV (sekcje, oczyszczony tekst) liczona raz przy przesłaniu i zapisywana w bazie.
+        # Ponowne przesłanie tego samego CV używa zapisanej struktury i walidacji.
+        previous_upload = cv_upload_store.previous_upload(current_user.id, content_digest)
+        if previous_upload is not None:
+            # Starsze wpisy bez aktualnej struktury - liczona teraz, zapisze ją cv_upload_store.save
+            cv_document = previous_upload.get_structure() or parse_cv_document(cv_text)
+            validation_results = previous_upload.get_validation()
+        else:
+            cv_document = parse_cv_document(cv_text)
+            validation_results = cv_validator.validate_cv(cv_text, cv_document)
 
-        if not validation_results['is_valid']:
-            return jsonify({
-                'success': False,
-                'message': 'CV nie spełnia wymagań jakości',
-                'validation_errors': validation_results['errors']
-            }), 400
+            if not validation_results['is_valid']:
+                return jsonify({
+                    'success': False,
+                    'message': 'CV nie spełnia wymagań jakości',
+                    'validation_errors': validation_results['errors']
+                }), 400
 
         # Add validation warnings to notifications
         if validation_results['warnings']:
@@ -909,36 +1040,42 @@ def upload_cv():
                 f"Sugestie: {'; '.join(validation_results['suggestions'])}",
                 'info')
 
-        # Zapisz CV w bazie danych
-        cv_upload = CVUpload(user_id=current_user.id,
-                             filename=original_filename,
-                             original_text=cv_text,
-                             job_title=request.form.get('job_title', ''),
-                             job_description=request.form.get(
-                                 'job_description', ''))
-        db.session.add(cv_upload)
-        db.session.commit()
+        # Zapisz CV w bazie danych (duplikat tego użytkownika aktualizuje istniejący wpis)
+        cv_upload = cv_upload_store.save(current_user.id,
+                                         content_digest,
+                                         filename=original_filename,
+                                         cv_text=cv_text,
+                                         job_title=request.form.get('job_title', ''),
+                                         job_description=request.form.get(
+                                             'job_description', ''),
+                                         validation=validation_results,
+                                         document=cv_document)
 
         # Wyczyść sesję przed dodaniem nowych danych
         clean_session_before_new_data()
 
-        # Store CV data in session for processing (skrócone wersje)
-        session['cv_text'] = cv_text[:2000] + "...[skrócono]" if len(
-            cv_text) > 2000 else cv_text
-        session['original_cv_text'] = cv_text[:1500] + "...[skrócono]" if len(
-            cv_text) > 1500 else cv_text
+        # Store CV data in session for processing (w sesji cookie skrócone na granicy sekcji)
+        if session_is_server_side():
+            session['cv_text'] = cv_document['text']
+            session['original_cv_text'] = cv_document['text']
+            session['job_description'] = request.form.get('job_description', '')
+        else:
+            session['cv_text'] = truncate_document(cv_document, 2000)
+            session['original_cv_text'] = truncate_document(cv_document, 1500)
+            session['job_description'] = request.form.get(
+                'job_description', '')[:500]  # Limit job description
         session[
             'original_filename'] = original_filename[:
                                                      100]  # Limit filename length
         session['job_title'] = request.form.get('job_title',
                                                 '')[:200]  # Limit job title
-        session['job_description'] = request.form.get(
-            'job_description', '')[:500]  # Limit job description
         session['cv_upload_id'] = cv_upload.id
 
         return jsonify({
             'success': True,
-            'cv_text': cv_text,
+            'cv_upload_id': cv_upload.id,
+            'cv_text': cv_document['text'],
+            'sections': [section['key'] for section in cv_document['sections']],
             'message': 'CV zostało pomyślnie przesłane i zapisane.'
         })
 
@@ -1094,21 +1231,21 @@ def generate_cv_pdf():
                 'message': 'Brak danych CV do wygenerowania'
             }), 400
 
-        # Generate PDF
-        pdf_buffer = generate_cv_pdf_file(cv_data)
+        # Generate PDF (ponowne pobranie tych samych danych jest serwowane z cache)
+        download = pdf_download_payload(
+            cv_data, 'export', lambda: pdf_render_service.render(cv_data, 'export'),
+            f"CV_{cv_data.get('firstName', 'CV')}_{cv_data.get('lastName', '')}.pdf")
 
-        # Encode as base64 for frontend
-        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode()
+        return jsonify({'success': True, **download})
 
+    except RenderOverloaded as e:
+        return pdf_overloaded_response(e)
+    except RenderTimeout as e:
+        logger.error(f"CV PDF render timed out: {str(e)}")
         return jsonify({
-            'success':
-            True,
-            'pdf_data':
-            pdf_base64,
-            'filename':
-            f"CV_{cv_data.get('firstName', 'CV')}_{cv_data.get('lastName', '')}.pdf"
-        })
-
+            'success': False,
+            'message': 'Generowanie PDF trwało zbyt długo. Spróbuj ponownie.'
+        }), 504
     except Exception as e:
         logger.error(f"Error generating CV PDF: {str(e)}")
         return jsonify({
@@ -1117,6 +1254,30 @@ def generate_cv_pdf():
         }), 500
 
 
+@app.route('/api/cv-preview', methods=['POST'])
+@login_required
+@rate_limit('cv_preview')
+def cv_preview():
+    """
+    Szybki podgląd CV w HTML z tej samej specyfikacji szablonu co PDF.
+    Klient wysyła skróty fragmentów, które już ma ('known') - dostaje HTML tylko zmienionych sekcji.
+    PDF jest renderowany dopiero przy pobraniu.
+    """
+    data = request.get_json(silent=True) or {}
+    cv_data = data.get('cv_data')
+    known = data.get('known')
+    if not isinstance(cv_data, dict):
+        return jsonify({'success': False, 'message': 'Brak danych CV do podglądu'}), 400
+    error = validate_preview_data(cv_data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    if not isinstance(known, dict):
+        known = {}
+
+    preview = cv_preview_renderer.render(cv_data, data.get('template') or 'export', known)
+    return jsonify({'success': True, **preview})
+
+
 @app.route('/api/generate-ai-cv', methods=['POST'])
 @login_required
 def generate_ai_cv():
@@ -1153,24 +1314,14 @@ def generate_ai_cv():
                 'premium_required': True
             }), 403
 
-        # Generate AI content based on basic info
-        from utils.openrouter_api import generate_complete_cv_content
-
-        ai_cv_content = generate_complete_cv_content(
+        # Generate AI content based on basic info (ogólna część z katalogu dla częstych kombinacji)
+        cv_content = cv_content_catalog.generate(
             target_position=basic_info['targetPosition'],
             experience_level=basic_info['experience_level'],
             industry=basic_info['industry'],
             brief_background=basic_info['brief_background'],
             language='pl')
 
-        # Parse AI response
-        import json
-        try:
-            cv_content = json.loads(ai_cv_content)
-        except json.JSONDecodeError:
-            # Fallback parsing
-            cv_content = parse_ai_json_response(ai_cv_content)
-
         # Combine basic info with AI-generated content
         complete_cv_data = {
             'firstName':
@@ -1197,16 +1348,7 @@ def generate_ai_cv():
             basic_info['template_style']
         }
 
-        # Generate PDF with selected template
-        from utils.cv_templates import generate_cv_with_template
-
-        pdf_buffer = generate_cv_with_template(complete_cv_data,
-                                               basic_info['template_style'])
-
-        # Encode as base64
-        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode()
-
-        # Store in session for potential edits
+        # Store in session for potential edits - PDF jest renderowany dopiero na żądanie (/api/ai-cv-pdf)
         session['ai_generated_cv'] = complete_cv_data
 
         return jsonify({
@@ -1214,10 +1356,8 @@ def generate_ai_cv():
             True,
             'cv_data':
             complete_cv_data,
-            'pdf_data':
-            pdf_base64,
-            'filename':
-            f"AI_CV_{basic_info['firstName']}_{basic_info['lastName']}.pdf",
+            'pdf_url':
+            url_for('ai_cv_pdf'),
             'message':
             'CV zostało wygenerowane przez AI z profesjonalnym szablonem!'
         })
@@ -1230,6 +1370,101 @@ def generate_ai_cv():
         }), 500
 
 
+AI_CV_FIELDS = ('firstName', 'lastName', 'email', 'phone', 'city', 'jobTitle', 'summary', 'experiences',
+                'education', 'skills', 'template_style')
+
+
+@app.route('/api/ai-cv-pdf', methods=['POST'])
+@login_required
+def ai_cv_pdf():
+    """
+    PDF dla CV wygenerowanego przez AI - renderowany dopiero przy pobraniu, przez cache.
+    Klient może przysłać poprawioną treść (cv_data) i inny szablon; bez nich używana jest
+    wersja z sesji zapisana przez /api/generate-ai-cv.
+    """
+    try:
+        if current_user.username != 'developer' and not current_user.is_premium_active():
+            return jsonify({
+                'success': False,
+                'message':
+                'Automatyczne generowanie CV jest dostępne tylko dla użytkowników Premium.',
+                'premium_required': True
+            }), 403
+
+        data = request.get_json(silent=True) or {}
+        cv_data = session.get('ai_generated_cv')
+        if isinstance(data.get('cv_data'), dict):
+            cv_data = {key: data['cv_data'][key] for key in AI_CV_FIELDS if key in data['cv_data']}
+            error = validate_preview_data(cv_data)
+            if error:
+                return jsonify({'success': False, 'message': error}), 400
+            session['ai_generated_cv'] = cv_data
+        if not cv_data:
+            return jsonify({
+                'success': False,
+                'message': 'Brak danych CV do wygenerowania - wygeneruj CV ponownie'
+            }), 400
+
+        template = data.get('template_style') or cv_data.get('template_style') or 'modern_blue'
+        download = pdf_download_payload(
+            cv_data, template, lambda: pdf_render_service.render(cv_data, template),
+            f"AI_CV_{cv_data.get('firstName', '')}_{cv_data.get('lastName', '')}.pdf")
+
+        return jsonify({'success': True, **download})
+
+    except RenderOverloaded as e:
+        return pdf_overloaded_response(e)
+    except RenderTimeout as e:
+        logger.error(f"AI CV PDF render timed out: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Generowanie PDF trwało zbyt długo. Spróbuj ponownie.'
+        }), 504
+    except Exception as e:
+        logger.error(f"Error generating AI CV PDF: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Błąd podczas generowania PDF: {str(e)}"
+        }), 500
+
+
+@app.route('/download-cv/<token>')
+@login_required
+def download_cv_pdf(token):
+    """
+    Pobranie wygenerowanego PDF prosto z pliku w cache: Content-Length, ETag
+    i zakresy (Range) obsługuje send_file, bez kopii w pamięci i bez base64.
+    """
+    try:
+        payload = pdf_download_signer.loads(token, max_age=PDF_DOWNLOAD_TOKEN_TTL)
+    except SignatureExpired:
+        return jsonify({'success': False, 'message': 'Link do pobrania wygasł - wygeneruj CV ponownie'}), 410
+    except BadSignature:
+        return jsonify({'success': False, 'message': 'Nieprawidłowy link do pobrania'}), 404
+
+    if payload.get('u') != current_user.id:
+        return jsonify({'success': False, 'message': 'Nieprawidłowy link do pobrania'}), 404
+
+    path = pdf_render_cache.cached_path(payload['k'])
+    try:
+        if not path:
+            raise FileNotFoundError(payload['k'])
+        response = send_file(path,
+                             mimetype='application/pdf',
+                             as_attachment=True,
+                             download_name=payload['f'],
+                             conditional=True,
+                             etag=payload['k'],
+                             max_age=PDF_DOWNLOAD_TOKEN_TTL)
+    except FileNotFoundError:
+        # Plik usunięty z cache (limit rozmiaru) - PDF trzeba wygenerować ponownie
+        return jsonify({'success': False, 'message': 'Plik wygasł - wygeneruj CV ponownie'}), 410
+
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
 @app.route('/api/create-ai-cv-payment', methods=['POST'])
 @login_required
 def create_ai_cv_payment():
@@ -1265,124 +1500,6 @@ def create_ai_cv_payment():
         }), 500
 
 
-def generate_cv_pdf_file(cv_data):
-    """Generate PDF file from CV data"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#6366f1'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
-
-    subtitle_style = ParagraphStyle('CustomSubtitle',
-                                    parent=styles['Heading2'],
-                                    fontSize=16,
-                                    textColor=colors.HexColor('#4f46e5'),
-                                    spaceAfter=20)
-
-    normal_style = ParagraphStyle('CustomNormal',
-                                  parent=styles['Normal'],
-                                  fontSize=11,
-                                  spaceAfter=12)
-
-    # Header
-    name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip(
-    )
-    story.append(Paragraph(name, title_style))
-
-    job_title = cv_data.get('jobTitle', '')
-    if job_title:
-        story.append(Paragraph(job_title, styles['Heading3']))
-
-    # Contact info
-    contact_info = []
-    if cv_data.get('email'):
-        contact_info.append(cv_data['email'])
-    if cv_data.get('phone'):
-        contact_info.append(cv_data['phone'])
-    if cv_data.get('city'):
-        contact_info.append(cv_data['city'])
-    if cv_data.get('linkedin'):
-        contact_info.append(cv_data['linkedin'])
-
-    if contact_info:
-        story.append(Paragraph(' | '.join(contact_info), normal_style))
-
-    story.append(Spacer(1, 20))
-
-    # Summary
-    if cv_data.get('summary'):
-        story.append(Paragraph("O mnie", subtitle_style))
-        story.append(Paragraph(cv_data['summary'], normal_style))
-        story.append(Spacer(1, 15))
-
-    # Experience
-    experiences = cv_data.get('experiences', [])
-    if experiences and any(
-            exp.get('title') or exp.get('company') for exp in experiences):
-        story.append(Paragraph("Doświadczenie zawodowe", subtitle_style))
-        for exp in experiences:
-            if exp.get('title') or exp.get('company'):
-                # Title and company
-                exp_header = f"<b>{exp.get('title', 'Stanowisko')}</b> - {exp.get('company', 'Firma')}"
-                story.append(Paragraph(exp_header, normal_style))
-
-                # Dates
-                start_date = exp.get('startDate', '')
-                end_date = exp.get('endDate', 'obecnie')
-                if start_date:
-                    date_range = f"{start_date} - {end_date}"
-                    story.append(Paragraph(date_range, normal_style))
-
-                # Description
-                if exp.get('description'):
-                    story.append(Paragraph(exp['description'], normal_style))
-
-                story.append(Spacer(1, 10))
-
-    # Education
-    education = cv_data.get('education', [])
-    if education and any(
-            edu.get('degree') or edu.get('school') for edu in education):
-        story.append(Paragraph("Wykształcenie", subtitle_style))
-        for edu in education:
-            if edu.get('degree') or edu.get('school'):
-                # Degree and school
-                edu_header = f"<b>{edu.get('degree', 'Kierunek')}</b> - {edu.get('school', 'Uczelnia')}"
-                story.append(Paragraph(edu_header, normal_style))
-
-                # Years
-                start_year = edu.get('startYear', '')
-                end_year = edu.get('endYear', '')
-                if start_year or end_year:
-                    year_range = f"{start_year} - {end_year}"
-                    story.append(Paragraph(year_range, normal_style))
-
-                story.append(Spacer(1, 10))
-
-    # Skills
-    skills = cv_data.get('skills', '')
-    if skills:
-        story.append(Paragraph("Umiejętności", subtitle_style))
-        skills_list = [
-            skill.strip() for skill in skills.split(',') if skill.strip()
-        ]
-        skills_text = ' • '.join(skills_list)
-        story.append(Paragraph(skills_text, normal_style))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-
 @app.route('/process-cv', methods=['POST'])
 @login_required
 @rate_limit('cv_process')
@@ -1401,24 +1518,33 @@ def process_cv():
         }), 402  # Payment Required
 
     data = request.json
-    cv_text = data.get('cv_text') or session.get('cv_text')
     job_url = data.get('job_url', '')
     selected_option = data.get('selected_option', '')
     roles = data.get('roles', [])
     language = data.get('language', 'pl')  # Default to Polish
 
-    if not cv_text:
+    # Pełne CV z bazy według cv_upload_id; cv_text tylko, gdy użytkownik je zmienił
+    cv_document = resolve_cv_document(data.get('cv_text'), data.get('cv_upload_id'))
+    if cv_document is None:
         return jsonify({
             'success': False,
             'message': 'No CV text found. Please upload a CV first.'
         }), 400
 
-    # Process Job URL if provided
-    extracted_job_description = ''
-    if job_url:
-        try:
-            extracted_job_description = analyze_job_url(job_url)
-        except Exception as e:
+    # Prompty dostają CV z oznaczonymi sekcjami - model nie musi sam odtwarzać struktury
+    cv_text = render_for_prompt(cv_document, language)
+
+    # Oferta ze wspólnego magazynu - pobierana i analizowana raz dla wszystkich użytkowników
+    job_posting = None
+    try:
+        # Podsumowanie AI długich ogłoszeń tylko dla premium, reszta lokalnie
+        ai_summary = bool(data.get('ai_summary')) and (
+            current_user.username == 'developer' or current_user.is_premium_active())
+        job_posting = job_store.get(job_url=job_url,
+                                    job_description=data.get('job_description', ''),
+                                    ai_summary=ai_summary)
+    except Exception as e:
+        if job_url:
             logger.error(
                 f"Error extracting job description from URL: {str(e)}")
             return jsonify({
@@ -1427,10 +1553,13 @@ def process_cv():
                 'message':
                 f"Error extracting job description from URL: {str(e)}"
             }), 500
+        logger.error(f"Error storing job posting: {str(e)}")
 
     try:
-        job_description = data.get('job_description',
-                                   extracted_job_description)
+        if job_posting:
+            job_description = job_store.prompt_text(job_posting)
+        else:
+            job_description = data.get('job_description', '')
         result = None
 
         options_handlers = {
@@ -1566,7 +1695,7 @@ def process_cv():
 
         elif selected_option == 'interview_questions':
             # Funkcja dla Premium
-            job_title = data.get('job_title', 'Specjalista')
+            job_title = data.get('job_title') or (job_posting.title if job_posting else '') or 'Specjalista'
             ai_result = generate_interview_questions(cv_text,
                                                      job_description,
                                                      language,
@@ -1581,6 +1710,13 @@ def process_cv():
                 result = options_handlers[selected_option](cv_text,
                                                            job_description,
                                                            language)
+            elif selected_option == 'interview_tips':
+                # Część zależna od oferty jest współdzielona przez cache (oferta + stanowisko)
+                job_title = data.get('job_title') or (job_posting.title if job_posting else '')
+                result = generate_interview_tips(cv_text,
+                                                 job_description,
+                                                 language,
+                                                 job_title=job_title)
             else:
                 result = options_handlers[selected_option](cv_text,
                                                            job_description,
@@ -1593,33 +1729,27 @@ def process_cv():
                                                        language)
 
         # Store optimized CV for comparison (only for optimization options) - skrócona wersja
-        if selected_option in [
-                'optimize', 'position_optimization',
-                'advanced_position_optimization'
-        ]:
-            if isinstance(result, str) and len(result) > 1500:
+        if selected_option in OPTIMIZED_CV_TYPES:
+            if isinstance(result, str) and len(result) > 1500 and not session_is_server_side():
                 session[
                     'last_optimized_cv'] = result[:1500] + "...[skrócono dla optymalizacji sesji]"
             else:
                 session['last_optimized_cv'] = result
 
-        # Optymalizuj sesję po dodaniu nowych danych
-        optimize_session_data()
-
         # Zapisz wynik analizy w bazie danych
-        cv_upload_id = session.get('cv_upload_id')
-        if cv_upload_id:
+        result_id = None
+        cv_upload = get_request_cv_upload(data.get('cv_upload_id'))
+        if cv_upload is not None:
             try:
                 analysis_result = AnalysisResult(
-                    cv_upload_id=cv_upload_id,
+                    cv_upload_id=cv_upload['id'],
                     analysis_type=selected_option,
                     result_data=json.dumps(
                         {
                             'result':
                             result,
-                            'job_description':
-                            extracted_job_description
-                            if extracted_job_description else job_description,
+                            'job_posting_id':
+                            job_posting.id if job_posting else None,
                             'job_url':
                             job_url,
                             'timestamp':
@@ -1628,6 +1758,10 @@ def process_cv():
                         ensure_ascii=False))
                 db.session.add(analysis_result)
                 db.session.commit()
+                # Wersję do porównania wskazują tylko wyniki optymalizacji (nie raporty oceny itp.)
+                if selected_option in OPTIMIZED_CV_TYPES:
+                    result_id = analysis_result.id
+                    session['last_result_id'] = result_id
             except Exception as e:
                 logger.error(f"Error saving analysis result: {str(e)}")
                 # Nie blokujemy odpowiedzi, tylko logujemy błąd
@@ -1637,8 +1771,10 @@ def process_cv():
             True,
             'result':
             result,
+            'result_id':
+            result_id,
             'job_description':
-            extracted_job_description if extracted_job_description else None
+            job_description if job_posting and job_posting.normalized_url else None
         })
 
     except Exception as e:
@@ -1658,17 +1794,19 @@ def apply_recruiter_feedback():
     """
     try:
         data = request.get_json()
-        cv_text = data.get('cv_text') or session.get('cv_text')
         recruiter_feedback = data.get('recruiter_feedback', '')
         job_description = data.get('job_description', '')
         language = data.get('language', 'pl')
 
-        if not cv_text:
+        cv_document = resolve_cv_document(data.get('cv_text'), data.get('cv_upload_id'))
+        if cv_document is None:
             return jsonify({
                 'success': False,
                 'message': 'Brak tekstu CV. Prześlij najpierw CV.'
             }), 400
 
+        cv_text = render_for_prompt(cv_document, language)
+
         if not recruiter_feedback:
             return jsonify({
                 'success': False,
@@ -1709,11 +1847,12 @@ def apply_recruiter_feedback():
             session['last_feedback_applied'] = True
 
         # Zapisz wynik w bazie danych
-        cv_upload_id = session.get('cv_upload_id')
-        if cv_upload_id:
+        result_id = None
+        cv_upload = get_request_cv_upload(data.get('cv_upload_id'))
+        if cv_upload is not None:
             try:
                 analysis_result = AnalysisResult(
-                    cv_upload_id=cv_upload_id,
+                    cv_upload_id=cv_upload['id'],
                     analysis_type='apply_recruiter_feedback',
                     result_data=json.dumps(
                         {
@@ -1725,6 +1864,8 @@ def apply_recruiter_feedback():
                         ensure_ascii=False))
                 db.session.add(analysis_result)
                 db.session.commit()
+                result_id = analysis_result.id
+                session['last_result_id'] = result_id
             except Exception as e:
                 logger.error(
                     f"Error saving feedback application result: {str(e)}")
@@ -1734,6 +1875,8 @@ def apply_recruiter_feedback():
             True,
             'result':
             result,
+            'result_id':
+            result_id,
             'message':
             'Poprawki rekrutera zostały pomyślnie zastosowane do CV!'
         })
@@ -1748,6 +1891,108 @@ def apply_recruiter_feedback():
         }), 500
 
 
+@app.route('/analyze-url', methods=['POST'])
+@rate_limit('general')
+def analyze_url():
+    """
+    Pobiera ofertę pracy z URL i zwraca wyciągnięty opis (wspólny potok z cache)
+    """
+    from utils.job_pipeline import job_pipeline
+    import requests
+
+    data = request.get_json(silent=True) or {}
+    job_url = (data.get('job_url') or '').strip()
+    if not job_url:
+        return jsonify({
+            'success': False,
+            'message': 'Podaj URL oferty pracy'
+        }), 400
+
+    # Ulepszanie i streszczanie przez AI tylko dla premium
+    use_ai = current_user.is_authenticated and (
+        current_user.username == 'developer' or current_user.is_premium_active())
+
+    try:
+        result = job_pipeline.run(job_url,
+                                  use_ai=use_ai and bool(data.get('enhance')),
+                                  ai_summary=use_ai and bool(data.get('ai_summary')))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching job URL {job_url}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Nie udało się pobrać oferty z URL: {str(e)}'
+        }), 502
+
+    return jsonify({
+        'success': True,
+        'job_title': result['job_title'],
+        'company': result['company'],
+        'job_description': result['job_text'],
+        'source': result['source']
+    })
+
+
+MAX_BATCH_JOB_URLS = int(os.environ.get('MAX_BATCH_JOB_URLS', '30'))
+
+
+@app.route('/analyze-urls', methods=['POST'])
+@login_required
+@rate_limit('job_batch')
+def analyze_urls():
+    """
+    Analizuje wiele ofert naraz. Wyniki są strumieniowane jako NDJSON
+    (jedna linia JSON na ofertę) w kolejności ukończenia, a na końcu linia z podsumowaniem.
+    """
+    from utils.job_pipeline import job_pipeline
+
+    data = request.get_json(silent=True) or {}
+    urls = data.get('job_urls') or []
+    if isinstance(urls, str):
+        urls = urls.split()
+
+    # Usuń puste i powtórzone linki, zachowując kolejność
+    urls = list(dict.fromkeys(url.strip() for url in urls if isinstance(url, str) and url.strip()))
+    if not urls:
+        return jsonify({
+            'success': False,
+            'message': 'Podaj listę URL ofert pracy'
+        }), 400
+    if len(urls) > MAX_BATCH_JOB_URLS:
+        return jsonify({
+            'success': False,
+            'message': f'Maksymalnie {MAX_BATCH_JOB_URLS} ofert w jednym zapytaniu'
+        }), 400
+
+    use_ai = current_user.username == 'developer' or current_user.is_premium_active()
+    ai_summary = use_ai and bool(data.get('ai_summary'))
+
+    def generate():
+        failed = 0
+        for index, url, result, error in job_pipeline.run_many(urls, ai_summary=ai_summary):
+            if error:
+                failed += 1
+                line = {'index': index, 'url': url, 'success': False, 'message': str(error)}
+            else:
+                line = {
+                    'index': index,
+                    'url': url,
+                    'success': True,
+                    'job_title': result['job_title'],
+                    'company': result['company'],
+                    'job_description': result['job_text'],
+                    'source': result['source']
+                }
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+
+        yield json.dumps({'done': True, 'count': len(urls), 'failed': failed}) + '\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+
 @app.route('/analyze-job-posting', methods=['POST'])
 def analyze_job_posting():
     """
@@ -1767,37 +2012,23 @@ def analyze_job_posting():
                 'Podaj opis stanowiska lub URL oferty pracy'
             }), 400
 
-        # Jeśli podano URL, najpierw wyciągnij opis
-        if job_url and not job_description:
-            try:
-                job_description = analyze_job_url(job_url)
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'message': f'Błąd podczas analizy URL: {str(e)}'
-                }), 500
-
-        # Analizuj opis stanowiska
-        from utils.openrouter_api import analyze_polish_job_posting
-        analysis_result = analyze_polish_job_posting(job_description, language)
-
-        # Spróbuj sparsować JSON z odpowiedzi AI
+        # Jeśli podano URL, najpierw wyciągnij opis (lub weź go z magazynu ofert)
         try:
-            import json
-            parsed_analysis = json.loads(analysis_result)
-        except json.JSONDecodeError:
-            # Jeśli nie da się sparsować jako JSON, wyciągnij JSON z tekstu
-            import re
-            json_match = re.search(r'\{.*\}', analysis_result, re.DOTALL)
-            if json_match:
-                parsed_analysis = json.loads(json_match.group())
-            else:
-                parsed_analysis = {'analysis': analysis_result}
+            job_posting = job_store.get(job_url=job_url, job_description=job_description)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': f'Błąd podczas analizy URL: {str(e)}'
+            }), 500
+
+        # Analiza stanowiska liczona raz na ofertę i język, potem czytana z bazy
+        parsed_analysis = job_store.ensure_analysis(job_posting, language)
 
         return jsonify({
             'success': True,
             'analysis': parsed_analysis,
-            'raw_description': job_description
+            'raw_description': job_store.prompt_text(job_posting),
+            'job_posting_id': job_posting.id
         })
 
     except Exception as e:
@@ -1836,11 +2067,30 @@ def check_configuration():
     print("="*60 + "\n")
     return True
 
+@app.cli.command('refresh-cv-catalog')
+@click.option('--limit', default=CV_CATALOG_REFRESH_LIMIT, show_default=True,
+              help='Maksymalna liczba kombinacji generowanych w jednym przebiegu')
+@click.option('--seed', multiple=True, metavar='STANOWISKO|POZIOM|BRANŻA',
+              help='Kombinacja do wygenerowania z góry (można podać wiele razy)')
+def refresh_cv_catalog(limit, seed):
+    """Wsadowo generuje ogólną treść AI CV dla najczęściej wybieranych kombinacji (np. z crona)"""
+    seeds = []
+    for value in seed:
+        parts = [part.strip() for part in value.split('|')]
+        if len(parts) != 3 or not parts[0]:
+            raise click.BadParameter(f"oczekiwano 'stanowisko|poziom|branża', otrzymano {value!r}")
+        seeds.append(tuple(parts))
+
+    result = cv_content_catalog.refresh(limit=limit, seeds=seeds)
+    click.echo(f"✅ Katalog treści CV: wygenerowano {result['generated']}, błędy {result['failed']}")
+
+
 def initialize_app():
     """Initialize application database and users"""
     with app.app_context():
         # Create all database tables
         db.create_all()
+        ensure_schema()
         print("✅ Database tables created successfully!")
 
         # Create new developer account
@@ -1861,6 +2111,9 @@ def initialize_app():
 # Initialize app when imported (for production)
 if os.environ.get('FLASK_ENV') == 'production':
     initialize_app()
+    # Przy --preload render rozgrzewający wykonuje się przed forkiem procesów roboczych
+    if os.environ.get('PDF_RENDER_WARMUP', 'true').lower() == 'true':
+        warm_up_templates()
 
 if __name__ == '__main__':
     # Sprawdź konfigurację przed startem
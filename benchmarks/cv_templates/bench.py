@@ -0,0 +1,142 @@
+"""
+Benchmark i walidacja szablonów CV (utils/cv_templates.py).
+
+Uruchomienie (z katalogu głównego repozytorium):
+    python benchmarks/cv_templates/bench.py --runs 30
+    python benchmarks/cv_templates/bench.py --templates modern_blue,export --json wyniki.json
+
+Dla każdego szablonu z TEMPLATE_SPECS:
+- czas kompilacji specyfikacji do planu renderowania (jednorazowy koszt przy imporcie),
+- mediana i p95 czasu renderowania dla trzech rozmiarów danych: pusty formularz,
+  przykładowe CV (SAMPLE_CV_DATA) i długie CV (12 pozycji doświadczenia),
+- liczba stron i rozmiar PDF,
+- mediana czasu podglądu HTML (utils/cv_preview.py) z tej samej specyfikacji, bez cache fragmentów,
+- walidacja: plan renderuje się bez błędów, a w tekście PDF są imię i nazwisko.
+Zwraca kod 1, jeśli walidacja się nie powiedzie albo mediana przekroczy --max-ms.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from PyPDF2 import PdfReader  # noqa: E402
+from utils.cv_templates import TEMPLATE_SPECS, TEMPLATE_PLANS, SAMPLE_CV_DATA, compile_template, render_plan  # noqa: E402
+from utils.cv_preview import PREVIEW_PLANS  # noqa: E402
+
+
+def long_cv():
+    cv_data = dict(SAMPLE_CV_DATA)
+    cv_data['experiences'] = [dict(SAMPLE_CV_DATA['experiences'][i % 2], startDate=f"{2000 + i}-01")
+                              for i in range(12)]
+    cv_data['summary'] = SAMPLE_CV_DATA['summary'] * 3
+    return cv_data
+
+
+DATASETS = {
+    'empty': {'firstName': 'Jan', 'lastName': 'Kowalski'},
+    'sample': dict(SAMPLE_CV_DATA),
+    'long': long_cv(),
+}
+
+
+def time_call(func, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings) * 1000, p95 * 1000, result
+
+
+def encodable(text):
+    """
+    Część tekstu, którą czcionki base-14 (kodowanie WinAnsi) mogą wypisać - znaki spoza
+    cp1252 (np. ę, Ł) szablony obecnie gubią, więc nie są sprawdzane.
+    """
+    return max(text.encode('cp1252', 'ignore').decode('cp1252').split() or [''], key=len)
+
+
+def validate(pdf_bytes, cv_data):
+    """(liczba stron, błąd lub None)"""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    text = ''.join(page.extract_text() or '' for page in reader.pages)
+    for field in ('firstName', 'lastName'):
+        if cv_data.get(field) and encodable(cv_data[field]) not in text:
+            return len(reader.pages), f"brak pola {field} w tekście PDF"
+    return len(reader.pages), None
+
+
+def render_preview(plan, cv_data):
+    return ''.join(step(cv_data, plan['width']) for _, step, _ in plan['fragments'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='liczba powtórzeń renderowania')
+    parser.add_argument('--templates', default=','.join(TEMPLATE_SPECS), help='lista szablonów po przecinku')
+    parser.add_argument('--max-ms', type=float, help='maksymalna mediana renderowania (ms)')
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    templates = [name.strip() for name in args.templates.split(',') if name.strip()]
+    unknown = set(templates) - set(TEMPLATE_SPECS)
+    if unknown:
+        parser.error(f"nieznane szablony: {', '.join(sorted(unknown))}")
+
+    # Rozgrzewka: ładowanie metryk czcionek nie powinno obciążać pierwszego szablonu
+    render_plan(TEMPLATE_PLANS[templates[0]], DATASETS['sample'])
+
+    results = {}
+    failures = []
+    print(f"{'szablon':<13} {'dane':<7} {'kompilacja ms':>13} {'render ms':>10} {'p95 ms':>8} "
+          f"{'podgląd ms':>10} {'stron':>6} {'KB':>6}  walidacja")
+    print('-' * 95)
+    for name in templates:
+        compile_ms, _, plan = time_call(lambda: compile_template(name, TEMPLATE_SPECS[name]), args.runs)
+        results[name] = {'compile_ms': round(compile_ms, 3), 'datasets': {}}
+
+        for dataset, cv_data in DATASETS.items():
+            try:
+                render_ms, p95_ms, buffer = time_call(lambda: render_plan(plan, cv_data), args.runs)
+                pdf_bytes = buffer.getvalue()
+                pages, error = validate(pdf_bytes, cv_data)
+                preview_ms, _, _ = time_call(lambda: render_preview(PREVIEW_PLANS[name], cv_data), args.runs)
+            except Exception as e:
+                render_ms = p95_ms = preview_ms = 0.0
+                pdf_bytes, pages, error = b'', 0, f"{type(e).__name__}: {e}"
+
+            if error is None and args.max_ms and render_ms > args.max_ms:
+                error = f"mediana {render_ms:.1f} ms > {args.max_ms} ms"
+            if error:
+                failures.append(f"{name}/{dataset}: {error}")
+
+            results[name]['datasets'][dataset] = {
+                'render_ms': round(render_ms, 2), 'p95_ms': round(p95_ms, 2),
+                'preview_ms': round(preview_ms, 3),
+                'pages': pages, 'bytes': len(pdf_bytes), 'error': error,
+            }
+            print(f"{name:<13} {dataset:<7} {compile_ms:>13.3f} {render_ms:>10.2f} {p95_ms:>8.2f} "
+                  f"{preview_ms:>10.3f} {pages:>6} {len(pdf_bytes) / 1024:>6.1f}  {error or 'ok'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        print('\n❌ ' + '\n❌ '.join(failures))
+        return 1
+    print(f"\n✅ {len(templates)} szablonów: plany poprawne, wszystkie rendery przeszły walidację")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
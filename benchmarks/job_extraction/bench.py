@@ -0,0 +1,130 @@
+"""
+Benchmark i test regresji ekstrakcji ofert pracy na zapisanych stronach.
+
+Uruchomienie (z katalogu głównego repozytorium):
+    python benchmarks/job_extraction/bench.py --runs 50
+
+Dla każdego portalu z corpus/expected.json mierzy czas ekstrakcji (bez sieci i bez AI)
+oraz poprawność pól: tytuł, firma i obecność kluczowych fragmentów opisu.
+Osobno mierzona jest szybka ścieżka danych strukturalnych (JSON-LD / OpenGraph)
+i sprawdzane, czy uruchamia się dokładnie tam, gdzie oczekujemy.
+Zwraca kod 1, jeśli dokładność któregoś portalu spadnie poniżej --min-accuracy.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.parse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+sys.path.insert(0, ROOT)
+
+from utils.enhanced_job_extractor import extract_job_info_from_html  # noqa: E402
+from utils.job_extractors import extractor_registry  # noqa: E402
+from utils.structured_job_data import extract_structured_job_data, is_complete_job_data  # noqa: E402
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+
+    corpus = []
+    for filename, spec in sorted(expected.items()):
+        with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+            corpus.append((filename, f.read(), spec))
+    return corpus
+
+
+def score_fields(job_info, spec):
+    """Zwraca (trafione, wszystkie, lista błędów) dla jednej strony"""
+    checks = [
+        ('job_title', job_info['job_title'].strip() == spec['job_title']),
+        ('company', job_info['company'].strip() == spec['company']),
+    ]
+    for fragment in spec['description_contains']:
+        checks.append((f"opis ~ {fragment!r}", fragment in job_info['job_description']))
+
+    failures = [name for name, ok in checks if not ok]
+    return len(checks) - len(failures), len(checks), failures
+
+
+def time_call(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
+
+
+def time_lookup(hosts, runs=10000):
+    start = time.perf_counter()
+    for _ in range(runs):
+        for host in hosts:
+            extractor_registry.lookup(host)
+    return (time.perf_counter() - start) / (runs * len(hosts)) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=50, help='liczba powtórzeń na stronę')
+    parser.add_argument('--min-accuracy', type=float, default=1.0, help='minimalna dokładność pól na portal')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    hosts = []
+    regressions = []
+
+    print(f"{'strona':<20} {'ekstraktor':<14} {'mediana ms':>11} {'p95 ms':>9} {'dokładność':>11} "
+          f"{'szybka ścieżka':>15} {'ms':>7}")
+    print('-' * 92)
+
+    for filename, html, spec in corpus:
+        url = spec['url']
+        host = urllib.parse.urlparse(url).netloc
+        hosts.append(host)
+        extractor = extractor_registry.lookup(host)
+
+        job_info = extract_job_info_from_html(html, url)
+        hits, total, failures = score_fields(job_info, spec)
+        accuracy = hits / total
+        median_ms, p95_ms = time_call(lambda: extract_job_info_from_html(html, url), args.runs)
+
+        structured = extract_structured_job_data(html)
+        fast_path = structured['source'] if is_complete_job_data(structured) else None
+        fast_ms, _ = time_call(lambda: extract_structured_job_data(html), args.runs)
+        if fast_path:
+            fast_hits, fast_total, fast_failures = score_fields(structured, spec)
+            failures += [f"[{fast_path}] {failure}" for failure in fast_failures]
+            accuracy = min(accuracy, fast_hits / fast_total)
+        if fast_path != spec.get('structured'):
+            failures.append(f"szybka ścieżka: oczekiwano {spec.get('structured')}, jest {fast_path}")
+            accuracy = 0.0
+
+        print(f"{filename:<20} {extractor.name if extractor else '-':<14} {median_ms:>11.2f} {p95_ms:>9.2f} "
+              f"{accuracy:>10.0%} {fast_path or '-':>15} {fast_ms:>7.2f}")
+        for failure in failures:
+            print(f"    ✗ {failure}")
+
+        if accuracy < args.min_accuracy:
+            regressions.append(filename)
+
+    print('-' * 92)
+    print(f"Zarejestrowane domeny: {len(extractor_registry)}, "
+          f"średni czas wyszukania ekstraktora: {time_lookup(hosts):.0f} ns")
+
+    if regressions:
+        print(f"❌ Regresja dokładności: {', '.join(regressions)}")
+        return 1
+
+    print("✅ Wszystkie portale powyżej progu dokładności")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Benchmark przepustowości i wierności ekstrakcji tekstu z CV w PDF.
+
+Uruchomienie (z katalogu głównego repozytorium):
+    python benchmarks/pdf_extraction/bench.py --runs 5
+    python benchmarks/pdf_extraction/bench.py --backends pypdf2,engine --json wyniki.json
+
+Korpus jest generowany przez make_corpus.py (przy pierwszym uruchomieniu automatycznie).
+Dla każdego backendu (pypdf2, pdfminer oraz engine - pełny silnik z wyborem backendu,
+oceną jakości i fallbackiem, uruchamiany w procesie) raportuje:
+- strony/s i MB/s (mediana z --runs powtórzeń na plik),
+- szczytowe RSS procesu (osobny podproces na backend, żeby pomiary się nie mieszały),
+- wierność tekstu: kolejność słów (difflib), odzysk słów i zachowanie polskich znaków.
+Zwraca kod 1, jeśli wierność któregoś pliku z warstwą tekstową spadnie poniżej --min-fidelity.
+"""
+import argparse
+import collections
+import difflib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from make_corpus import CORPUS_DIR, MANIFEST, POLISH_CHARS, build_corpus  # noqa: E402
+from utils.pdf_extraction import PDFExtractionEngine, iter_page_texts, BACKENDS  # noqa: E402
+
+ALL_BACKENDS = BACKENDS + ('engine',)
+
+
+def load_corpus():
+    manifest_path = os.path.join(CORPUS_DIR, MANIFEST)
+    if not os.path.exists(manifest_path):
+        print("Brak korpusu - generuję (make_corpus.py)")
+        build_corpus()
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    corpus = []
+    for filename, spec in sorted(manifest['documents'].items()):
+        with open(os.path.join(CORPUS_DIR, filename), 'rb') as f:
+            corpus.append((filename, f.read(), spec))
+    return corpus
+
+
+def make_extractor(backend):
+    """Funkcja dane -> (tekst, liczba stron) dla backendu"""
+    if backend == 'engine':
+        engine = PDFExtractionEngine(sandbox=None)
+
+        def extract(data):
+            result = engine.extract(data)
+            return result['text'], result['pages_extracted']
+        return extract
+
+    def extract(data):
+        pages = list(iter_page_texts(backend, data))
+        return ''.join(pages), len(pages)
+    return extract
+
+
+def fidelity(expected, extracted):
+    """(kolejność słów 0-1, odzysk słów 0-1, zachowane polskie znaki 0-1 lub None)"""
+    expected_words = expected.split()
+    extracted_words = extracted.split()
+    if not expected_words:
+        return 1.0, 1.0, None
+
+    order = difflib.SequenceMatcher(None, expected_words, extracted_words, autojunk=False).ratio()
+    expected_counts = collections.Counter(expected_words)
+    found = collections.Counter(extracted_words)
+    recall = sum(min(count, found[word]) for word, count in expected_counts.items()) / len(expected_words)
+
+    expected_diacritics = sum(expected.count(char) for char in POLISH_CHARS)
+    diacritics = None
+    if expected_diacritics:
+        diacritics = min(1.0, sum(extracted.count(char) for char in POLISH_CHARS) / expected_diacritics)
+    return order, recall, diacritics
+
+
+def time_extraction(extract, data, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text, pages = extract(data)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), text, pages
+
+
+def measure_rss(backend):
+    """Szczytowe RSS (MB) podprocesu, który raz przetwarza cały korpus danym backendem"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--rss-child', backend],
+                            capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def peak_rss_mb():
+    """
+    Szczytowe RSS bieżącego procesu w MB. Na Linuksie z /proc (VmHWM), bo ru_maxrss
+    przechodzi przez fork+exec i zawierałby szczyt procesu nadrzędnego benchmarku.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss jest w KB na Linuksie i w bajtach na macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+
+def rss_child(backend):
+    corpus = load_corpus()
+    extract = make_extractor(backend)
+    baseline = peak_rss_mb()
+    for _, data, _ in corpus:
+        extract(data)
+    print(json.dumps({'baseline_mb': baseline, 'peak_mb': peak_rss_mb()}))
+
+
+def format_optional(value):
+    return f"{value:>6.0%}" if value is not None else f"{'-':>6}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='liczba powtórzeń na plik')
+    parser.add_argument('--backends', default=','.join(ALL_BACKENDS), help='lista backendów po przecinku')
+    parser.add_argument('--min-fidelity', type=float, default=0.9,
+                        help='minimalny odzysk słów dla plików z warstwą tekstową')
+    parser.add_argument('--no-rss', action='store_true', help='pomiń pomiar pamięci w podprocesach')
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    parser.add_argument('--rss-child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child:
+        rss_child(args.rss_child)
+        return 0
+
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    unknown = set(backends) - set(ALL_BACKENDS)
+    if unknown:
+        parser.error(f"nieznane backendy: {', '.join(sorted(unknown))}")
+
+    corpus = load_corpus()
+    results = {}
+    regressions = []
+
+    for backend in backends:
+        extract = make_extractor(backend)
+        total_pages = total_bytes = total_seconds = 0
+
+        print(f"\n=== {backend} ===")
+        print(f"{'plik':<22} {'stron':>6} {'KB':>7} {'ms':>8} {'stron/s':>9} {'MB/s':>7} "
+              f"{'kolejność':>10} {'odzysk':>7} {'PL':>6}")
+        print('-' * 88)
+
+        files = {}
+        for filename, data, spec in corpus:
+            extract(data)  # rozgrzewka: importy i cache czcionek PDFMiner
+            seconds, text, pages = time_extraction(extract, data, args.runs)
+            order, recall, diacritics = fidelity(spec['expected_text'], text)
+            if not spec['has_text_layer']:
+                # Skan: sukcesem jest brak śmieci w wyniku, a nie odzyskanie treści
+                order = recall = 1.0 if not text.strip() else 0.0
+                diacritics = None
+
+            size_mb = len(data) / (1024 * 1024)
+            total_pages += pages
+            total_bytes += len(data)
+            total_seconds += seconds
+            files[filename] = {
+                'pages': pages, 'ms': round(seconds * 1000, 2),
+                'pages_per_sec': round(pages / seconds, 1) if seconds else None,
+                'mb_per_sec': round(size_mb / seconds, 2) if seconds else None,
+                'order': round(order, 3), 'recall': round(recall, 3),
+                'diacritics': round(diacritics, 3) if diacritics is not None else None,
+            }
+            print(f"{filename:<22} {pages:>6} {len(data) / 1024:>7.1f} {seconds * 1000:>8.1f} "
+                  f"{files[filename]['pages_per_sec'] or 0:>9.1f} {files[filename]['mb_per_sec'] or 0:>7.2f} "
+                  f"{order:>10.0%} {recall:>7.0%} {format_optional(diacritics)}")
+
+            if recall < args.min_fidelity:
+                regressions.append(f"{backend}:{filename}")
+
+        summary = {
+            'pages_per_sec': round(total_pages / total_seconds, 1) if total_seconds else None,
+            'mb_per_sec': round(total_bytes / (1024 * 1024) / total_seconds, 2) if total_seconds else None,
+        }
+        if not args.no_rss:
+            summary.update(measure_rss(backend))
+        results[backend] = {'summary': summary, 'files': files}
+
+        print('-' * 88)
+        rss = (f", RSS: {summary['baseline_mb']} MB po imporcie -> {summary['peak_mb']} MB szczytowo"
+               if 'peak_mb' in summary else '')
+        print(f"Razem: {summary['pages_per_sec']} stron/s, {summary['mb_per_sec']} MB/s{rss}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        print(f"\n❌ Wierność poniżej {args.min_fidelity:.0%}: {', '.join(regressions)}")
+        return 1
+
+    print(f"\n✅ Wszystkie pliki z warstwą tekstową powyżej progu wierności {args.min_fidelity:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
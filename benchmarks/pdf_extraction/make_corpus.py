@@ -0,0 +1,252 @@
+"""
+Generator korpusu CV w PDF do benchmarku ekstrakcji tekstu (benchmarks/pdf_extraction/bench.py).
+
+Uruchomienie (z katalogu głównego repozytorium):
+    python benchmarks/pdf_extraction/make_corpus.py [--font /ścieżka/do/czcionki.ttf]
+
+Tworzy w corpus/ pliki PDF o różnych kształtach spotykanych w przesyłanych CV:
+- base14_*       - standardowa Helvetica bez osadzania, tekst bez polskich znaków,
+- embedded_pl_*  - osadzona czcionka TTF, polskie znaki diakrytyczne,
+- two_column_*   - układ dwukolumnowy (boczny pasek z umiejętnościami),
+- latex_like_*   - producent "pdfTeX" (silnik od razu wybiera PDFMiner),
+- scanned_like_* - strony jako obraz, bez warstwy tekstowej,
+oraz manifest.json z tekstem oczekiwanym dla każdego pliku.
+Treść jest losowana z ustalonym ziarnem, więc korpus jest powtarzalny.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+MANIFEST = 'manifest.json'
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 50
+LINE_HEIGHT = 15
+FONT_SIZE = 10
+POLISH_CHARS = 'ąćęłńóśźżĄĆĘŁŃÓŚŹŻ'
+TRANSLITERATION = str.maketrans(POLISH_CHARS, 'acelnoszzACELNOSZZ')
+
+# Czcionki z polskimi znakami szukane, gdy nie podano --font
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    '/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf',
+    '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+)
+
+FIRST_NAMES = ('Łukasz', 'Małgorzata', 'Paweł', 'Agnieszka', 'Grzegorz', 'Żaneta', 'Michał', 'Beata')
+LAST_NAMES = ('Wiśniewski', 'Zając', 'Kowalczyk', 'Dąbrowska', 'Szymański', 'Woźniak', 'Łęcka')
+ROLES = ('Starszy programista Python', 'Analityk danych', 'Kierownik projektów IT',
+         'Specjalista ds. rekrutacji', 'Księgowa', 'Inżynier DevOps', 'Tester oprogramowania')
+COMPANIES = ('Żabka Polska', 'Orlen Spółka Akcyjna', 'Bank Pekao', 'Allegro', 'Comarch',
+             'Asseco Poland', 'Grupa Łódzka', 'Politechnika Śląska')
+ACHIEVEMENTS = (
+    'Zarządzanie zespołem {n} osób i odpowiedzialność za terminowe wdrożenia',
+    'Skrócenie czasu przetwarzania raportów o {n}% dzięki optymalizacji zapytań SQL',
+    'Współpraca z działem sprzedaży przy wdrażaniu nowych usług dla klientów',
+    'Przygotowanie dokumentacji technicznej i szkoleń dla użytkowników końcowych',
+    'Automatyzacja testów regresyjnych, co zmniejszyło liczbę błędów o {n}%',
+    'Migracja usług do chmury i utrzymanie ciągłości działania systemów',
+    'Obsługa zgłoszeń klientów oraz analiza przyczyn źródłowych problemów',
+    'Budżetowanie projektów o wartości {n} mln zł i raportowanie do zarządu',
+)
+SKILLS = ('Python', 'SQL', 'Docker', 'Kubernetes', 'Excel', 'Power BI', 'Jira', 'Git',
+          'Zarządzanie projektami', 'Komunikacja', 'Negocjacje', 'Analiza biznesowa')
+SCHOOLS = ('Uniwersytet Warszawski, informatyka', 'Politechnika Łódzka, zarządzanie',
+           'Akademia Górniczo-Hutnicza, automatyka', 'Uniwersytet Ekonomiczny w Poznaniu, finanse')
+
+
+def find_font(path=None):
+    if path:
+        return path
+    for candidate in FONT_CANDIDATES + tuple(sorted(glob.glob('/usr/share/fonts/**/*.ttf', recursive=True))):
+        if os.path.isfile(candidate):
+            try:
+                face = TTFont('probe', candidate).face
+            except Exception:
+                continue
+            if all(ord(char) in face.charToGlyph for char in POLISH_CHARS):
+                return candidate
+    return None
+
+
+def cv_lines(rng, target_lines):
+    """Linie CV: nagłówek, podsumowanie, doświadczenie (dopełniane do target_lines), wykształcenie"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{rng.choice(ROLES)} | kontakt@przyklad.pl | +48 600 {rng.randint(100, 999)} {rng.randint(100, 999)}",
+        '',
+        'PODSUMOWANIE',
+        f"Doświadczony specjalista z {rng.randint(3, 15)}-letnim stażem w branży, nastawiony na wyniki.",
+        '',
+        'DOŚWIADCZENIE ZAWODOWE',
+    ]
+    tail = ['', 'WYKSZTAŁCENIE', rng.choice(SCHOOLS), '', 'UMIEJĘTNOŚCI', ', '.join(rng.sample(SKILLS, 6))]
+    # Wpis to maks. 5 linii (stanowisko + do 4 osiągnięć) - dokument mieści się w zadanej liczbie stron
+    while len(lines) + len(tail) + 5 <= target_lines:
+        start = rng.randint(2005, 2020)
+        lines.append(f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({start}-{start + rng.randint(1, 4)})")
+        for _ in range(rng.randint(2, 4)):
+            lines.append('- ' + rng.choice(ACHIEVEMENTS).format(n=rng.randint(5, 60)))
+    return lines + tail
+
+
+def lines_per_page():
+    return int((PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT)
+
+
+def new_canvas(buffer, producer=None):
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    pdf.setAuthor('CV benchmark')
+    if producer:
+        pdf.setProducer(producer)
+        pdf.setCreator(producer)
+    return pdf
+
+
+def draw_single_column(pages, font, transliterate=False, producer=None, seed=0):
+    rng = random.Random(seed)
+    lines = cv_lines(rng, pages * lines_per_page())
+    if transliterate:
+        lines = [line.translate(TRANSLITERATION) for line in lines]
+
+    buffer = io.BytesIO()
+    pdf = new_canvas(buffer, producer)
+    per_page = lines_per_page()
+    for page_start in range(0, len(lines), per_page):
+        pdf.setFont(font, FONT_SIZE)
+        y = PAGE_HEIGHT - MARGIN
+        for line in lines[page_start:page_start + per_page]:
+            pdf.drawString(MARGIN, y, line)
+            y -= LINE_HEIGHT
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue(), lines
+
+
+def draw_two_column(pages, font, seed=0):
+    """Boczny pasek (umiejętności, języki) i główna kolumna z doświadczeniem na każdej stronie"""
+    rng = random.Random(seed)
+    per_page = lines_per_page()
+    main_lines = cv_lines(rng, pages * per_page)
+    sidebar_x, sidebar_width, main_x = MARGIN, 140, MARGIN + 160
+
+    buffer = io.BytesIO()
+    pdf = new_canvas(buffer)
+    expected = []
+    for page in range(pages):
+        sidebar = ['KONTAKT', 'kontakt@przyklad.pl', '', 'UMIEJĘTNOŚCI'] + rng.sample(SKILLS, 8) + \
+                  ['', 'JĘZYKI', 'angielski C1', 'niemiecki B1']
+        main = main_lines[page * per_page:(page + 1) * per_page]
+        pdf.setFillGray(0.92)
+        pdf.rect(sidebar_x - 10, MARGIN - 10, sidebar_width + 10, PAGE_HEIGHT - 2 * MARGIN + 20, stroke=0, fill=1)
+        pdf.setFillGray(0)
+        pdf.setFont(font, FONT_SIZE - 1)
+        for index, line in enumerate(sidebar):
+            pdf.drawString(sidebar_x, PAGE_HEIGHT - MARGIN - index * LINE_HEIGHT, line)
+        for index, line in enumerate(main):
+            pdf.drawString(main_x, PAGE_HEIGHT - MARGIN - index * LINE_HEIGHT, line[:70])
+        pdf.showPage()
+        expected.extend(sidebar + [line[:70] for line in main])
+    pdf.save()
+    return buffer.getvalue(), expected
+
+
+def draw_scanned_like(pages, seed=0):
+    """Strony jako obrazy w odcieniach szarości z szumem - brak warstwy tekstowej, jak w skanie"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    lines = cv_lines(rng, pages * lines_per_page())
+    per_page = lines_per_page()
+    scale = 150 / 72  # 150 DPI
+
+    buffer = io.BytesIO()
+    pdf = new_canvas(buffer)
+    for page_start in range(0, len(lines), per_page):
+        image = Image.new('L', (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 250)
+        draw = ImageDraw.Draw(image)
+        for index, line in enumerate(lines[page_start:page_start + per_page]):
+            draw.text((MARGIN * scale, (MARGIN + index * LINE_HEIGHT) * scale),
+                      line.translate(TRANSLITERATION), fill=rng.randint(10, 60))
+        for _ in range(4000):
+            draw.point((rng.randrange(image.width), rng.randrange(image.height)), fill=rng.randint(120, 200))
+        image = image.rotate(rng.uniform(-0.8, 0.8), fillcolor=250).filter(ImageFilter.GaussianBlur(0.6))
+        pdf.drawImage(ImageReader(image), 0, 0, PAGE_WIDTH, PAGE_HEIGHT)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue(), lines
+
+
+def build_corpus(font_path=None, output_dir=CORPUS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    font_path = find_font(font_path)
+    if font_path:
+        pdfmetrics.registerFont(TTFont('CVBenchSans', font_path))
+        unicode_font = 'CVBenchSans'
+    else:
+        print("⚠️ Nie znaleziono czcionki TTF z polskimi znakami (użyj --font) - "
+              "pomijam pliki z osadzoną czcionką")
+        unicode_font = None
+
+    documents = []
+    for pages in (1, 3, 10):
+        documents.append((f'base14_{pages}p', 'base14',
+                          lambda p=pages: draw_single_column(p, 'Helvetica', transliterate=True, seed=p)))
+    if unicode_font:
+        for pages in (1, 2, 5):
+            documents.append((f'embedded_pl_{pages}p', 'embedded',
+                              lambda p=pages: draw_single_column(p, unicode_font, seed=10 + p)))
+        for pages in (1, 3):
+            documents.append((f'two_column_{pages}p', 'two_column',
+                              lambda p=pages: draw_two_column(p, unicode_font, seed=20 + p)))
+        documents.append(('latex_like_2p', 'latex_like',
+                          lambda: draw_single_column(2, unicode_font, producer='pdfTeX-1.40.25', seed=30)))
+    for pages in (1, 2):
+        documents.append((f'scanned_like_{pages}p', 'scanned_like',
+                          lambda p=pages: draw_scanned_like(p, seed=40 + p)))
+
+    manifest = {}
+    for name, shape, build in documents:
+        data, lines = build()
+        filename = f'{name}.pdf'
+        with open(os.path.join(output_dir, filename), 'wb') as f:
+            f.write(data)
+        manifest[filename] = {
+            'shape': shape,
+            'expected_text': '\n'.join(lines),
+            # Skan nie ma warstwy tekstowej - oczekujemy pustego wyniku i niskiej oceny jakości
+            'has_text_layer': shape != 'scanned_like',
+        }
+        print(f"{filename:<22} {len(data) / 1024:8.1f} KB")
+
+    with open(os.path.join(output_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'font': os.path.basename(font_path) if font_path else None, 'documents': manifest},
+                  f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--font', help='czcionka TTF z polskimi znakami do plików z osadzoną czcionką')
+    parser.add_argument('--output', default=CORPUS_DIR)
+    args = parser.parse_args()
+    build_corpus(args.font, args.output)
+
+
+if __name__ == '__main__':
+    main()
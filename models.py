@@ -103,10 +103,36 @@ class CVUpload(db.Model):
     job_title = db.Column(db.String(200))
     job_description = db.Column(db.Text)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 przesłanego pliku lub wklejonego tekstu
+    validation_data = db.Column(db.Text)  # JSON: ostrzeżenia i sugestie walidatora
+    structured_data = db.Column(db.Text)  # JSON: utils.cv_structure.parse_cv_document (sekcje z przesunięciami)
+    upload_count = db.Column(db.Integer, default=1)
     
     # Relationships
     analysis_results = db.relationship('AnalysisResult', backref='cv_upload', lazy=True, cascade='all, delete-orphan')
     
+    @staticmethod
+    def _load_json(value):
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    
+    def get_validation(self):
+        """Zapisany wynik walidacji (tylko CV, które ją przeszły, trafiają do bazy)"""
+        return self._load_json(self.validation_data)
+    
+    def get_structure(self):
+        """Struktura CV wyliczona przy przesłaniu; None dla starszych wpisów (bez struktury lub w starej wersji)"""
+        from utils.cv_structure import STRUCTURE_VERSION
+        
+        document = self._load_json(self.structured_data)
+        if document is None or document.get('version') != STRUCTURE_VERSION:
+            return None
+        return document
+    
     def __repr__(self):
         return f'<CVUpload {self.filename}>'
 
@@ -128,3 +154,145 @@ class AnalysisResult(db.Model):
     
     def __repr__(self):
         return f'<AnalysisResult {self.analysis_type}>'
+
+class JobPosting(db.Model):
+    """Ogłoszenie o pracę współdzielone przez wszystkich użytkowników (analiza po stronie oferty)"""
+    __tablename__ = 'job_postings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    normalized_url = db.Column(db.String(1000), unique=True, index=True)
+    text_hash = db.Column(db.String(64), nullable=False, index=True)
+    # Skrót wklejonego opisu (tylko oferty bez URL) - unikalny, żeby równoległe żądania nie tworzyły duplikatów
+    pasted_text_hash = db.Column(db.String(64), unique=True, index=True)
+    title = db.Column(db.String(300))
+    company = db.Column(db.String(200))
+    description = db.Column(db.Text, nullable=False)
+    summary = db.Column(db.Text)
+    source = db.Column(db.String(20))
+    requirements = db.Column(db.Text)  # JSON: lista wymagań
+    keywords = db.Column(db.Text)  # JSON: lista słów kluczowych
+    analysis = db.Column(db.Text)  # JSON: {język: wynik analyze_polish_job_posting}
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def _load_json(value, default):
+        if not value:
+            return default
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return default
+    
+    def get_requirements(self):
+        return self._load_json(self.requirements, [])
+    
+    def get_keywords(self):
+        return self._load_json(self.keywords, [])
+    
+    def get_analysis(self, language='pl'):
+        """Zapisana analiza AI dla danego języka lub None"""
+        return self._load_json(self.analysis, {}).get(language)
+    
+    def set_analysis(self, language, analysis):
+        analyses = self._load_json(self.analysis, {})
+        analyses[language] = analysis
+        self.analysis = json.dumps(analyses, ensure_ascii=False)
+    
+    def is_stale(self, max_age):
+        """Czy treść pobrana z URL wymaga odświeżenia (max_age jako timedelta)"""
+        if not self.normalized_url:
+            return False  # Opis wklejony ręcznie nie zmienia się
+        return not self.fetched_at or datetime.utcnow() - self.fetched_at > max_age
+    
+    def __repr__(self):
+        return f'<JobPosting {self.title or self.normalized_url or self.id}>'
+
+
+class CVContentCatalogEntry(db.Model):
+    """
+    Ogólna treść CV (bez danych konkretnej osoby) dla kombinacji stanowisko/poziom/branża.
+    Wpis powstaje przy pierwszym żądaniu (liczone w request_count), treść generuje
+    wsadowo `flask refresh-cv-catalog` dla najczęściej wybieranych kombinacji.
+    """
+    __tablename__ = 'cv_content_catalog'
+
+    id = db.Column(db.Integer, primary_key=True)
+    combo_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    target_position = db.Column(db.String(200), nullable=False)
+    experience_level = db.Column(db.String(20), nullable=False)
+    industry = db.Column(db.String(200))
+    language = db.Column(db.String(5), default='pl')
+    content = db.Column(db.Text)  # JSON: wynik generate_generic_cv_content (None - jeszcze nie wygenerowano)
+    request_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    generated_at = db.Column(db.DateTime)
+
+    def get_content(self):
+        if not self.content:
+            return None
+        try:
+            return json.loads(self.content)
+        except json.JSONDecodeError:
+            return None
+
+    def set_content(self, content):
+        self.content = json.dumps(content, ensure_ascii=False)
+        self.generated_at = datetime.utcnow()
+
+    def __repr__(self):
+        return f'<CVContentCatalogEntry {self.target_position}/{self.experience_level}/{self.industry}>'
+
+
+def ensure_schema():
+    """
+    Dodaje brakujące kolumny do istniejących tabel (db.create_all tworzy tylko nowe tabele).
+    Obsługuje wyłącznie dodawanie kolumn dopuszczających NULL (z indeksem, także unikalnym) -
+    wystarcza dla rozbudowy modeli.
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                if column.index or column.unique:
+                    unique = 'UNIQUE ' if column.unique else ''
+                    connection.execute(db.text(
+                        f'CREATE {unique}INDEX IF NOT EXISTS ix_{table.name}_{column.name} '
+                        f'ON {table.name} ({column.name})'))
+            print(f"✅ Added column {table.name}.{column.name}")
+
+
+class SessionRecord(db.Model):
+    """Sesja po stronie serwera (utils/server_session.py) - w cookie zostaje tylko podpisany identyfikator"""
+    __tablename__ = 'server_sessions'
+
+    id = db.Column(db.String(64), primary_key=True)  # SHA-256 identyfikatora z cookie
+    data = db.Column(db.Text, nullable=False)  # dane sesji w formacie flask.sessions (tagged JSON)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SessionRecord {self.id[:8]}>'
+
+
+class RateLimitCounter(db.Model):
+    """Licznik okna limitu żądań (utils/rate_limiter.py) wspólny dla procesów i serwerów"""
+    __tablename__ = 'rate_limit_counters'
+
+    key = db.Column(db.String(200), primary_key=True)  # identyfikator:typ limitu
+    window_start = db.Column(db.Integer, primary_key=True)  # początek okna (sekundy epoki)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)  # po tym czasie okno nie wpływa na limit
+
+    def __repr__(self):
+        return f'<RateLimitCounter {self.key}@{self.window_start}={self.hits}>'
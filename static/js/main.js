@@ -31,6 +31,10 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Store CV text
     let cvText = '';
+    // Server keeps the full CV - requests send only ids unless the user edited the text
+    let cvUploadId = null;
+    let uploadedCvText = '';
+    let lastResultId = null;
 
     // Handle CV upload form submission
     if (cvUploadForm) {
@@ -77,6 +81,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (data.success) {
                     // Store the CV text
                     cvText = data.cv_text;
+                    uploadedCvText = data.cv_text;
+                    cvUploadId = data.cv_upload_id || null;
+                    lastResultId = null;
 
                     // Display the CV text in the preview
                     if (cvPreview) cvPreview.innerHTML = formatTextAsHtml(cvText);
@@ -220,7 +227,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
             // Prepare request data
             const requestData = {
-                cv_text: cvText,
+                cv_upload_id: cvUploadId,
+                cv_text: cvText !== uploadedCvText ? cvText : undefined,
                 job_title: jobTitle,
                 job_description: jobDescription,
                 job_url: jobUrl,
@@ -252,6 +260,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (data.success) {
                     // Display the result
                     if (resultContainer) resultContainer.innerHTML = formatTextAsHtml(data.result);
+                    lastResultId = data.result_id || lastResultId;
 
                     // If job description was extracted from URL, update the input
                     if (data.job_description && jobDescriptionInput) {
@@ -348,7 +357,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Compare CV versions button click
     if (compareVersionsBtn) {
         compareVersionsBtn.addEventListener('click', function() {
-            fetch('/compare-cv-versions')
+            const params = new URLSearchParams();
+            if (cvUploadId) params.set('cv_upload_id', cvUploadId);
+            if (lastResultId) params.set('result_id', lastResultId);
+            fetch(`/compare-cv-versions?${params}`)
             .then(response => response.json())
             .then(data => {
                 if (data.success && data.has_both_versions) {
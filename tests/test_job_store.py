@@ -0,0 +1,40 @@
+import utils.openrouter_api
+from utils.job_store import JobStore, normalize_job_url, parse_json_object
+
+
+def test_tracking_params_are_removed():
+    assert (normalize_job_url('https://www.pracuj.pl/praca/oferta,123/?utm_source=x&utm_campaign=y&ref=mail&gclid=1#top')
+            == 'https://pracuj.pl/praca/oferta,123')
+
+
+def test_params_starting_like_tracking_params_are_kept():
+    first = normalize_job_url('https://example.com/job?refNo=1001&ref=newsletter')
+    second = normalize_job_url('https://example.com/job?refNo=1002&ref=newsletter')
+    assert first == 'https://example.com/job?refNo=1001'
+    assert first != second
+    assert normalize_job_url('https://example.com/job?sourceId=7&src_offer=3&reference=A1') == \
+        'https://example.com/job?reference=A1&sourceId=7&src_offer=3'
+
+
+class FakePosting:
+    description = 'Księgowa, Warszawa'
+
+    def __init__(self):
+        self.analyses = {}
+
+    def get_analysis(self, language):
+        return self.analyses.get(language)
+
+    def set_analysis(self, language, analysis):
+        self.analyses[language] = analysis
+
+
+def test_prose_analysis_is_not_stored(monkeypatch):
+    monkeypatch.setattr(utils.openrouter_api, 'analyze_polish_job_posting',
+                        lambda description, language: 'Sorry, here is prose')
+    posting = FakePosting()
+
+    assert parse_json_object('Sorry, here is prose') is None
+    assert parse_json_object('Wynik: {"level": "mid"}') == {'level': 'mid'}
+    assert JobStore().ensure_analysis(posting) == {'analysis': 'Sorry, here is prose'}
+    assert posting.analyses == {}
@@ -0,0 +1,44 @@
+from flask import Flask, session
+from sqlalchemy import event
+
+from models import db
+from utils.server_session import DatabaseSessionInterface
+
+
+def make_app(tmp_path):
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'app.css').write_text('body {}')
+
+    app = Flask(__name__, static_folder=str(static))
+    app.secret_key = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'sessions.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    app.session_interface = DatabaseSessionInterface(db)
+
+    @app.route('/login')
+    def login():
+        session['_user_id'] = '1'
+        return 'ok'
+
+    return app
+
+
+def test_static_request_does_not_query_sessions(tmp_path):
+    app = make_app(tmp_path)
+    client = app.test_client()
+    client.get('/login')
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = client.get('/static/app.css')
+    assert response.status_code == 200
+    assert not [statement for statement in statements if 'server_sessions' in statement]
+
+    client.get('/login')
+    assert [statement for statement in statements if 'server_sessions' in statement]
@@ -0,0 +1,189 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, CVContentCatalogEntry
+from utils.cache import content_hash
+from utils.job_store import parse_json_object
+
+logger = logging.getLogger(__name__)
+
+CV_CATALOG_ENABLED = os.environ.get('CV_CATALOG_ENABLED', 'true').lower() == 'true'
+# Po tym czasie treść w katalogu jest generowana ponownie przy odświeżaniu wsadowym
+CV_CATALOG_MAX_AGE = timedelta(days=int(os.environ.get('CV_CATALOG_MAX_AGE_DAYS', '30')))
+CV_CATALOG_REFRESH_LIMIT = int(os.environ.get('CV_CATALOG_REFRESH_LIMIT', '50'))
+
+EXPERIENCE_LEVELS = ('junior', 'mid', 'senior')
+# Pola wyniku generate_complete_cv_content, które katalog musi dostarczyć
+CONTENT_FIELDS = ('professional_title', 'professional_summary', 'experience_suggestions',
+                  'education_suggestions', 'skills_list')
+
+
+def normalize_combo(target_position, experience_level, industry, language='pl'):
+    """Kombinacja w postaci kanonicznej: małe litery, pojedyncze spacje, znany poziom doświadczenia"""
+    level = (experience_level or '').strip().lower()
+    return (
+        ' '.join((target_position or '').lower().split())[:200],
+        level if level in EXPERIENCE_LEVELS else 'junior',
+        ' '.join((industry or '').lower().split())[:200],
+        language,
+    )
+
+
+class CVContentGenerationFailed(Exception):
+    """Odpowiedź AI nie zawiera kompletnej treści CV"""
+
+
+def parse_content(ai_result):
+    """Słownik z odpowiedzi AI albo None, gdy brakuje wymaganych pól"""
+    content = parse_json_object(ai_result)
+    if content is None or not all(field in content for field in CONTENT_FIELDS):
+        return None
+    return {field: content[field] for field in CONTENT_FIELDS}
+
+
+class CVContentCatalog:
+    """
+    Katalog ogólnej treści AI CV dla kombinacji stanowisko/poziom/branża.
+    Tytuł, wykształcenie i umiejętności nie zależą od użytkownika, więc są generowane
+    raz (wsadowo, poza żądaniami) i przy żądaniu zostaje tylko krótkie dopasowanie
+    podsumowania i doświadczenia do opisu użytkownika (personalize_cv_content).
+    Kombinacje spoza katalogu są generowane pełnym zapytaniem jak dotąd.
+    """
+
+    def __init__(self, enabled=CV_CATALOG_ENABLED, max_age=CV_CATALOG_MAX_AGE):
+        self.enabled = enabled
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stats = {'catalog_hits': 0, 'personalized': 0, 'personalize_failures': 0, 'full_generations': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _record_request(self, combo, amount=1):
+        """Wpis katalogu dla kombinacji (tworzony przy pierwszym żądaniu) z licznikiem zwiększonym o amount"""
+        target_position, experience_level, industry, language = combo
+        combo_key = content_hash(*combo)
+        entry = CVContentCatalogEntry.query.filter_by(combo_key=combo_key).first()
+        if entry is None:
+            entry = CVContentCatalogEntry(combo_key=combo_key, target_position=target_position,
+                                          experience_level=experience_level, industry=industry,
+                                          language=language, request_count=0)
+            try:
+                db.session.add(entry)
+                db.session.commit()
+            except IntegrityError:
+                # Równoległe pierwsze żądanie utworzyło już wpis
+                db.session.rollback()
+                entry = CVContentCatalogEntry.query.filter_by(combo_key=combo_key).first()
+        if amount:
+            # Atomowo w bazie - równoległe żądania z różnych procesów nie gubią zliczeń
+            db.session.execute(
+                db.update(CVContentCatalogEntry)
+                .where(CVContentCatalogEntry.id == entry.id)
+                .values(request_count=db.func.coalesce(CVContentCatalogEntry.request_count, 0) + amount))
+            db.session.commit()
+        return entry
+
+    def _personalize(self, content, brief_background, combo):
+        from utils.openrouter_api import personalize_cv_content
+
+        target_position, experience_level, _, language = combo
+        try:
+            personalized = parse_json_object(
+                personalize_cv_content(content, brief_background, target_position, experience_level, language))
+        except Exception as e:
+            personalized = None
+            logger.warning(f"CV catalog personalization failed: {str(e)}")
+
+        if personalized is None or not personalized.get('professional_summary'):
+            # Treść z katalogu jest kompletnym CV - lepsza niż błąd
+            self._count('personalize_failures')
+            return content
+        self._count('personalized')
+        content = dict(content, professional_summary=personalized['professional_summary'])
+        if isinstance(personalized.get('experience_suggestions'), list):
+            content['experience_suggestions'] = personalized['experience_suggestions']
+        return content
+
+    def generate(self, target_position, experience_level, industry, brief_background, language='pl'):
+        """
+        Treść CV w formacie generate_complete_cv_content (słownik). Z katalogu, gdy
+        kombinacja ma już treść (także przeterminowaną - odświeża ją refresh), w przeciwnym
+        razie pełne zapytanie do AI. CVContentGenerationFailed, gdy odpowiedź AI jest niekompletna.
+        """
+        from utils.openrouter_api import generate_complete_cv_content
+
+        combo = normalize_combo(target_position, experience_level, industry, language)
+        if self.enabled:
+            entry = self._record_request(combo)
+            content = entry.get_content()
+            if content is not None:
+                self._count('catalog_hits')
+                if brief_background and brief_background.strip():
+                    return self._personalize(content, brief_background.strip(), combo)
+                return content
+
+        self._count('full_generations')
+        ai_cv_content = generate_complete_cv_content(
+            target_position=target_position,
+            experience_level=experience_level,
+            industry=industry,
+            brief_background=brief_background,
+            language=language)
+        content = parse_content(ai_cv_content)
+        if content is None:
+            raise CVContentGenerationFailed("AI nie zwróciło kompletnej treści CV")
+        return content
+
+    def refresh(self, limit=CV_CATALOG_REFRESH_LIMIT, seeds=()):
+        """
+        Wsadowe generowanie ogólnej treści dla najczęściej wybieranych kombinacji bez
+        aktualnej treści. seeds: dodatkowe kombinacje (stanowisko, poziom, branża) do
+        wygenerowania z góry. Zwraca {'generated': n, 'failed': n}.
+        """
+        from utils.openrouter_api import generate_generic_cv_content
+
+        for target_position, experience_level, industry in seeds:
+            # Zasiane kombinacje nie są prawdziwymi żądaniami - bez zwiększania licznika
+            self._record_request(normalize_combo(target_position, experience_level, industry), amount=0)
+
+        cutoff = datetime.utcnow() - self.max_age
+        candidates = (CVContentCatalogEntry.query
+                      .filter(db.or_(CVContentCatalogEntry.content.is_(None),
+                                     CVContentCatalogEntry.generated_at.is_(None),
+                                     CVContentCatalogEntry.generated_at < cutoff))
+                      .order_by(CVContentCatalogEntry.request_count.desc(), CVContentCatalogEntry.id)
+                      .limit(limit)
+                      .all())
+        result = {'generated': 0, 'failed': 0}
+        for entry in candidates:
+            try:
+                content = parse_content(generate_generic_cv_content(
+                    entry.target_position, entry.experience_level, entry.industry, entry.language or 'pl'))
+            except Exception as e:
+                content = None
+                logger.warning(f"CV catalog refresh failed for {entry!r}: {str(e)}")
+            if content is None:
+                result['failed'] += 1
+                continue
+            entry.set_content(content)
+            db.session.commit()
+            result['generated'] += 1
+            logger.info(f"CV catalog entry generated: {entry!r}")
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'enabled': self.enabled,
+            'entries': CVContentCatalogEntry.query.count(),
+            'ready': CVContentCatalogEntry.query.filter(CVContentCatalogEntry.content.isnot(None)).count(),
+        })
+        return stats
+
+
+cv_content_catalog = CVContentCatalog()
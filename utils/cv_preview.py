@@ -0,0 +1,362 @@
+import json
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from markupsafe import escape
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from utils.cache import TTLCache, content_hash
+from utils.cv_templates import TEMPLATE_SPECS, DEFAULT_TEMPLATE, NESTED_BLOCK_OPTIONS, compile_template, full_name, split_skills
+
+logger = logging.getLogger(__name__)
+
+# Zmienić przy zmianie generowanego HTML - fragmenty w cache i u klienta przestaną pasować
+PREVIEW_VERSION = 1
+
+PREVIEW_FRAGMENT_CACHE_SIZE = 4096
+PREVIEW_FRAGMENT_CACHE_TTL = 1800
+
+TEXT_ALIGN = {TA_CENTER: 'center', TA_RIGHT: 'right', TA_JUSTIFY: 'justify'}
+# Domyślne odstępy komórek tabel reportlab (pt)
+TABLE_CELL_PADDING = '3pt 6pt'
+
+
+# --- Style reportlab -> CSS ---------------------------------------------------------------
+# Style pochodzą z rejestru utils/cv_styles (obiekty żyją przez cały proces), więc
+# konwersję można zapamiętać po tożsamości obiektu.
+
+def color_css(color):
+    return '#' + color.hexval()[2:] if color is not None else 'inherit'
+
+
+def font_css(font_name):
+    family = "'Times New Roman', Times, serif" if font_name.startswith('Times') else 'Helvetica, Arial, sans-serif'
+    weight = 'bold' if 'Bold' in font_name else 'normal'
+    style = 'italic' if 'Oblique' in font_name or 'Italic' in font_name else 'normal'
+    return f"font-family:{family};font-weight:{weight};font-style:{style}"
+
+
+@lru_cache(maxsize=None)
+def paragraph_css(style):
+    css = [
+        font_css(style.fontName),
+        f"font-size:{style.fontSize}pt",
+        f"line-height:{style.leading}pt",
+        f"color:{color_css(style.textColor)}",
+        f"text-align:{TEXT_ALIGN.get(style.alignment, 'left')}",
+        f"margin:{style.spaceBefore}pt 0 {style.spaceAfter}pt 0",
+    ]
+    if style.leftIndent:
+        css.append(f"padding-left:{style.leftIndent}pt")
+    if style.borderWidth:
+        css.append(f"border:{style.borderWidth}pt solid {color_css(style.borderColor)};"
+                   f"padding:{style.borderPadding}pt")
+    return ';'.join(css)
+
+
+@lru_cache(maxsize=None)
+def table_cell_css(table_style):
+    """CSS komórek z poleceń TableStyle obejmujących całą tabelę (pozostałe są pomijane)"""
+    css = {'font': font_css('Helvetica'), 'font-size': 'font-size:10pt', 'padding': f"padding:{TABLE_CELL_PADDING}",
+           'vertical-align': 'vertical-align:bottom'}
+    for command in table_style.getCommands():
+        name, start, end = command[0], command[1], command[2]
+        if start != (0, 0) or end != (-1, -1):
+            continue
+        value = command[3]
+        if name == 'FONTNAME':
+            css['font'] = font_css(value)
+        elif name == 'FONTSIZE':
+            css['font-size'] = f"font-size:{value}pt"
+        elif name == 'TEXTCOLOR':
+            css['color'] = f"color:{color_css(value)}"
+        elif name == 'ALIGN':
+            css['text-align'] = f"text-align:{value.lower()}"
+        elif name == 'VALIGN':
+            css['vertical-align'] = f"vertical-align:{value.lower()}"
+        elif name == 'BOTTOMPADDING':
+            css['padding-bottom'] = f"padding-bottom:{value}pt"
+    return ';'.join(css.values())
+
+
+# --- Bloki HTML ---------------------------------------------------------------------------
+# Te same nazwy i opcje co bloki PDF w utils/cv_templates.py (kompilacja sprawdza zgodność
+# sygnatur), ale wynikiem jest fragment HTML. Tekst użytkownika jest zawsze escapowany.
+
+def paragraph(text, style):
+    return f'<p style="{paragraph_css(style)}">{text}</p>'
+
+
+def table_html(rows, table_style, widths):
+    cell_css = table_cell_css(table_style)
+    cols = ''.join(f'<col style="width:{width}pt">' for width in widths)
+    body = ''.join('<tr>' + ''.join(f'<td style="{cell_css}">{escape(cell)}</td>' for cell in row) + '</tr>'
+                   for row in rows)
+    return f'<table style="border-collapse:collapse;table-layout:fixed;width:100%"><colgroup>{cols}</colgroup>{body}</table>'
+
+
+def accent_bar_html(cv_data, width, height, color):
+    # Ujemna wysokość w PDF nie występuje, ale odstęp ujemny (spacer) owszem - patrz spacer_html
+    return f'<div style="height:{height}pt;background:{color_css(color)}"></div>'
+
+
+def spacer_html(cv_data, width, height):
+    if height < 0:
+        return f'<div style="margin-top:{height}pt"></div>'
+    return f'<div style="height:{height}pt"></div>'
+
+
+def name_html(cv_data, width, style):
+    # Nad paskiem akcentu (ujemny odstęp) tekst musi być nad tłem paska
+    return f'<p style="{paragraph_css(style)};position:relative">{escape(full_name(cv_data))}</p>'
+
+
+def job_title_html(cv_data, width, style):
+    job_title = cv_data.get('jobTitle', '')
+    return paragraph(escape(job_title), style) if job_title else ''
+
+
+def contact_columns_html(cv_data, width, fields, table_style, icons=MappingProxyType({})):
+    contact_info = [f"{icons.get(key, '')}{cv_data[key]}" for key in fields if cv_data.get(key)]
+    if not contact_info:
+        return ''
+    half = len(contact_info) // 2
+    left_col, right_col = contact_info[:half], contact_info[half:]
+    rows = [[left_col[i] if i < len(left_col) else '', right_col[i] if i < len(right_col) else '']
+            for i in range(max(len(left_col), len(right_col)))]
+    return table_html(rows, table_style, [width/2, width/2])
+
+
+def contact_row_html(cv_data, width, fields, table_style):
+    if not any(cv_data.get(key) for key in fields):
+        return ''
+    return table_html([[cv_data.get(key) or '' for key in fields]], table_style, [width/len(fields)]*len(fields))
+
+
+def contact_list_html(cv_data, width, heading, heading_style, style, fields, icons=MappingProxyType({})):
+    parts = [paragraph(escape(heading), heading_style)]
+    for key in fields:
+        if cv_data.get(key):
+            parts.append(paragraph(escape(f"{icons.get(key, '')}{cv_data[key]}"), style))
+    return ''.join(parts)
+
+
+def contact_line_html(cv_data, width, fields, style, separator=' | '):
+    contact_info = [cv_data[key] for key in fields if cv_data.get(key)]
+    return paragraph(escape(separator.join(contact_info)), style) if contact_info else ''
+
+
+def summary_html(cv_data, width, heading, heading_style, style, divider_height=None,
+                 divider_color=None, divider_gap=0, gap_after=None):
+    if not cv_data.get('summary'):
+        return ''
+    parts = []
+    if divider_height:
+        parts += [accent_bar_html(cv_data, width, divider_height, divider_color),
+                  spacer_html(cv_data, width, divider_gap)]
+    parts += [paragraph(escape(heading), heading_style), paragraph(escape(cv_data['summary']), style)]
+    if gap_after:
+        parts.append(spacer_html(cv_data, width, gap_after))
+    return ''.join(parts)
+
+
+def experience_html(cv_data, width, heading, heading_style, date_style, description_style,
+                    header_style=None, title_style=None, company_style=None, bullet='', gap_after=None):
+    entries = [exp for exp in cv_data.get('experiences') or [] if exp.get('title') or exp.get('company')]
+    if not entries:
+        return ''
+
+    parts = [paragraph(escape(heading), heading_style)]
+    for exp in entries:
+        title = escape(exp.get('title', 'Stanowisko'))
+        company = escape(exp.get('company', 'Firma'))
+        if header_style:
+            parts.append(paragraph(f"<b>{title}</b> - {company}", header_style))
+        else:
+            parts += [paragraph(title, title_style), paragraph(company, company_style)]
+        if exp.get('startDate'):
+            parts.append(paragraph(escape(f"{exp['startDate']} - {exp.get('endDate', 'obecnie')}"), date_style))
+        if exp.get('description'):
+            parts.append(paragraph(escape(f"{bullet}{exp['description']}"), description_style))
+        if gap_after:
+            parts.append(spacer_html(cv_data, width, gap_after))
+    return ''.join(parts)
+
+
+def education_html(cv_data, width, heading, heading_style, style, year_style, gap_after=None):
+    entries = [edu for edu in cv_data.get('education') or [] if edu.get('degree') or edu.get('school')]
+    if not entries:
+        return ''
+
+    parts = [paragraph(escape(heading), heading_style)]
+    for edu in entries:
+        parts.append(paragraph(f"<b>{escape(edu.get('degree', 'Kierunek'))}</b> - "
+                               f"{escape(edu.get('school', 'Uczelnia'))}", style))
+        start_year = edu.get('startYear', '')
+        end_year = edu.get('endYear', '')
+        if start_year or end_year:
+            parts.append(paragraph(escape(f"{start_year} - {end_year}"), year_style))
+        if gap_after:
+            parts.append(spacer_html(cv_data, width, gap_after))
+    return ''.join(parts)
+
+
+def skills_grid_html(cv_data, width, heading, heading_style, table_style, columns=3, bullet='• '):
+    if not cv_data.get('skills'):
+        return ''
+    skills_list = split_skills(cv_data)
+    rows = []
+    for i in range(0, len(skills_list), columns):
+        row = skills_list[i:i + columns]
+        row += [''] * (columns - len(row))
+        rows.append([f"{bullet}{skill}" if skill else '' for skill in row])
+    table = table_html(rows, table_style, [width/columns]*columns) if rows else ''
+    return paragraph(escape(heading), heading_style) + table
+
+
+def skills_inline_html(cv_data, width, heading, heading_style, style, separator=' • '):
+    if not cv_data.get('skills'):
+        return ''
+    return paragraph(escape(heading), heading_style) + paragraph(escape(separator.join(split_skills(cv_data))), style)
+
+
+def columns_html(cv_data, width, left, right, widths, table_style):
+    left_width, right_width = width * widths[0], width * widths[1]
+    left_html = ''.join(step(cv_data, left_width) for step in left)
+    right_html = ''.join(step(cv_data, right_width) for step in right)
+    if not left_html and not right_html:
+        return ''
+    return (f'<div style="display:flex;align-items:flex-start">'
+            f'<div style="flex:0 0 {left_width}pt;padding-right:6pt;box-sizing:border-box">{left_html}</div>'
+            f'<div style="flex:0 0 {right_width}pt;padding-left:6pt;box-sizing:border-box">{right_html}</div></div>')
+
+
+HTML_BLOCK_FACTORIES = MappingProxyType({
+    'accent_bar': accent_bar_html,
+    'spacer': spacer_html,
+    'name': name_html,
+    'job_title': job_title_html,
+    'contact_columns': contact_columns_html,
+    'contact_row': contact_row_html,
+    'contact_list': contact_list_html,
+    'contact_line': contact_line_html,
+    'summary': summary_html,
+    'experience': experience_html,
+    'education': education_html,
+    'skills_grid': skills_grid_html,
+    'skills_inline': skills_inline_html,
+    'columns': columns_html,
+})
+BLOCK_TYPES = MappingProxyType({factory: block_type for block_type, factory in HTML_BLOCK_FACTORIES.items()})
+
+# Pola cv_data, od których zależy blok (bloki kontaktowe biorą je z opcji 'fields')
+BLOCK_DATA_FIELDS = {
+    'name': ('firstName', 'lastName'),
+    'job_title': ('jobTitle',),
+    'summary': ('summary',),
+    'experience': ('experiences',),
+    'education': ('education',),
+    'skills_grid': ('skills',),
+    'skills_inline': ('skills',),
+}
+
+# Pola będące listą wpisów (słowników) - pozostałe pola cv_data są tekstem
+ENTRY_LIST_FIELDS = ('experiences', 'education')
+
+
+def step_fields(step):
+    """Pola cv_data, które wpływają na wynik bloku - klucz cache fragmentu"""
+    block_type = BLOCK_TYPES[step.func]
+    if 'fields' in step.keywords:
+        return tuple(step.keywords['fields'])
+    fields = list(BLOCK_DATA_FIELDS.get(block_type, ()))
+    for option in NESTED_BLOCK_OPTIONS:
+        for nested in step.keywords.get(option, ()):
+            fields.extend(step_fields(nested))
+    return tuple(dict.fromkeys(fields))
+
+
+def compile_preview(template_name, spec):
+    plan = compile_template(template_name, spec, factories=HTML_BLOCK_FACTORIES)
+    pagesize, margin = plan['pagesize'], plan['margins']
+    return MappingProxyType({
+        'name': template_name,
+        'page_width': pagesize[0],
+        'page_height': pagesize[1],
+        'margins': margin,
+        'width': pagesize[0] - 2 * margin,
+        'fragments': tuple((f"{template_name}-{index}", step, step_fields(step))
+                           for index, step in enumerate(plan['steps'])),
+    })
+
+
+# Te same specyfikacje co PDF, skompilowane raz do bloków HTML
+PREVIEW_PLANS = MappingProxyType({name: compile_preview(name, spec) for name, spec in TEMPLATE_SPECS.items()})
+PREVIEW_FIELDS = frozenset(field for plan in PREVIEW_PLANS.values()
+                           for _, _, fields in plan['fragments'] for field in fields)
+
+
+def validate_preview_data(cv_data):
+    """Komunikat błędu dla pól, których bloki podglądu nie obsłużą, albo None"""
+    for field in PREVIEW_FIELDS:
+        value = cv_data.get(field)
+        if value is None:
+            continue
+        if field in ENTRY_LIST_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(entry, dict) for entry in value):
+                return f"Pole '{field}' musi być listą wpisów"
+        elif not isinstance(value, str):
+            return f"Pole '{field}' musi być tekstem"
+    return None
+
+
+class CVPreviewRenderer:
+    """
+    Szybki podgląd CV w HTML z tej samej specyfikacji szablonu co PDF (bez reportlab).
+    Podgląd składa się z fragmentów - po jednym na blok szablonu. Fragment jest
+    identyfikowany skrótem pól cv_data, od których zależy, więc:
+    - niezmienione sekcje są brane z cache zamiast generowane ponownie,
+    - klient, który zna już skrót fragmentu, nie dostaje ponownie jego HTML.
+    """
+
+    def __init__(self, cache_size=PREVIEW_FRAGMENT_CACHE_SIZE, cache_ttl=PREVIEW_FRAGMENT_CACHE_TTL):
+        self.fragments = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def page_style(self, plan):
+        return (f"width:{plan['page_width']}pt;min-height:{plan['page_height']}pt;"
+                f"padding:{plan['margins']}pt;box-sizing:border-box;background:#fff;"
+                f"font-family:Helvetica, Arial, sans-serif;font-size:10pt;color:#000;overflow:hidden")
+
+    def render(self, cv_data, template=DEFAULT_TEMPLATE, known=None):
+        """
+        {'template', 'page': {...}, 'fragments': [{'id', 'hash', 'html'?}]}
+        known: {id fragmentu: skrót} fragmentów, które klient już ma - dla nich 'html' jest pomijany.
+        """
+        plan = PREVIEW_PLANS.get(template) or PREVIEW_PLANS[DEFAULT_TEMPLATE]
+        known = known or {}
+        fragments = []
+        for fragment_id, step, fields in plan['fragments']:
+            data = {field: cv_data[field] for field in fields if field in cv_data}
+            digest = content_hash('cv-preview', PREVIEW_VERSION, fragment_id,
+                                  json.dumps(data, sort_keys=True, ensure_ascii=False, default=str))[:16]
+            fragment = {'id': fragment_id, 'hash': digest}
+            if known.get(fragment_id) != digest:
+                fragment['html'] = self.fragments.get_or_set(digest, lambda: step(data, plan['width']))
+            fragments.append(fragment)
+
+        return {
+            'template': plan['name'],
+            'page': {'width_pt': plan['page_width'], 'style': self.page_style(plan)},
+            'fragments': fragments,
+        }
+
+    def render_html(self, cv_data, template=DEFAULT_TEMPLATE):
+        """Cały podgląd jako jeden dokument HTML (np. do podglądu bez JS)"""
+        preview = self.render(cv_data, template)
+        body = ''.join(fragment['html'] for fragment in preview['fragments'])
+        return f'<div class="cv-page" style="{preview["page"]["style"]}">{body}</div>'
+
+    def stats(self):
+        return self.fragments.stats()
+
+
+cv_preview_renderer = CVPreviewRenderer()
@@ -0,0 +1,231 @@
+import re
+import difflib
+
+# Wersja formatu - przy zmianie reguł podziału zapisane struktury są liczone ponownie
+STRUCTURE_VERSION = 1
+
+LIGATURES = {
+    'ﬀ': 'ff', 'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬃ': 'ffi',
+    'ﬄ': 'ffl', 'ﬅ': 'st', 'ﬆ': 'st',
+}
+INVISIBLE_CHARS_RE = re.compile('[\u00ad\u200b\u200c\u200d\u2060\ufeff]')
+LIGATURES_RE = re.compile('|'.join(LIGATURES))
+# Wyraz przeniesiony do następnej linii: "zarzą-\ndzanie" -> "zarządzanie"
+HYPHENATION_RE = re.compile(r'([^\W\d_])-\n[ \t]*([a-ząćęłńóśźż])')
+BULLET_RE = re.compile(r'^[•▪●◦‣⁃■►➢–—*·-]\s*')
+SPACES_RE = re.compile('[ \t\u00a0]+')
+
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+PHONE_RE = re.compile(r'(?<!\d)(?:\+\d{2}[\s-]?)?\(?\d{2,3}\)?[\s-]?(?:\d[\s-]?){5,8}\d(?!\d)')
+MIN_PHONE_DIGITS = 9  # odrzuca zakresy dat typu 2019-2024
+LINK_RE = re.compile(r'(?:https?://)?(?:www\.)?(?:linkedin\.com|github\.com|gitlab\.com)/[^\s,;]+', re.IGNORECASE)
+
+# Nagłówek sekcji: krótka linia złożona z jednego z tych wyrażeń (po polsku lub angielsku)
+SECTION_HEADINGS = {
+    'summary': ('podsumowanie', 'profil', 'profil zawodowy', 'o mnie', 'cel zawodowy', 'summary',
+                'profile', 'professional summary', 'about me', 'objective'),
+    'experience': ('doświadczenie', 'doświadczenie zawodowe', 'historia zatrudnienia', 'praca zawodowa',
+                   'przebieg pracy zawodowej', 'experience', 'work experience', 'professional experience',
+                   'employment history', 'work history'),
+    'education': ('wykształcenie', 'edukacja', 'education', 'academic background'),
+    'skills': ('umiejętności', 'kompetencje', 'umiejętności techniczne', 'kluczowe umiejętności',
+               'technologie', 'skills', 'technical skills', 'key skills', 'competencies'),
+    'languages': ('języki', 'języki obce', 'znajomość języków', 'languages'),
+    'certificates': ('certyfikaty', 'kursy', 'szkolenia', 'kursy i szkolenia', 'certyfikaty i szkolenia',
+                     'certifications', 'certificates', 'courses', 'training'),
+    'projects': ('projekty', 'projects', 'wybrane projekty', 'selected projects'),
+    'interests': ('zainteresowania', 'hobby', 'interests'),
+    'contact': ('kontakt', 'dane kontaktowe', 'dane osobowe', 'contact', 'contact information',
+                'personal information', 'personal details'),
+}
+HEADING_LOOKUP = {phrase: key for key, phrases in SECTION_HEADINGS.items() for phrase in phrases}
+MAX_HEADING_WORDS = 5
+
+SECTION_LABELS = {
+    'header': 'DANE OSOBOWE',
+    'summary': 'PODSUMOWANIE',
+    'experience': 'DOŚWIADCZENIE ZAWODOWE',
+    'education': 'WYKSZTAŁCENIE',
+    'skills': 'UMIEJĘTNOŚCI',
+    'languages': 'JĘZYKI',
+    'certificates': 'CERTYFIKATY I SZKOLENIA',
+    'projects': 'PROJEKTY',
+    'interests': 'ZAINTERESOWANIA',
+    'contact': 'KONTAKT',
+}
+# Znaczniki sekcji bez własnego nagłówka w promptach po angielsku
+SECTION_LABELS_EN = {
+    'header': 'PERSONAL DETAILS',
+    'summary': 'SUMMARY',
+    'experience': 'WORK EXPERIENCE',
+    'education': 'EDUCATION',
+    'skills': 'SKILLS',
+    'languages': 'LANGUAGES',
+    'certificates': 'CERTIFICATES AND TRAINING',
+    'projects': 'PROJECTS',
+    'interests': 'INTERESTS',
+    'contact': 'CONTACT',
+}
+
+
+def clean_cv_text(text):
+    """
+    Porządkuje tekst wyciągnięty z PDF: ligatury (ﬁ, ﬂ), przeniesienia wyrazów,
+    znaki niewidoczne, różne symbole punktorów i nadmiarowe odstępy.
+    """
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    text = INVISIBLE_CHARS_RE.sub('', text)
+    text = LIGATURES_RE.sub(lambda match: LIGATURES[match.group()], text)
+    text = HYPHENATION_RE.sub(r'\1\2', text)
+
+    lines = []
+    for line in text.split('\n'):
+        line = SPACES_RE.sub(' ', line).strip()
+        if BULLET_RE.match(line) and len(line) > 2:
+            line = BULLET_RE.sub('- ', line)
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return '\n'.join(lines).strip()
+
+
+def detect_heading(line):
+    """Klucz sekcji, jeśli linia jest jej nagłówkiem (np. 'DOŚWIADCZENIE ZAWODOWE:'), inaczej None"""
+    candidate = line.strip().strip(':').strip().lower()
+    if not candidate or len(candidate.split()) > MAX_HEADING_WORDS:
+        return None
+    return HEADING_LOOKUP.get(candidate)
+
+
+def extract_contact(text):
+    return {
+        'emails': list(dict.fromkeys(EMAIL_RE.findall(text)))[:3],
+        'phones': list(dict.fromkeys(match.strip() for match in PHONE_RE.findall(text)
+                                     if sum(char.isdigit() for char in match) >= MIN_PHONE_DIGITS))[:3],
+        'links': list(dict.fromkeys(LINK_RE.findall(text)))[:5],
+    }
+
+
+def parse_cv_document(text):
+    """
+    Dzieli CV na sekcje. Zwraca słownik gotowy do zapisania jako JSON:
+    {'version', 'text' (oczyszczony), 'sections': [{'key', 'title', 'start', 'body_start', 'end'}], 'contact'}
+    Przesunięcia odnoszą się do oczyszczonego tekstu. Tekst przed pierwszym nagłówkiem
+    to sekcja 'header' (imię, nazwisko, dane kontaktowe).
+    """
+    cleaned = clean_cv_text(text)
+    sections = []
+    offset = 0
+    current = {'key': 'header', 'title': '', 'start': 0, 'body_start': 0}
+
+    for line in cleaned.split('\n'):
+        key = detect_heading(line)
+        if key:
+            current['end'] = offset
+            sections.append(current)
+            current = {'key': key, 'title': line.strip().strip(':').strip(),
+                       'start': offset, 'body_start': min(offset + len(line) + 1, len(cleaned))}
+        offset += len(line) + 1
+
+    current['end'] = len(cleaned)
+    sections.append(current)
+    sections = [section for section in sections
+                if section['key'] != 'header' or cleaned[section['body_start']:section['end']].strip()]
+
+    return {
+        'version': STRUCTURE_VERSION,
+        'text': cleaned,
+        'sections': sections,
+        'contact': extract_contact(cleaned),
+    }
+
+
+def section_body(document, section):
+    return document['text'][section['body_start']:section['end']].strip()
+
+
+def section_text(document, key):
+    """Treść sekcji danego typu (sekcje o tym samym typie są łączone)"""
+    return '\n'.join(section_body(document, section) for section in document['sections']
+                     if section['key'] == key).strip()
+
+
+def has_section(document, key):
+    return any(section['key'] == key for section in document['sections'])
+
+
+def has_recognized_sections(document):
+    return any(section['key'] != 'header' for section in document['sections'])
+
+
+def render_for_prompt(document, language='pl'):
+    """
+    Tekst CV z jednolitymi znacznikami sekcji, żeby model nie musiał sam odgadywać
+    struktury. Znacznik zawiera oryginalny nagłówek z CV; sekcja bez nagłówka (dane
+    osobowe) dostaje etykietę w języku żądania. CV bez rozpoznanych nagłówków jest
+    zwracane bez zmian.
+    """
+    if not has_recognized_sections(document):
+        return document['text']
+    labels = SECTION_LABELS_EN if language == 'en' else SECTION_LABELS
+    blocks = []
+    for section in document['sections']:
+        body = section_body(document, section)
+        if body:
+            title = section['title'] or labels[section['key']]
+            blocks.append(f"=== {title.upper()} ===\n{body}")
+    return '\n\n'.join(blocks)
+
+
+def truncate_at_line(text, max_chars):
+    """Skraca tekst do max_chars na końcu linii zamiast w połowie słowa"""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind('\n', 0, max_chars)
+    cut = cut if cut > 0 else max_chars
+    return text[:cut].rstrip() + "\n...[skrócono]"
+
+
+def truncate_document(document, max_chars):
+    """Skraca CV do max_chars na granicy sekcji (albo linii, gdy pierwsza sekcja jest za długa)"""
+    text = document['text']
+    if len(text) <= max_chars:
+        return text
+
+    cut = 0
+    for section in document['sections']:
+        if section['end'] > max_chars:
+            break
+        cut = section['end']
+    if not cut:
+        return truncate_at_line(text, max_chars)
+    return text[:cut].rstrip() + "\n...[skrócono]"
+
+
+def compare_documents(original, updated):
+    """
+    Porównanie dwóch wersji CV sekcja po sekcji:
+    [{'section', 'label', 'status': added/removed/changed/unchanged, 'similarity'}]
+    """
+    original_keys = [section['key'] for section in original['sections']]
+    updated_keys = [section['key'] for section in updated['sections']]
+
+    changes = []
+    for key in dict.fromkeys(original_keys + updated_keys):
+        before = section_text(original, key)
+        after = section_text(updated, key)
+        if key not in updated_keys:
+            status, similarity = 'removed', 0.0
+        elif key not in original_keys:
+            status, similarity = 'added', 0.0
+        else:
+            similarity = round(difflib.SequenceMatcher(None, before, after, autojunk=False).ratio(), 3)
+            status = 'unchanged' if before == after else 'changed'
+        changes.append({
+            'section': key,
+            'label': SECTION_LABELS[key],
+            'status': status,
+            'similarity': similarity,
+            'chars_before': len(before),
+            'chars_after': len(after),
+        })
+    return changes
@@ -0,0 +1,135 @@
+from types import MappingProxyType
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+
+# Arkusz bazowy reportlab budowany raz na proces (getSampleStyleSheet tworzy nowe obiekty przy każdym wywołaniu)
+SAMPLE_STYLES = getSampleStyleSheet()
+
+
+def derive_style(name, parent, **overrides):
+    """Nowy styl na bazie istniejącego - zamiast modyfikowania stylów z rejestru"""
+    return ParagraphStyle(name, parent=parent, **overrides)
+
+
+def _modern_blue_styles():
+    dark, blue, gray = colors.HexColor('#2c3e50'), colors.HexColor('#3498db'), colors.HexColor('#7f8c8d')
+    normal = SAMPLE_STYLES['Normal']
+    return {
+        'title': derive_style('ModernTitle', SAMPLE_STYLES['Heading1'], fontSize=28, textColor=dark,
+                              spaceAfter=10, alignment=1, fontName='Helvetica-Bold'),
+        'subtitle': derive_style('ModernSubtitle', SAMPLE_STYLES['Heading2'], fontSize=16, textColor=blue,
+                                 spaceAfter=20, alignment=1, fontName='Helvetica'),
+        'section': derive_style('SectionHeader', SAMPLE_STYLES['Heading2'], fontSize=14, textColor=dark,
+                                spaceAfter=12, spaceBefore=20, fontName='Helvetica-Bold', borderWidth=0,
+                                borderColor=blue, borderPadding=5),
+        'summary': derive_style('Summary', normal, fontSize=11, textColor=dark, alignment=4, spaceAfter=15),
+        'exp_title': derive_style('ExpTitle', normal, fontSize=12, textColor=dark, fontName='Helvetica-Bold',
+                                  spaceAfter=3),
+        'exp_company': derive_style('ExpCompany', normal, fontSize=11, textColor=blue, fontName='Helvetica-Bold',
+                                    spaceAfter=5),
+        'exp_date': derive_style('ExpDate', normal, fontSize=10, textColor=gray, spaceAfter=8),
+        'exp_desc': derive_style('ExpDesc', normal, fontSize=10, textColor=dark, leftIndent=20, spaceAfter=15),
+        'education': derive_style('Education', normal, fontSize=11, textColor=dark, spaceAfter=8),
+        'edu_year': derive_style('EduYear', normal, fontSize=10, textColor=gray, spaceAfter=12),
+    }
+
+
+def _creative_styles():
+    red, dark = colors.HexColor('#e74c3c'), colors.HexColor('#2c3e50')
+    title = derive_style('CreativeTitle', SAMPLE_STYLES['Heading1'], fontSize=26, textColor=red,
+                         spaceAfter=8, alignment=0, fontName='Helvetica-Bold')
+    return {
+        'title': title,
+        'title_on_accent': derive_style('WhiteTitle', title, textColor=colors.white, alignment=1),
+        'subtitle': derive_style('CreativeSubtitle', SAMPLE_STYLES['Heading2'], fontSize=14, textColor=red,
+                                 spaceAfter=20, alignment=1, fontName='Helvetica-Oblique'),
+        'contact_header': derive_style('ContactHeader', SAMPLE_STYLES['Heading3'], fontSize=12, textColor=red,
+                                       fontName='Helvetica-Bold', spaceAfter=10),
+        'contact': derive_style('ContactStyle', SAMPLE_STYLES['Normal'], fontSize=9, textColor=dark, spaceAfter=5),
+        'section': derive_style('CreativeSection', SAMPLE_STYLES['Heading3'], fontSize=12, textColor=red,
+                                fontName='Helvetica-Bold', spaceAfter=10, spaceBefore=15),
+        'body': SAMPLE_STYLES['Normal'],
+    }
+
+
+def _executive_styles():
+    slate = colors.HexColor('#34495e')
+    return {
+        'title': derive_style('ExecutiveTitle', SAMPLE_STYLES['Heading1'], fontSize=24, textColor=slate,
+                              spaceAfter=12, alignment=1, fontName='Times-Bold'),
+        'section': derive_style('ExecSection', SAMPLE_STYLES['Heading2'], fontSize=14, textColor=slate,
+                                fontName='Times-Bold', spaceAfter=12, spaceBefore=20, borderWidth=1,
+                                borderColor=colors.HexColor('#bdc3c7'), borderPadding=5),
+        'body': SAMPLE_STYLES['Normal'],
+    }
+
+
+def _minimalist_styles():
+    return {
+        'title': derive_style('MinimalTitle', SAMPLE_STYLES['Heading1'], fontSize=22, textColor=colors.black,
+                              spaceAfter=15, alignment=0, fontName='Helvetica'),
+        'section': derive_style('MinimalSection', SAMPLE_STYLES['Heading3'], fontSize=12, textColor=colors.black,
+                                fontName='Helvetica', spaceAfter=15, spaceBefore=25, leftIndent=0),
+        'body': SAMPLE_STYLES['Normal'],
+    }
+
+
+def _export_styles():
+    """Style eksportu CV z kreatora (TEMPLATE_SPECS['export'] w cv_templates, generate_cv_with_template(cv_data, 'export'))"""
+    return {
+        'title': derive_style('CustomTitle', SAMPLE_STYLES['Heading1'], fontSize=24,
+                              textColor=colors.HexColor('#6366f1'), spaceAfter=30, alignment=1),
+        'job_title': SAMPLE_STYLES['Heading3'],
+        'section': derive_style('CustomSubtitle', SAMPLE_STYLES['Heading2'], fontSize=16,
+                                textColor=colors.HexColor('#4f46e5'), spaceAfter=20),
+        'body': derive_style('CustomNormal', SAMPLE_STYLES['Normal'], fontSize=11, spaceAfter=12),
+    }
+
+
+def _table_styles():
+    return {
+        'modern_contact': TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#7f8c8d')),
+        ]),
+        'modern_skills': TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]),
+        'creative_layout': TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (0, -1), 0),
+            ('RIGHTPADDING', (1, 0), (1, -1), 0),
+        ]),
+        'executive_contact': TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Times-Roman'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#34495e')),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+        ]),
+    }
+
+
+def _build_registry():
+    templates = {
+        'modern_blue': _modern_blue_styles(),
+        'creative': _creative_styles(),
+        'executive': _executive_styles(),
+        'minimalist': _minimalist_styles(),
+        'export': _export_styles(),
+    }
+    return MappingProxyType({name: MappingProxyType(styles) for name, styles in templates.items()})
+
+
+# Rejestr stylów budowany raz przy imporcie. Przy gunicorn --preload import następuje przed
+# forkiem, więc procesy robocze współdzielą te obiekty (copy-on-write) zamiast budować własne.
+# Rejestr jest tylko do odczytu - style pochodne tworzy się przez derive_style().
+# Szablony (utils/cv_templates.py) odwołują się do stylów po nazwach z tych zestawów.
+STYLE_REGISTRY = _build_registry()
+TABLE_STYLES = MappingProxyType(_table_styles())
@@ -1,12 +1,19 @@
 import io
+import inspect
+import logging
+from functools import partial
+from types import MappingProxyType
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch, cm
-from reportlab.graphics.shapes import Drawing, Rect, Line
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
 from reportlab.platypus.flowables import Flowable
-import base64
+from utils.cv_styles import STYLE_REGISTRY, TABLE_STYLES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE = 'modern_blue'
+
 
 class ColorBox(Flowable):
     """Custom flowable for colored boxes"""
@@ -19,526 +26,415 @@ class ColorBox(Flowable):
         self.canv.setFillColor(self.color)
         self.canv.rect(0, 0, self.width, self.height, fill=1)
 
-class CVTemplateGenerator:
-    """Generate professional CV templates with different designs"""
-
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-
-    def setup_custom_styles(self):
-        """Setup custom paragraph styles for different templates"""
-
-        # Modern Blue Template Styles
-        self.modern_title = ParagraphStyle(
-            'ModernTitle',
-            parent=self.styles['Heading1'],
-            fontSize=28,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=10,
-            alignment=1,
-            fontName='Helvetica-Bold'
-        )
-
-        self.modern_subtitle = ParagraphStyle(
-            'ModernSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#3498db'),
-            spaceAfter=20,
-            alignment=1,
-            fontName='Helvetica'
-        )
-
-        self.section_header = ParagraphStyle(
-            'SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=12,
-            spaceBefore=20,
-            fontName='Helvetica-Bold',
-            borderWidth=0,
-            borderColor=colors.HexColor('#3498db'),
-            borderPadding=5
-        )
-
-        # Creative Template Styles
-        self.creative_title = ParagraphStyle(
-            'CreativeTitle',
-            parent=self.styles['Heading1'],
-            fontSize=26,
-            textColor=colors.HexColor('#e74c3c'),
-            spaceAfter=8,
-            alignment=0,
-            fontName='Helvetica-Bold'
-        )
-
-        # Executive Template Styles
-        self.executive_title = ParagraphStyle(
-            'ExecutiveTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#34495e'),
-            spaceAfter=12,
-            alignment=1,
-            fontName='Times-Bold'
-        )
-
-        # Minimalist Template Styles
-        self.minimal_title = ParagraphStyle(
-            'MinimalTitle',
-            parent=self.styles['Heading1'],
-            fontSize=22,
-            textColor=colors.black,
-            spaceAfter=15,
-            alignment=0,
-            fontName='Helvetica-Light'
-        )
-
-    def generate_modern_blue_cv(self, cv_data):
-        """Generate modern blue professional CV template"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, 
-                               topMargin=2*cm, bottomMargin=2*cm)
-        story = []
-
-        # Header with blue accent
-        story.append(ColorBox(doc.width, 0.5*cm, colors.HexColor('#3498db')))
-        story.append(Spacer(1, 0.3*cm))
-
-        # Name and title
-        name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
-        story.append(Paragraph(name, self.modern_title))
-
-        job_title = cv_data.get('jobTitle', '')
-        if job_title:
-            story.append(Paragraph(job_title, self.modern_subtitle))
-
-        # Contact info in table
-        contact_data = []
-        contact_info = []
-        if cv_data.get('email'):
-            contact_info.append(f"✉ {cv_data['email']}")
-        if cv_data.get('phone'):
-            contact_info.append(f"📞 {cv_data['phone']}")
-        if cv_data.get('city'):
-            contact_info.append(f"📍 {cv_data['city']}")
-        if cv_data.get('linkedin'):
-            contact_info.append(f"🔗 {cv_data['linkedin']}")
-
-        if contact_info:
-            # Split into two columns
-            half = len(contact_info) // 2
-            left_col = contact_info[:half]
-            right_col = contact_info[half:]
-
-            max_rows = max(len(left_col), len(right_col))
-            for i in range(max_rows):
-                left = left_col[i] if i < len(left_col) else ""
-                right = right_col[i] if i < len(right_col) else ""
-                contact_data.append([left, right])
-
-            contact_table = Table(contact_data, colWidths=[doc.width/2, doc.width/2])
-            contact_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#7f8c8d')),
-            ]))
-            story.append(contact_table)
-
-        story.append(Spacer(1, 0.5*cm))
-
-        # Professional summary with blue accent
-        if cv_data.get('summary'):
-            story.append(ColorBox(doc.width, 0.2*cm, colors.HexColor('#ecf0f1')))
-            story.append(Spacer(1, 0.2*cm))
-            story.append(Paragraph("PROFIL ZAWODOWY", self.section_header))
-            summary_style = ParagraphStyle(
-                'Summary',
-                parent=self.styles['Normal'],
-                fontSize=11,
-                textColor=colors.HexColor('#2c3e50'),
-                alignment=4,  # Justify
-                spaceAfter=15
-            )
-            story.append(Paragraph(cv_data['summary'], summary_style))
-
-        # Experience section
-        experiences = cv_data.get('experiences', [])
-        if any(exp.get('title') or exp.get('company') for exp in experiences):
-            story.append(Paragraph("DOŚWIADCZENIE ZAWODOWE", self.section_header))
-
-            for exp in experiences:
-                if exp.get('title') or exp.get('company'):
-                    # Experience header
-                    exp_title = exp.get('title', 'Stanowisko')
-                    exp_company = exp.get('company', 'Firma')
-
-                    title_style = ParagraphStyle(
-                        'ExpTitle',
-                        parent=self.styles['Normal'],
-                        fontSize=12,
-                        textColor=colors.HexColor('#2c3e50'),
-                        fontName='Helvetica-Bold',
-                        spaceAfter=3
-                    )
-
-                    company_style = ParagraphStyle(
-                        'ExpCompany',
-                        parent=self.styles['Normal'],
-                        fontSize=11,
-                        textColor=colors.HexColor('#3498db'),
-                        fontName='Helvetica-Bold',
-                        spaceAfter=5
-                    )
-
-                    story.append(Paragraph(exp_title, title_style))
-                    story.append(Paragraph(exp_company, company_style))
-
-                    # Dates
-                    start_date = exp.get('startDate', '')
-                    end_date = exp.get('endDate', 'obecnie')
-                    if start_date:
-                        date_style = ParagraphStyle(
-                            'ExpDate',
-                            parent=self.styles['Normal'],
-                            fontSize=10,
-                            textColor=colors.HexColor('#7f8c8d'),
-                            spaceAfter=8
-                        )
-                        story.append(Paragraph(f"{start_date} - {end_date}", date_style))
-
-                    # Description
-                    if exp.get('description'):
-                        desc_style = ParagraphStyle(
-                            'ExpDesc',
-                            parent=self.styles['Normal'],
-                            fontSize=10,
-                            textColor=colors.HexColor('#2c3e50'),
-                            leftIndent=20,
-                            spaceAfter=15
-                        )
-                        story.append(Paragraph(f"• {exp['description']}", desc_style))
-
-        # Education section
-        education = cv_data.get('education', [])
-        if any(edu.get('degree') or edu.get('school') for edu in education):
-            story.append(Paragraph("WYKSZTAŁCENIE", self.section_header))
-
-            for edu in education:
-                if edu.get('degree') or edu.get('school'):
-                    degree = edu.get('degree', 'Kierunek')
-                    school = edu.get('school', 'Uczelnia')
-
-                    edu_style = ParagraphStyle(
-                        'Education',
-                        parent=self.styles['Normal'],
-                        fontSize=11,
-                        textColor=colors.HexColor('#2c3e50'),
-                        spaceAfter=8
-                    )
-
-                    story.append(Paragraph(f"<b>{degree}</b> - {school}", edu_style))
-
-                    start_year = edu.get('startYear', '')
-                    end_year = edu.get('endYear', '')
-                    if start_year or end_year:
-                        year_style = ParagraphStyle(
-                            'EduYear',
-                            parent=self.styles['Normal'],
-                            fontSize=10,
-                            textColor=colors.HexColor('#7f8c8d'),
-                            spaceAfter=12
-                        )
-                        story.append(Paragraph(f"{start_year} - {end_year}", year_style))
-
-        # Skills section
-        skills = cv_data.get('skills', '')
-        if skills:
-            story.append(Paragraph("UMIEJĘTNOŚCI", self.section_header))
-            skills_list = [skill.strip() for skill in skills.split(',') if skill.strip()]
-
-            # Create skills in columns
-            skills_data = []
-            for i in range(0, len(skills_list), 3):
-                row = skills_list[i:i+3]
-                while len(row) < 3:
-                    row.append("")
-                skills_data.append([f"• {skill}" if skill else "" for skill in row])
-
-            skills_table = Table(skills_data, colWidths=[doc.width/3]*3)
-            skills_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
-            story.append(skills_table)
-
-        # Footer accent
-        story.append(Spacer(1, 1*cm))
-        story.append(ColorBox(doc.width, 0.3*cm, colors.HexColor('#3498db')))
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
-    def generate_creative_cv(self, cv_data):
-        """Generate creative CV template with modern design"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=1.5*cm, leftMargin=1.5*cm, 
-                               topMargin=1.5*cm, bottomMargin=1.5*cm)
-        story = []
-
-        # Creative header with gradient-like effect
-        story.append(ColorBox(doc.width, 1*cm, colors.HexColor('#e74c3c')))
-        story.append(Spacer(1, -0.8*cm))
-
-        # Name in white on red background
-        name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
-        white_title = ParagraphStyle(
-            'WhiteTitle',
-            parent=self.creative_title,
-            textColor=colors.white,
-            alignment=1
-        )
-        story.append(Paragraph(name, white_title))
-        story.append(Spacer(1, 0.3*cm))
-
-        # Job title
-        job_title = cv_data.get('jobTitle', '')
-        if job_title:
-            creative_subtitle = ParagraphStyle(
-                'CreativeSubtitle',
-                parent=self.styles['Heading2'],
-                fontSize=14,
-                textColor=colors.HexColor('#e74c3c'),
-                spaceAfter=20,
-                alignment=1,
-                fontName='Helvetica-Oblique'
-            )
-            story.append(Paragraph(job_title, creative_subtitle))
-
-        # Two-column layout for contact and content
-        main_content = []
-
-        # Contact sidebar
-        contact_content = []
-        contact_header = ParagraphStyle(
-            'ContactHeader',
-            parent=self.styles['Heading3'],
-            fontSize=12,
-            textColor=colors.HexColor('#e74c3c'),
-            fontName='Helvetica-Bold',
-            spaceAfter=10
-        )
-
-        contact_style = ParagraphStyle(
-            'ContactStyle',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=5
-        )
-
-        contact_content.append(Paragraph("KONTAKT", contact_header))
-
-        if cv_data.get('email'):
-            contact_content.append(Paragraph(f"📧 {cv_data['email']}", contact_style))
-        if cv_data.get('phone'):
-            contact_content.append(Paragraph(f"📱 {cv_data['phone']}", contact_style))
-        if cv_data.get('city'):
-            contact_content.append(Paragraph(f"🏙️ {cv_data['city']}", contact_style))
-        if cv_data.get('linkedin'):
-            contact_content.append(Paragraph(f"💼 {cv_data['linkedin']}", contact_style))
-
-        # Main content area
-        if cv_data.get('summary'):
-            creative_section = ParagraphStyle(
-                'CreativeSection',
-                parent=self.styles['Heading3'],
-                fontSize=12,
-                textColor=colors.HexColor('#e74c3c'),
-                fontName='Helvetica-Bold',
-                spaceAfter=10,
-                spaceBefore=15
-            )
-            main_content.append(Paragraph("O MNIE", creative_section))
-            main_content.append(Paragraph(cv_data['summary'], self.styles['Normal']))
-
-        # Combine in table layout
-        layout_data = []
-        max_len = max(len(contact_content), len(main_content))
-
-        for i in range(max_len):
-            left = contact_content[i] if i < len(contact_content) else Spacer(1, 0)
-            right = main_content[i] if i < len(main_content) else Spacer(1, 0)
-            layout_data.append([left, right])
-
-        layout_table = Table(layout_data, colWidths=[doc.width*0.3, doc.width*0.7])
-        layout_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (0, -1), 0),
-            ('RIGHTPADDING', (1, 0), (1, -1), 0),
-        ]))
-        story.append(layout_table)
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
-    def generate_executive_cv(self, cv_data):
-        """Generate executive/corporate CV template"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2.5*cm, leftMargin=2.5*cm, 
-                               topMargin=2.5*cm, bottomMargin=2.5*cm)
-        story = []
-
-        # Executive header
-        name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
-        story.append(Paragraph(name, self.executive_title))
-
-        # Elegant underline
-        story.append(ColorBox(doc.width, 0.1*cm, colors.HexColor('#34495e')))
-        story.append(Spacer(1, 0.5*cm))
-
-        # Contact in elegant table
-        if any([cv_data.get('email'), cv_data.get('phone'), cv_data.get('city')]):
-            contact_data = [[
-                cv_data.get('email', ''),
-                cv_data.get('phone', ''),
-                cv_data.get('city', '')
-            ]]
-
-            contact_table = Table(contact_data, colWidths=[doc.width/3]*3)
-            contact_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Times-Roman'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#34495e')),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-            ]))
-            story.append(contact_table)
-
-        # Professional sections with elegant styling
-        exec_section = ParagraphStyle(
-            'ExecSection',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#34495e'),
-            fontName='Times-Bold',
-            spaceAfter=12,
-            spaceBefore=20,
-            borderWidth=1,
-            borderColor=colors.HexColor('#bdc3c7'),
-            borderPadding=5
-        )
-
-        if cv_data.get('summary'):
-            story.append(Paragraph("EXECUTIVE SUMMARY", exec_section))
-            story.append(Paragraph(cv_data['summary'], self.styles['Normal']))
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
-    def generate_minimalist_cv(self, cv_data):
-        """Generate clean minimalist CV template"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=3*cm, leftMargin=3*cm, 
-                               topMargin=3*cm, bottomMargin=3*cm)
-        story = []
-
-        # Minimalist header
-        name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
-        story.append(Paragraph(name, self.minimal_title))
-
-        # Simple line
-        story.append(ColorBox(doc.width, 0.05*cm, colors.black))
-        story.append(Spacer(1, 1*cm))
-
-        # Clean typography throughout
-        minimal_section = ParagraphStyle(
-            'MinimalSection',
-            parent=self.styles['Heading3'],
-            fontSize=12,
-            textColor=colors.black,
-            fontName='Helvetica',
-            spaceAfter=15,
-            spaceBefore=25,
-            leftIndent=0
-        )
-
-        # Content with lots of white space
-        if cv_data.get('summary'):
-            story.append(Paragraph("About", minimal_section))
-            story.append(Paragraph(cv_data['summary'], self.styles['Normal']))
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
-def generate_cv_with_template(cv_data, template_style="modern_blue"):
-    """Main function to generate CV with selected template"""
-    generator = CVTemplateGenerator()
-
-    if template_style == "modern_blue":
-        return generator.generate_modern_blue_cv(cv_data)
-    elif template_style == "creative":
-        return generator.generate_creative_cv(cv_data)
-    elif template_style == "executive":
-        return generator.generate_executive_cv(cv_data)
-    elif template_style == "minimalist":
-        return generator.generate_minimalist_cv(cv_data)
-    else:
-        # Default to modern blue
-        return generator.generate_modern_blue_cv(cv_data)
-import io
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 
-def generate_cv_with_template(cv_data, template_style='modern_blue'):
-    """Generate CV PDF with selected template style"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
+# --- Bloki szablonów --------------------------------------------------------------------
+# Każdy blok to funkcja (cv_data, width, **opcje) -> lista flowables. Opcje pochodzą ze
+# specyfikacji szablonu i są rozwiązywane raz, przy kompilacji (nazwy stylów -> obiekty).
+
+def full_name(cv_data):
+    return f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
+
+
+def accent_bar_block(cv_data, width, height, color):
+    return [ColorBox(width, height, color)]
+
+
+def spacer_block(cv_data, width, height):
+    return [Spacer(1, height)]
+
+
+def name_block(cv_data, width, style):
+    return [Paragraph(full_name(cv_data), style)]
 
-    # Template-specific styling
-    if template_style == 'modern_blue':
-        title_color = colors.HexColor('#2563eb')
-        accent_color = colors.HexColor('#1e40af')
-    elif template_style == 'professional_gray':
-        title_color = colors.HexColor('#374151')
-        accent_color = colors.HexColor('#6b7280')
-    else:
-        title_color = colors.HexColor('#6366f1')
-        accent_color = colors.HexColor('#4f46e5')
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=title_color,
-        spaceAfter=30,
-        alignment=1
-    )
-
-    # Header
-    name = f"{cv_data.get('firstName', '')} {cv_data.get('lastName', '')}".strip()
-    story.append(Paragraph(name, title_style))
-
-    # Add other CV sections...
-    if cv_data.get('summary'):
-        story.append(Paragraph("Professional Summary", styles['Heading2']))
-        story.append(Paragraph(cv_data['summary'], styles['Normal']))
-        story.append(Spacer(1, 12))
 
+def job_title_block(cv_data, width, style):
+    job_title = cv_data.get('jobTitle', '')
+    return [Paragraph(job_title, style)] if job_title else []
+
+
+def contact_columns_block(cv_data, width, fields, table_style, icons=MappingProxyType({})):
+    """Dane kontaktowe w dwóch kolumnach (tylko wypełnione pola)"""
+    contact_info = [f"{icons.get(key, '')}{cv_data[key]}" for key in fields if cv_data.get(key)]
+    if not contact_info:
+        return []
+
+    half = len(contact_info) // 2
+    left_col, right_col = contact_info[:half], contact_info[half:]
+    rows = []
+    for i in range(max(len(left_col), len(right_col))):
+        rows.append([left_col[i] if i < len(left_col) else "",
+                     right_col[i] if i < len(right_col) else ""])
+
+    table = Table(rows, colWidths=[width/2, width/2])
+    table.setStyle(table_style)
+    return [table]
+
+
+def contact_row_block(cv_data, width, fields, table_style):
+    """Dane kontaktowe w jednym wierszu tabeli, po kolumnie na pole"""
+    if not any(cv_data.get(key) for key in fields):
+        return []
+    table = Table([[cv_data.get(key, '') for key in fields]], colWidths=[width/len(fields)]*len(fields))
+    table.setStyle(table_style)
+    return [table]
+
+
+def contact_list_block(cv_data, width, heading, heading_style, style, fields, icons=MappingProxyType({})):
+    story = [Paragraph(heading, heading_style)]
+    for key in fields:
+        if cv_data.get(key):
+            story.append(Paragraph(f"{icons.get(key, '')}{cv_data[key]}", style))
+    return story
+
+
+def contact_line_block(cv_data, width, fields, style, separator=' | '):
+    contact_info = [cv_data[key] for key in fields if cv_data.get(key)]
+    return [Paragraph(separator.join(contact_info), style)] if contact_info else []
+
+
+def summary_block(cv_data, width, heading, heading_style, style, divider_height=None,
+                  divider_color=None, divider_gap=0, gap_after=None):
+    if not cv_data.get('summary'):
+        return []
+    story = []
+    if divider_height:
+        story += [ColorBox(width, divider_height, divider_color), Spacer(1, divider_gap)]
+    story += [Paragraph(heading, heading_style), Paragraph(cv_data['summary'], style)]
+    if gap_after:
+        story.append(Spacer(1, gap_after))
+    return story
+
+
+def experience_block(cv_data, width, heading, heading_style, date_style, description_style,
+                     header_style=None, title_style=None, company_style=None, bullet='', gap_after=None):
+    """
+    Doświadczenie zawodowe. Nagłówek pozycji w jednej linii ('<b>stanowisko</b> - firma',
+    header_style) albo w dwóch osobnych akapitach (title_style + company_style).
+    """
+    entries = [exp for exp in cv_data.get('experiences') or [] if exp.get('title') or exp.get('company')]
+    if not entries:
+        return []
+
+    story = [Paragraph(heading, heading_style)]
+    for exp in entries:
+        title = exp.get('title', 'Stanowisko')
+        company = exp.get('company', 'Firma')
+        if header_style:
+            story.append(Paragraph(f"<b>{title}</b> - {company}", header_style))
+        else:
+            story += [Paragraph(title, title_style), Paragraph(company, company_style)]
+
+        start_date = exp.get('startDate', '')
+        if start_date:
+            story.append(Paragraph(f"{start_date} - {exp.get('endDate', 'obecnie')}", date_style))
+        if exp.get('description'):
+            story.append(Paragraph(f"{bullet}{exp['description']}", description_style))
+        if gap_after:
+            story.append(Spacer(1, gap_after))
+    return story
+
+
+def education_block(cv_data, width, heading, heading_style, style, year_style, gap_after=None):
+    entries = [edu for edu in cv_data.get('education') or [] if edu.get('degree') or edu.get('school')]
+    if not entries:
+        return []
+
+    story = [Paragraph(heading, heading_style)]
+    for edu in entries:
+        story.append(Paragraph(f"<b>{edu.get('degree', 'Kierunek')}</b> - {edu.get('school', 'Uczelnia')}", style))
+        start_year = edu.get('startYear', '')
+        end_year = edu.get('endYear', '')
+        if start_year or end_year:
+            story.append(Paragraph(f"{start_year} - {end_year}", year_style))
+        if gap_after:
+            story.append(Spacer(1, gap_after))
+    return story
+
+
+def split_skills(cv_data):
+    return [skill.strip() for skill in (cv_data.get('skills') or '').split(',') if skill.strip()]
+
+
+def skills_grid_block(cv_data, width, heading, heading_style, table_style, columns=3, bullet='• '):
+    if not cv_data.get('skills'):
+        return []
+    story = [Paragraph(heading, heading_style)]
+
+    skills_list = split_skills(cv_data)
+    rows = []
+    for i in range(0, len(skills_list), columns):
+        row = skills_list[i:i + columns]
+        row += [""] * (columns - len(row))
+        rows.append([f"{bullet}{skill}" if skill else "" for skill in row])
+    if rows:
+        table = Table(rows, colWidths=[width/columns]*columns)
+        table.setStyle(table_style)
+        story.append(table)
+    return story
+
+
+def skills_inline_block(cv_data, width, heading, heading_style, style, separator=' • '):
+    if not cv_data.get('skills'):
+        return []
+    return [Paragraph(heading, heading_style), Paragraph(separator.join(split_skills(cv_data)), style)]
+
+
+def columns_block(cv_data, width, left, right, widths, table_style):
+    """Dwie kolumny (np. pasek boczny z kontaktem + treść) zestawione wiersz po wierszu w tabeli"""
+    left_width, right_width = width * widths[0], width * widths[1]
+    left_content = [flowable for step in left for flowable in step(cv_data, left_width)]
+    right_content = [flowable for step in right for flowable in step(cv_data, right_width)]
+
+    rows = []
+    for i in range(max(len(left_content), len(right_content))):
+        rows.append([left_content[i] if i < len(left_content) else Spacer(1, 0),
+                     right_content[i] if i < len(right_content) else Spacer(1, 0)])
+    if not rows:
+        return []
+
+    table = Table(rows, colWidths=[left_width, right_width])
+    table.setStyle(table_style)
+    return [table]
+
+
+BLOCK_FACTORIES = MappingProxyType({
+    'accent_bar': accent_bar_block,
+    'spacer': spacer_block,
+    'name': name_block,
+    'job_title': job_title_block,
+    'contact_columns': contact_columns_block,
+    'contact_row': contact_row_block,
+    'contact_list': contact_list_block,
+    'contact_line': contact_line_block,
+    'summary': summary_block,
+    'experience': experience_block,
+    'education': education_block,
+    'skills_grid': skills_grid_block,
+    'skills_inline': skills_inline_block,
+    'columns': columns_block,
+})
+
+# Opcje zawierające listy bloków (kompilowane rekurencyjnie)
+NESTED_BLOCK_OPTIONS = ('left', 'right')
+
+
+# --- Specyfikacje szablonów -------------------------------------------------------------
+# styles: zestaw z utils/cv_styles.STYLE_REGISTRY; margins w punktach; blocks: (typ, opcje).
+# Opcje 'style'/'*_style' to nazwy stylów z zestawu, 'table_style' - klucz TABLE_STYLES,
+# 'color'/'*_color' - kolor '#rrggbb' albo nazwa z reportlab.lib.colors.
+
+MODERN_ICONS = {'email': '✉ ', 'phone': '📞 ', 'city': '📍 ', 'linkedin': '🔗 '}
+CREATIVE_ICONS = {'email': '📧 ', 'phone': '📱 ', 'city': '🏙️ ', 'linkedin': '💼 '}
+CONTACT_FIELDS = ('email', 'phone', 'city', 'linkedin')
+
+TEMPLATE_SPECS = {
+    'modern_blue': {
+        'styles': 'modern_blue',
+        'margins': 2*cm,
+        'blocks': (
+            ('accent_bar', {'height': 0.5*cm, 'color': '#3498db'}),
+            ('spacer', {'height': 0.3*cm}),
+            ('name', {'style': 'title'}),
+            ('job_title', {'style': 'subtitle'}),
+            ('contact_columns', {'fields': CONTACT_FIELDS, 'icons': MODERN_ICONS,
+                                 'table_style': 'modern_contact'}),
+            ('spacer', {'height': 0.5*cm}),
+            ('summary', {'heading': 'PROFIL ZAWODOWY', 'heading_style': 'section', 'style': 'summary',
+                         'divider_height': 0.2*cm, 'divider_color': '#ecf0f1', 'divider_gap': 0.2*cm}),
+            ('experience', {'heading': 'DOŚWIADCZENIE ZAWODOWE', 'heading_style': 'section',
+                            'title_style': 'exp_title', 'company_style': 'exp_company',
+                            'date_style': 'exp_date', 'description_style': 'exp_desc', 'bullet': '• '}),
+            ('education', {'heading': 'WYKSZTAŁCENIE', 'heading_style': 'section', 'style': 'education',
+                           'year_style': 'edu_year'}),
+            ('skills_grid', {'heading': 'UMIEJĘTNOŚCI', 'heading_style': 'section',
+                             'table_style': 'modern_skills'}),
+            ('spacer', {'height': 1*cm}),
+            ('accent_bar', {'height': 0.3*cm, 'color': '#3498db'}),
+        ),
+    },
+    'creative': {
+        'styles': 'creative',
+        'margins': 1.5*cm,
+        'blocks': (
+            # Imię białym tekstem na czerwonym pasku (ujemny odstęp nasuwa tekst na pasek)
+            ('accent_bar', {'height': 1*cm, 'color': '#e74c3c'}),
+            ('spacer', {'height': -0.8*cm}),
+            ('name', {'style': 'title_on_accent'}),
+            ('spacer', {'height': 0.3*cm}),
+            ('job_title', {'style': 'subtitle'}),
+            ('columns', {
+                'widths': (0.3, 0.7),
+                'table_style': 'creative_layout',
+                'left': (
+                    ('contact_list', {'heading': 'KONTAKT', 'heading_style': 'contact_header',
+                                      'style': 'contact', 'fields': CONTACT_FIELDS, 'icons': CREATIVE_ICONS}),
+                ),
+                'right': (
+                    ('summary', {'heading': 'O MNIE', 'heading_style': 'section', 'style': 'body'}),
+                ),
+            }),
+        ),
+    },
+    'executive': {
+        'styles': 'executive',
+        'margins': 2.5*cm,
+        'blocks': (
+            ('name', {'style': 'title'}),
+            ('accent_bar', {'height': 0.1*cm, 'color': '#34495e'}),
+            ('spacer', {'height': 0.5*cm}),
+            ('contact_row', {'fields': ('email', 'phone', 'city'), 'table_style': 'executive_contact'}),
+            ('summary', {'heading': 'EXECUTIVE SUMMARY', 'heading_style': 'section', 'style': 'body'}),
+        ),
+    },
+    'minimalist': {
+        'styles': 'minimalist',
+        'margins': 3*cm,
+        'blocks': (
+            ('name', {'style': 'title'}),
+            ('accent_bar', {'height': 0.05*cm, 'color': 'black'}),
+            ('spacer', {'height': 1*cm}),
+            ('summary', {'heading': 'About', 'heading_style': 'section', 'style': 'body'}),
+        ),
+    },
+    # Prosty PDF z kreatora CV (/generate-cv-pdf)
+    'export': {
+        'styles': 'export',
+        'margins': inch,
+        'blocks': (
+            ('name', {'style': 'title'}),
+            ('job_title', {'style': 'job_title'}),
+            ('contact_line', {'fields': CONTACT_FIELDS, 'style': 'body'}),
+            ('spacer', {'height': 20}),
+            ('summary', {'heading': 'O mnie', 'heading_style': 'section', 'style': 'body', 'gap_after': 15}),
+            ('experience', {'heading': 'Doświadczenie zawodowe', 'heading_style': 'section',
+                            'header_style': 'body', 'date_style': 'body', 'description_style': 'body',
+                            'gap_after': 10}),
+            ('education', {'heading': 'Wykształcenie', 'heading_style': 'section', 'style': 'body',
+                           'year_style': 'body', 'gap_after': 10}),
+            ('skills_inline', {'heading': 'Umiejętności', 'heading_style': 'section', 'style': 'body'}),
+        ),
+    },
+}
+
+
+# --- Kompilacja ---------------------------------------------------------------------------
+
+def _resolve_color(template_name, value):
+    if isinstance(value, colors.Color):
+        return value
+    if isinstance(value, str) and value.startswith('#'):
+        return colors.HexColor(value)
+    color = getattr(colors, str(value), None)
+    if not isinstance(color, colors.Color):
+        raise ValueError(f"Template '{template_name}': unknown color {value!r}")
+    return color
+
+
+def _resolve_option(template_name, block_type, option, value, styles, factories):
+    if option in NESTED_BLOCK_OPTIONS:
+        return _compile_blocks(template_name, value, styles, factories)
+    if option == 'table_style':
+        if value not in TABLE_STYLES:
+            raise ValueError(f"Template '{template_name}', block '{block_type}': unknown table style {value!r}")
+        return TABLE_STYLES[value]
+    if option == 'style' or option.endswith('_style'):
+        if value not in styles:
+            raise ValueError(f"Template '{template_name}', block '{block_type}': unknown style {value!r}")
+        return styles[value]
+    if option == 'color' or option.endswith('_color'):
+        return _resolve_color(template_name, value)
+    if option == 'icons':
+        return MappingProxyType(dict(value))
+    return value
+
+
+def _compile_blocks(template_name, blocks, styles, factories):
+    steps = []
+    for block_type, options in blocks:
+        factory = factories.get(block_type)
+        if factory is None:
+            raise ValueError(f"Template '{template_name}': unknown block type {block_type!r}")
+
+        parameters = list(inspect.signature(factory).parameters.values())[2:]  # bez cv_data, width
+        accepted = {parameter.name for parameter in parameters}
+        required = {parameter.name for parameter in parameters if parameter.default is inspect.Parameter.empty}
+        unknown = set(options) - accepted
+        missing = required - set(options)
+        if unknown or missing:
+            raise ValueError(f"Template '{template_name}', block '{block_type}': "
+                             f"unknown options {sorted(unknown)}, missing options {sorted(missing)}")
+
+        resolved = {option: _resolve_option(template_name, block_type, option, value, styles, factories)
+                    for option, value in options.items()}
+        steps.append(partial(factory, **resolved))
+    return tuple(steps)
+
+
+def compile_template(template_name, spec, factories=BLOCK_FACTORIES):
+    """
+    Zamienia specyfikację szablonu w plan renderowania: bloki jako gotowe wywołania
+    z rozwiązanymi stylami, kolorami i stylami tabel. Błędy w specyfikacji (nieznany
+    blok, styl, brakująca opcja) zgłaszają ValueError już przy kompilacji.
+    factories pozwala skompilować tę samą specyfikację do innego wyjścia (podgląd HTML).
+    """
+    if spec.get('styles') not in STYLE_REGISTRY:
+        raise ValueError(f"Template '{template_name}': unknown style set {spec.get('styles')!r}")
+    styles = STYLE_REGISTRY[spec['styles']]
+    return MappingProxyType({
+        'name': template_name,
+        'pagesize': spec.get('pagesize', A4),
+        'margins': spec['margins'],
+        'steps': _compile_blocks(template_name, spec['blocks'], styles, factories),
+    })
+
+
+# Plany budowane raz przy imporcie (przed forkiem procesów przy gunicorn --preload)
+TEMPLATE_PLANS = MappingProxyType({name: compile_template(name, spec) for name, spec in TEMPLATE_SPECS.items()})
+
+
+def render_plan(plan, cv_data):
+    buffer = io.BytesIO()
+    margin = plan['margins']
+    doc = SimpleDocTemplate(buffer, pagesize=plan['pagesize'], rightMargin=margin, leftMargin=margin,
+                            topMargin=margin, bottomMargin=margin)
+    story = []
+    for step in plan['steps']:
+        story.extend(step(cv_data, doc.width))
     doc.build(story)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def generate_cv_with_template(cv_data, template_style=DEFAULT_TEMPLATE):
+    """Main function to generate CV with selected template (unknown names fall back to modern_blue)"""
+    plan = TEMPLATE_PLANS.get(template_style) or TEMPLATE_PLANS[DEFAULT_TEMPLATE]
+    return render_plan(plan, cv_data)
+
+
+SAMPLE_CV_DATA = MappingProxyType({
+    'firstName': 'Zofia', 'lastName': 'Łęcka', 'jobTitle': 'Główna księgowa',
+    'email': 'zofia.lecka@example.com', 'phone': '+48 600 100 200', 'city': 'Kraków',
+    'linkedin': 'linkedin.com/in/zofia-lecka',
+    'summary': 'Doświadczona księgowa z dwunastoletnim stażem w sprawozdawczości finansowej. ' * 3,
+    'experiences': (
+        {'title': 'Główna księgowa', 'company': 'Przykład Sp. z o.o.', 'startDate': '2018-03',
+         'endDate': '', 'description': 'Zamknięcia miesięczne i roczne, nadzór nad zespołem pięciu osób.'},
+        {'title': 'Księgowa', 'company': 'Biuro Rachunkowe Żuraw', 'startDate': '2012-09',
+         'endDate': '2018-02', 'description': 'Pełna księgowość spółek handlowych, rozliczenia VAT i CIT.'},
+    ),
+    'education': ({'degree': 'Finanse i rachunkowość', 'school': 'Uniwersytet Ekonomiczny',
+                   'startYear': '2007', 'endYear': '2012'},),
+    'skills': 'SAP FI, Excel, MSSF, Symfonia, Comarch ERP, analiza finansowa, VAT, CIT',
+})
+
+
+def warm_up():
+    """
+    Jednorazowy render każdego szablonu przykładowym CV: ładuje metryki czcionek i cache
+    reportlab w procesie nadrzędnym (przed forkiem) i sprawdza, że każdy plan da się wyrenderować.
+    """
+    for template_name, plan in TEMPLATE_PLANS.items():
+        try:
+            render_plan(plan, SAMPLE_CV_DATA)
+        except Exception as e:
+            logger.warning(f"Template warm-up failed for {template_name}: {e}")
@@ -0,0 +1,229 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from models import db, CVUpload, AnalysisResult
+from utils.cache import TTLCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Wyodrębniony tekst w pamięci procesu: skrót pliku -> tekst
+EXTRACTED_TEXT_CACHE_SIZE = int(os.environ.get('CV_TEXT_CACHE_SIZE', '256'))
+EXTRACTED_TEXT_CACHE_TTL = int(os.environ.get('CV_TEXT_CACHE_TTL', str(24 * 3600)))
+
+# Pełne teksty CV i wyników analiz po id (niezmienne dla danego id) w pamięci procesu
+UPLOAD_CACHE_SIZE = int(os.environ.get('CV_UPLOAD_CACHE_SIZE', '256'))
+UPLOAD_CACHE_TTL = int(os.environ.get('CV_UPLOAD_CACHE_TTL', '3600'))
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Typy analiz, których wynik jest nową wersją CV (porównanie w /compare-cv-versions)
+OPTIMIZED_CV_TYPES = ('optimize', 'position_optimization', 'advanced_position_optimization')
+CV_TEXT_RESULT_TYPES = OPTIMIZED_CV_TYPES + ('apply_recruiter_feedback',)
+
+
+def hash_upload_stream(stream):
+    """SHA-256 zawartości przesłanego pliku; strumień jest przewijany na początek"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_pasted_text(cv_text):
+    """Skrót wklejonego tekstu - prefiks odróżnia go od skrótu bajtów pliku"""
+    return content_hash('text', cv_text.strip())
+
+
+class CVUploadStore:
+    """
+    Deduplikacja przesyłanych CV po skrócie treści:
+    - ten sam plik nie jest ponownie parsowany (tekst z pamięci procesu albo z bazy),
+    - ponowne przesłanie przez tego samego użytkownika aktualizuje istniejący wiersz
+      CVUpload zamiast dodawać kolejny z pełnym original_text,
+    - CV, które już przeszło walidację, nie jest walidowane ponownie.
+    """
+
+    def __init__(self):
+        self.texts = TTLCache(maxsize=EXTRACTED_TEXT_CACHE_SIZE, ttl=EXTRACTED_TEXT_CACHE_TTL)
+        self.records = TTLCache(maxsize=UPLOAD_CACHE_SIZE, ttl=UPLOAD_CACHE_TTL)
+        self._lock = threading.Lock()
+        self._stats = {'uploads': 0, 'text_lookups': 0, 'text_memory_hits': 0, 'text_db_hits': 0,
+                       'duplicate_uploads': 0, 'validations_skipped': 0, 'record_loads': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def find_for_user(self, user_id, digest):
+        return (CVUpload.query.filter_by(user_id=user_id, content_hash=digest)
+                .order_by(CVUpload.uploaded_at.desc()).first())
+
+    def cached_text(self, digest):
+        """Tekst wyodrębniony wcześniej z identycznego pliku lub None"""
+        self._count('text_lookups')
+        text = self.texts.get(digest)
+        if text is not None:
+            self._count('text_memory_hits')
+            return text
+
+        # Ten sam plik mógł przetworzyć inny proces gunicorna - tekst zależy tylko od bajtów pliku
+        upload = CVUpload.query.filter_by(content_hash=digest).with_entities(CVUpload.original_text).first()
+        if upload is not None:
+            self._count('text_db_hits')
+            return self.texts.set(digest, upload.original_text)
+        return None
+
+    def remember_text(self, digest, cv_text):
+        self.texts.set(digest, cv_text)
+
+    def previous_upload(self, user_id, digest):
+        """
+        Poprzednie przesłanie tego samego CV przez użytkownika. Zapisana walidacja
+        i struktura są wtedy używane ponownie zamiast liczenia ich od nowa.
+        """
+        upload = self.find_for_user(user_id, digest)
+        if upload is not None and upload.get_validation() is not None:
+            self._count('validations_skipped')
+            return upload
+        return None
+
+    def save(self, user_id, digest, filename, cv_text, job_title, job_description, validation, document):
+        """Zapisuje przesłanie; duplikat tego samego użytkownika odświeża istniejący wiersz"""
+        self._count('uploads')
+        upload = self.find_for_user(user_id, digest)
+        if upload is not None:
+            self._count('duplicate_uploads')
+            upload.filename = filename
+            upload.job_title = job_title
+            upload.job_description = job_description
+            upload.uploaded_at = datetime.utcnow()
+            upload.upload_count = (upload.upload_count or 1) + 1
+        else:
+            upload = CVUpload(user_id=user_id,
+                              filename=filename,
+                              original_text=cv_text,
+                              job_title=job_title,
+                              job_description=job_description,
+                              content_hash=digest,
+                              upload_count=1)
+            db.session.add(upload)
+
+        upload.validation_data = json.dumps({
+            'warnings': validation.get('warnings', []),
+            'suggestions': validation.get('suggestions', []),
+            'quality_score': validation.get('quality_score', 0),
+        }, ensure_ascii=False)
+        upload.structured_data = json.dumps(document, ensure_ascii=False)
+        db.session.commit()
+        return upload
+
+    def structure(self, upload):
+        """Zapisana struktura CV; dla starszych wpisów liczona teraz i zapisywana w bazie"""
+        document = upload.get_structure()
+        if document is None:
+            from utils.cv_structure import parse_cv_document
+
+            document = parse_cv_document(upload.original_text)
+            upload.structured_data = json.dumps(document, ensure_ascii=False)
+            db.session.commit()
+        return document
+
+    def _load_record(self, key, loader):
+        """Wpis z pamięci procesu albo z bazy (loader); brak w bazie nie jest zapamiętywany"""
+        record = self.records.get(key)
+        if record is None:
+            record = loader()
+            if record is None:
+                return None
+            self._count('record_loads')
+            self.records.set(key, record)
+        return record
+
+    def get_upload(self, upload_id, user_id):
+        """
+        Pełny tekst i struktura przesłanego CV użytkownika: {'id', 'text', 'document', ...}
+        albo None. original_text nie zmienia się dla danego id (duplikat aktualizuje tylko
+        metadane), więc wpis może żyć w pamięci procesu bez unieważniania.
+        """
+        try:
+            upload_id = int(upload_id)
+        except (TypeError, ValueError):
+            return None
+
+        def load():
+            # Własność sprawdzana w zapytaniu - cudzy wiersz nie jest wczytywany ani uzupełniany
+            upload = CVUpload.query.filter_by(id=upload_id, user_id=user_id).first()
+            if upload is None:
+                return None
+            return MappingProxyType({
+                'id': upload.id,
+                'user_id': upload.user_id,
+                'text': upload.original_text,
+                'document': self.structure(upload),
+            })
+
+        record = self._load_record(('upload', upload_id), load)
+        if record is None or record['user_id'] != user_id:
+            return None
+        return record
+
+    def get_result(self, result_id, user_id):
+        """
+        Zapisany wynik analizy CV użytkownika: {'id', 'cv_upload_id', 'analysis_type',
+        'result', 'text'} albo None. 'text' to treść CV z wyniku (zoptymalizowane CV
+        albo improved_cv po poprawkach rekrutera) - tylko dla CV_TEXT_RESULT_TYPES,
+        raporty innych analiz (ocena, gramatyka) nie są wersją CV.
+        """
+        try:
+            result_id = int(result_id)
+        except (TypeError, ValueError):
+            return None
+
+        def load():
+            row = (db.session.query(AnalysisResult, CVUpload.user_id)
+                   .join(CVUpload, AnalysisResult.cv_upload_id == CVUpload.id)
+                   .filter(AnalysisResult.id == result_id).first())
+            if row is None:
+                return None
+            analysis_result, owner_id = row
+            result = analysis_result.get_result_json().get('result')
+            if analysis_result.analysis_type not in CV_TEXT_RESULT_TYPES:
+                text = None
+            elif isinstance(result, str):
+                text = result
+            elif isinstance(result, dict):
+                text = result.get('improved_cv')
+            else:
+                text = None
+            return MappingProxyType({
+                'id': analysis_result.id,
+                'user_id': owner_id,
+                'cv_upload_id': analysis_result.cv_upload_id,
+                'analysis_type': analysis_result.analysis_type,
+                'result': result,
+                'text': text,
+            })
+
+        record = self._load_record(('result', result_id), load)
+        if record is None or record['user_id'] != user_id:
+            return None
+        return record
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        text_hits = stats['text_memory_hits'] + stats['text_db_hits']
+        stats['text_hit_rate'] = round(text_hits / stats['text_lookups'], 3) if stats['text_lookups'] else 0.0
+        stats['duplicate_rate'] = round(stats['duplicate_uploads'] / stats['uploads'], 3) if stats['uploads'] else 0.0
+        stats['text_cache'] = self.texts.stats()
+        stats['record_cache'] = self.records.stats()
+        return stats
+
+
+cv_upload_store = CVUploadStore()
@@ -1,9 +1,8 @@
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional
 
-import re
-from typing import Dict, List
+from utils.cv_structure import parse_cv_document, has_section, has_recognized_sections
 
 class CVValidator:
     def __init__(self):
@@ -19,8 +18,11 @@ class CVValidator:
             r'jane doe'
         ]
     
-    def validate_cv(self, cv_text: str) -> Dict:
-        """Comprehensive CV validation"""
+    def validate_cv(self, cv_text: str, document: Optional[Dict] = None) -> Dict:
+        """Comprehensive CV validation (document - struktura z parse_cv_document, jeśli już policzona)"""
+        if document is None:
+            document = parse_cv_document(cv_text)
+
         results = {
             'is_valid': True,
             'warnings': [],
@@ -37,7 +39,7 @@ class CVValidator:
             results['warnings'].append(f"CV jest bardzo długie ({len(cv_text)} znaków). Może być trudne do przetworzenia.")
         
         # Check for required sections
-        missing_sections = self._check_required_sections(cv_text)
+        missing_sections = self._check_required_sections(cv_text, document)
         if missing_sections:
             results['warnings'].append(f"Brakuje sekcji: {', '.join(missing_sections)}")
         
@@ -47,7 +49,7 @@ class CVValidator:
             results['warnings'].append(f"Wykryto podejrzane wzorce: {', '.join(suspicious_found)}")
         
         # Check for contact information
-        contact_info = self._check_contact_info(cv_text)
+        contact_info = self._check_contact_info(document)
         if not contact_info['has_email']:
             results['suggestions'].append("Dodaj adres email")
         if not contact_info['has_phone']:
@@ -58,13 +60,18 @@ class CVValidator:
         
         return results
     
-    def _check_required_sections(self, cv_text: str) -> List[str]:
-        """Check for required CV sections"""
-        text_lower = cv_text.lower()
+    def _check_required_sections(self, cv_text: str, document: Dict) -> List[str]:
+        """Check for required CV sections (nagłówki rozpoznane w strukturze CV)"""
         missing = []
         
-        has_experience = any(section in text_lower for section in ['doświadczenie', 'experience', 'praca zawodowa'])
-        has_education = any(section in text_lower for section in ['wykształcenie', 'education', 'edukacja'])
+        if has_recognized_sections(document):
+            has_experience = has_section(document, 'experience')
+            has_education = has_section(document, 'education')
+        else:
+            # Tekst bez rozpoznanych nagłówków - wystarczy wzmianka w treści
+            text_lower = cv_text.lower()
+            has_experience = any(section in text_lower for section in ['doświadczenie', 'experience', 'praca zawodowa'])
+            has_education = any(section in text_lower for section in ['wykształcenie', 'education', 'edukacja'])
         
         if not has_experience:
             missing.append("Doświadczenie zawodowe")
@@ -84,21 +91,12 @@ class CVValidator:
         
         return found_patterns
     
-    def _check_contact_info(self, cv_text: str) -> Dict:
-        """Check for contact information"""
-        text_lower = cv_text.lower()
-        
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        has_email = bool(re.search(email_pattern, cv_text))
-        
-        # Phone pattern (Polish format)
-        phone_pattern = r'(\+48\s?)?[\d\s\-\(\)]{9,15}'
-        has_phone = bool(re.search(phone_pattern, cv_text))
-        
+    def _check_contact_info(self, document: Dict) -> Dict:
+        """Check for contact information (wyciągniętych przy podziale CV na sekcje)"""
+        contact = document['contact']
         return {
-            'has_email': has_email,
-            'has_phone': has_phone
+            'has_email': bool(contact['emails']),
+            'has_phone': bool(contact['phones'])
         }
     
     def _calculate_quality_score(self, cv_text: str, results: Dict) -> int:
@@ -5,53 +5,40 @@ import requests
 import urllib.parse
 from bs4 import BeautifulSoup
 from utils.openrouter_api import send_api_request
+from utils.job_extractors import extractor_registry, compile_selector
 
 logger = logging.getLogger(__name__)
 
-def extract_job_info_from_url(url):
+# Selektory ogólne kompilowane raz przy imporcie modułu
+GENERIC_TITLE_SELECTORS = [compile_selector(selector) for selector in (
+    'h1', '.job-title', '.offer-title', '.position-title',
+    '[class*="title"]', '[class*="job"]', '[class*="position"]',
+    'title', '.headline', '.job-header h1'
+)]
+
+GENERIC_DESCRIPTION_SELECTORS = [compile_selector(selector) for selector in (
+    '.job-description', '.offer-description', '.description',
+    '.job-content', '.offer-content', '.content',
+    '[class*="description"]', '[class*="details"]',
+    'article', '.main-content', '.job-details'
+)]
+
+NOISE_SELECTOR = compile_selector('nav, header, footer, script, style, iframe, aside, .sidebar, .menu')
+
+def extract_job_info_from_url(url, use_ai=True):
     """
     Automatycznie wyciąga tytuł stanowiska i opis pracy z linku do oferty
     Zwraca: {'job_title': str, 'job_description': str, 'company': str}
     """
+    from utils.job_pipeline import job_pipeline
+
     try:
         logger.info(f"Wyciąganie informacji z URL: {url}")
-        
-        # Sprawdź format URL
-        parsed_url = urllib.parse.urlparse(url)
-        if not parsed_url.scheme or not parsed_url.netloc:
-            raise ValueError("Nieprawidłowy format URL")
-        
-        # Pobierz stronę
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "pl,en-US;q=0.5",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        domain = parsed_url.netloc.lower()
-        
-        # Wyciągnij informacje specyficzne dla różnych portali
-        job_info = extract_by_domain(soup, domain)
-        
-        # Jeśli nie udało się wyciągnąć specyficznie, spróbuj ogólnych selektorów
-        if not job_info['job_title'] or not job_info['job_description']:
-            job_info = extract_generic(soup, job_info)
-        
-        # Użyj AI do poprawy i uzupełnienia informacji
-        if job_info['job_title'] or job_info['job_description']:
-            job_info = enhance_with_ai(job_info, url)
-        
-        logger.info(f"Pomyślnie wyciągnięto: tytuł='{job_info['job_title'][:50]}...', opis={len(job_info['job_description'])} znaków")
-        
-        return job_info
-        
+        result = job_pipeline.run(url, use_ai=use_ai)
+        logger.info(f"Pomyślnie wyciągnięto ({result['source']}): tytuł='{result['job_title'][:50]}...', "
+                    f"opis={len(result['job_description'])} znaków")
+        return {key: result[key] for key in ('job_title', 'job_description', 'company')}
+
     except requests.exceptions.RequestException as e:
         logger.error(f"Błąd pobierania strony: {str(e)}")
         raise Exception(f"Nie udało się pobrać oferty z URL: {str(e)}")
@@ -60,101 +47,33 @@ def extract_job_info_from_url(url):
         logger.error(f"Błąd analizy URL: {str(e)}")
         raise Exception(f"Nie udało się przeanalizować oferty: {str(e)}")
 
+def extract_job_info_from_html(html, url):
+    """
+    Wyciąga informacje o ofercie z pobranego HTML bez sieci i bez AI
+    Zwraca: {'job_title': str, 'job_description': str, 'company': str}
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    domain = urllib.parse.urlparse(url).netloc.lower()
+    
+    # Wyciągnij informacje specyficzne dla różnych portali
+    job_info = extract_by_domain(soup, domain)
+    
+    # Jeśli nie udało się wyciągnąć specyficznie, spróbuj ogólnych selektorów
+    if not job_info['job_title'] or not job_info['job_description']:
+        job_info = extract_generic(soup, job_info)
+    
+    return job_info
+
 def extract_by_domain(soup, domain):
     """Wyciąga informacje specyficzne dla różnych portali pracy"""
     job_info = {'job_title': '', 'job_description': '', 'company': ''}
     
+    extractor = extractor_registry.lookup(domain)
+    if not extractor:
+        return job_info
+    
     try:
-        if 'linkedin.com' in domain:
-            # LinkedIn
-            title_elem = soup.select_one('.top-card-layout__title, .jobs-unified-top-card__job-title, h1')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            company_elem = soup.select_one('.top-card-layout__card .topcard__org-name-link, .jobs-unified-top-card__company-name')
-            if company_elem:
-                job_info['company'] = company_elem.get_text(strip=True)
-            
-            desc_elem = soup.select_one('.description__text, .show-more-less-html__markup, .jobs-description__content')
-            if desc_elem:
-                job_info['job_description'] = desc_elem.get_text(separator='\n', strip=True)
-                
-        elif 'indeed.com' in domain:
-            # Indeed
-            title_elem = soup.select_one('.jobsearch-JobInfoHeader-title, h1[data-testid="job-title"]')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            company_elem = soup.select_one('[data-testid="inlineHeader-companyName"], .icl-u-lg-mr--sm')
-            if company_elem:
-                job_info['company'] = company_elem.get_text(strip=True)
-            
-            desc_elem = soup.select_one('#jobDescriptionText, [data-testid="job-description"]')
-            if desc_elem:
-                job_info['job_description'] = desc_elem.get_text(separator='\n', strip=True)
-                
-        elif 'pracuj.pl' in domain:
-            # Pracuj.pl
-            title_elem = soup.select_one('[data-test="text-jobTitle"], .offer-viewBBjNq h1')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            company_elem = soup.select_one('[data-test="text-employer"], .offer-company-name')
-            if company_elem:
-                job_info['company'] = company_elem.get_text(strip=True)
-            
-            desc_containers = soup.select('[data-test="section-description-text"], [data-test="section-requirements-text"], [data-test="section-offered-text"]')
-            if desc_containers:
-                job_info['job_description'] = '\n\n'.join([c.get_text(separator='\n', strip=True) for c in desc_containers])
-                
-        elif 'nofluffjobs.com' in domain:
-            # NoFluffJobs
-            title_elem = soup.select_one('h1[data-cy="JobOfferTitle"], .posting-details-description h1')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            company_elem = soup.select_one('[data-cy="CompanyName"], .company-name')
-            if company_elem:
-                job_info['company'] = company_elem.get_text(strip=True)
-            
-            desc_elem = soup.select_one('[data-cy="JobOfferDescription"], .posting-details-description')
-            if desc_elem:
-                job_info['job_description'] = desc_elem.get_text(separator='\n', strip=True)
-                
-        elif 'olx.pl' in domain:
-            # OLX Praca - zaktualizowane selektory
-            title_elem = soup.select_one('h1, [data-cy="ad_title"], .css-1juynto, .ad-title')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            # Szukaj opisu w różnych miejscach
-            desc_containers = soup.select('[data-cy="ad_description"], .css-g5mtl5, .description, .ad-description, .ad-description-full')
-            if desc_containers:
-                job_info['job_description'] = desc_containers[0].get_text(separator='\n', strip=True)
-            else:
-                # Jeśli nie ma specyficznych selektorów, szukaj w całej treści
-                # Znajdź wszystkie div-y i p-ki które mogą zawierać opis
-                potential_desc = soup.select('div:has(p), section, article, .content, .details')
-                for container in potential_desc:
-                    text = container.get_text(separator='\n', strip=True)
-                    if len(text) > 100 and 'opis' in text.lower() or 'stanowisko' in text.lower() or 'wymagania' in text.lower():
-                        job_info['job_description'] = text
-                        break
-                
-        elif 'justjoin.it' in domain:
-            # JustJoin.it
-            title_elem = soup.select_one('h1[data-test-id="offer-title"], .MuiTypography-h1')
-            if title_elem:
-                job_info['job_title'] = title_elem.get_text(strip=True)
-            
-            company_elem = soup.select_one('[data-test-id="company-name"], .MuiTypography-h6')
-            if company_elem:
-                job_info['company'] = company_elem.get_text(strip=True)
-            
-            desc_elem = soup.select_one('[data-test-id="offer-description"], .OfferDescription')
-            if desc_elem:
-                job_info['job_description'] = desc_elem.get_text(separator='\n', strip=True)
-                
+        job_info = extractor.extract(soup)
     except Exception as e:
         logger.warning(f"Błąd podczas wyciągania dla domeny {domain}: {str(e)}")
     
@@ -165,14 +84,8 @@ def extract_generic(soup, existing_info):
     
     # Jeśli nie ma tytułu, szukaj w ogólnych miejscach
     if not existing_info['job_title']:
-        title_selectors = [
-            'h1', '.job-title', '.offer-title', '.position-title',
-            '[class*="title"]', '[class*="job"]', '[class*="position"]',
-            'title', '.headline', '.job-header h1'
-        ]
-        
-        for selector in title_selectors:
-            elem = soup.select_one(selector)
+        for selector in GENERIC_TITLE_SELECTORS:
+            elem = selector.select_one(soup)
             if elem:
                 title_text = elem.get_text(strip=True)
                 if 5 < len(title_text) < 100:  # Rozsądna długość tytułu
@@ -181,15 +94,8 @@ def extract_generic(soup, existing_info):
     
     # Jeśli nie ma opisu, szukaj w ogólnych miejscach
     if not existing_info['job_description']:
-        desc_selectors = [
-            '.job-description', '.offer-description', '.description',
-            '.job-content', '.offer-content', '.content',
-            '[class*="description"]', '[class*="details"]',
-            'article', '.main-content', '.job-details'
-        ]
-        
-        for selector in desc_selectors:
-            elem = soup.select_one(selector)
+        for selector in GENERIC_DESCRIPTION_SELECTORS:
+            elem = selector.select_one(soup)
             if elem:
                 desc_text = elem.get_text(separator='\n', strip=True)
                 if len(desc_text) > 100:  # Minimum dla opisu
@@ -218,7 +124,7 @@ def extract_generic(soup, existing_info):
     # Jeśli nadal nie ma opisu, weź text z body (z filtrowaniem)
     if not existing_info['job_description'] and soup.body:
         # Usuń niepotrzebne elementy
-        for tag in soup.select('nav, header, footer, script, style, iframe, aside, .sidebar, .menu'):
+        for tag in NOISE_SELECTOR.select(soup):
             tag.decompose()
         
         body_text = soup.body.get_text(separator='\n', strip=True)
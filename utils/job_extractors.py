@@ -0,0 +1,174 @@
+import logging
+import soupsieve
+
+logger = logging.getLogger(__name__)
+
+
+def compile_selector(selector):
+    """Kompiluje selektor CSS raz, żeby nie parsować go przy każdym wywołaniu"""
+    if not selector:
+        return None
+    return soupsieve.compile(selector)
+
+
+class DomainExtractor:
+    """
+    Ekstraktor dla jednego portalu pracy.
+    Selektory są kompilowane raz przy tworzeniu obiektu i współdzielone przez wszystkie wywołania.
+    """
+
+    def __init__(self, name, domains, title=None, company=None, description=None,
+                 join_description=False, fallback=None):
+        self.name = name
+        self.domains = tuple(domain.lower() for domain in domains)
+        self.title_selector = compile_selector(title)
+        self.company_selector = compile_selector(company)
+        self.description_selector = compile_selector(description)
+        self.join_description = join_description
+        self.fallback = fallback
+
+    def extract(self, soup):
+        """Zwraca {'job_title', 'job_description', 'company'} dla podanego dokumentu"""
+        job_info = {'job_title': '', 'job_description': '', 'company': ''}
+
+        if self.title_selector:
+            title_elem = self.title_selector.select_one(soup)
+            if title_elem:
+                job_info['job_title'] = title_elem.get_text(strip=True)
+
+        if self.company_selector:
+            company_elem = self.company_selector.select_one(soup)
+            if company_elem:
+                job_info['company'] = company_elem.get_text(strip=True)
+
+        if self.description_selector:
+            if self.join_description:
+                containers = self.description_selector.select(soup)
+                if containers:
+                    job_info['job_description'] = '\n\n'.join(
+                        c.get_text(separator='\n', strip=True) for c in containers)
+            else:
+                desc_elem = self.description_selector.select_one(soup)
+                if desc_elem:
+                    job_info['job_description'] = desc_elem.get_text(separator='\n', strip=True)
+
+        if self.fallback and not job_info['job_description']:
+            job_info['job_description'] = self.fallback(soup) or ''
+
+        return job_info
+
+    def __repr__(self):
+        return f'<DomainExtractor {self.name}>'
+
+
+class ExtractorRegistry:
+    """
+    Rejestr ekstraktorów indeksowany zarejestrowaną domeną.
+    Wyszukiwanie to kilka odczytów ze słownika (po jednym na etykietę hosta),
+    więc dodanie kolejnego portalu nie spowalnia pozostałych.
+    """
+
+    def __init__(self):
+        self._by_domain = {}
+
+    def register(self, extractor):
+        for domain in extractor.domains:
+            if domain in self._by_domain:
+                logger.warning(f"Domena {domain} jest już zarejestrowana dla {self._by_domain[domain].name}, nadpisuję")
+            self._by_domain[domain] = extractor
+        return extractor
+
+    def lookup(self, host):
+        """Znajduje ekstraktor dla hosta, np. 'pl.linkedin.com' -> ekstraktor 'linkedin.com'"""
+        if not host:
+            return None
+
+        host = host.lower().split(':', 1)[0].rstrip('.')
+        labels = host.split('.')
+
+        # Od najdłuższego sufiksu: www.pracuj.pl, pracuj.pl
+        for i in range(len(labels) - 1):
+            extractor = self._by_domain.get('.'.join(labels[i:]))
+            if extractor:
+                return extractor
+        return None
+
+    def domains(self):
+        return sorted(self._by_domain)
+
+    def __len__(self):
+        return len(self._by_domain)
+
+
+extractor_registry = ExtractorRegistry()
+
+
+def register_extractor(*args, **kwargs):
+    """Tworzy i rejestruje DomainExtractor w globalnym rejestrze"""
+    return extractor_registry.register(DomainExtractor(*args, **kwargs))
+
+
+_OLX_POTENTIAL_DESCRIPTION = compile_selector('div:has(p), section, article, .content, .details')
+
+
+def _olx_fallback(soup):
+    """OLX nie ma stabilnych selektorów - szukaj kontenera z treścią ogłoszenia"""
+    for container in _OLX_POTENTIAL_DESCRIPTION.select(soup):
+        text = container.get_text(separator='\n', strip=True)
+        text_lower = text.lower()
+        if len(text) > 100 and any(keyword in text_lower for keyword in ('opis', 'stanowisko', 'wymagania')):
+            return text
+    return ''
+
+
+register_extractor(
+    'linkedin', ['linkedin.com'],
+    title='.top-card-layout__title, .jobs-unified-top-card__job-title, h1',
+    company='.top-card-layout__card .topcard__org-name-link, .jobs-unified-top-card__company-name',
+    description='.description__text, .show-more-less-html__markup, .show-more-less-html, .jobs-description__content',
+)
+
+register_extractor(
+    'indeed', ['indeed.com'],
+    title='.jobsearch-JobInfoHeader-title, h1[data-testid="job-title"]',
+    company='[data-testid="inlineHeader-companyName"], .icl-u-lg-mr--sm',
+    description='#jobDescriptionText, [data-testid="job-description"]',
+)
+
+register_extractor(
+    'pracuj', ['pracuj.pl'],
+    title='[data-test="text-jobTitle"], .offer-viewBBjNq h1',
+    company='[data-test="text-employer"], .offer-company-name',
+    description=('[data-test="section-description-text"], [data-test="section-responsibilities-text"], '
+                 '[data-test="section-requirements-text"], '
+                 '[data-test="section-benefit-expectations-text"], [data-test="section-offered-text"]'),
+    join_description=True,
+)
+
+register_extractor(
+    'nofluffjobs', ['nofluffjobs.com'],
+    title='h1[data-cy="JobOfferTitle"], .posting-details-description h1',
+    company='[data-cy="CompanyName"], .company-name',
+    description='[data-cy="JobOfferDescription"], .posting-details-description',
+)
+
+register_extractor(
+    'olx', ['olx.pl'],
+    title='h1, [data-cy="ad_title"], .css-1juynto, .ad-title',
+    description=('[data-cy="ad_description"], .css-g5mtl5, .description, .ad-description, '
+                 '.ad-description-full, .offer-description, .offer-content'),
+    fallback=_olx_fallback,
+)
+
+register_extractor(
+    'praca', ['praca.pl'],
+    title='h1',
+    description='.offer-description, .offer-content, .description',
+)
+
+register_extractor(
+    'justjoin', ['justjoin.it'],
+    title='h1[data-test-id="offer-title"], .MuiTypography-h1',
+    company='[data-test-id="company-name"], .MuiTypography-h6',
+    description='[data-test-id="offer-description"], .OfferDescription',
+)
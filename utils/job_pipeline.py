@@ -0,0 +1,244 @@
+import os
+import time
+import logging
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from utils.cache import TTLCache, content_hash
+from utils.structured_job_data import extract_structured_job_data, is_complete_job_data, fill_missing_fields
+from utils.enhanced_job_extractor import extract_job_info_from_html, enhance_with_ai
+from utils.openrouter_api import summarize_job_description
+from utils.job_summarizer import SUMMARY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = 10
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "pl,en-US;q=0.5",
+}
+
+# Uprzejmość wobec portali: maks. równoległych pobrań na host i odstęp między nimi
+FETCH_PER_HOST = int(os.environ.get('JOB_FETCH_PER_HOST', '2'))
+FETCH_HOST_DELAY = float(os.environ.get('JOB_FETCH_HOST_DELAY', '0.5'))
+BATCH_WORKERS = int(os.environ.get('JOB_BATCH_WORKERS', '8'))
+# Powyżej tej liczby śledzonych hostów stan bezczynnych jest usuwany
+FETCH_MAX_TRACKED_HOSTS = int(os.environ.get('JOB_FETCH_MAX_TRACKED_HOSTS', '256'))
+
+JOB_FIELDS = ('job_title', 'job_description', 'company')
+
+# Opis z DOM dłuższy niż ten próg to zwykle cała strona - zostają akapity od pierwszego istotnego
+DOM_TRIM_THRESHOLD = 10000
+RELEVANT_PARAGRAPH_KEYWORDS = ('requirements', 'responsibilities', 'qualifications', 'skills', 'experience',
+                               'about the job', 'wymagania', 'obowiązki', 'kwalifikacje', 'umiejętności',
+                               'doświadczenie', 'o pracy')
+MIN_RELEVANT_PARAGRAPH = 50
+
+
+def normalize_job_text(text):
+    """Scala białe znaki w liniach i usuwa puste linie"""
+    return '\n'.join(' '.join(line.split()) for line in (text or '').split('\n') if line.strip())
+
+
+def trim_to_relevant_paragraphs(text):
+    """
+    Akapity od pierwszego zawierającego słowo kluczowe oferty (wymagania, obowiązki...),
+    z pominięciem krótkich linii (menu, przyciski). Bez słów kluczowych tekst bez zmian.
+    """
+    relevant = []
+    found_relevant = False
+    for paragraph in text.split('\n'):
+        lowered = paragraph.lower()
+        if not found_relevant and any(keyword in lowered for keyword in RELEVANT_PARAGRAPH_KEYWORDS):
+            found_relevant = True
+        if found_relevant and len(paragraph.strip()) > MIN_RELEVANT_PARAGRAPH:
+            relevant.append(paragraph)
+    return '\n'.join(relevant) if relevant else text
+
+
+class HostThrottle:
+    """
+    Ogranicza równoległe pobrania z jednego hosta (semafor) i wymusza minimalny
+    odstęp między kolejnymi żądaniami do niego. Różne hosty nie blokują się nawzajem.
+    Stan bezczynnych hostów (nikt nie czeka, odstęp minął) jest usuwany, gdy liczba
+    śledzonych hostów przekroczy max_hosts.
+    """
+
+    def __init__(self, per_host=FETCH_PER_HOST, delay=FETCH_HOST_DELAY, max_hosts=FETCH_MAX_TRACKED_HOSTS):
+        self.per_host = max(1, per_host)
+        self.delay = max(0.0, delay)
+        self.max_hosts = max(1, max_hosts)
+        self._lock = threading.Lock()
+        # host -> {'semaphore', 'next_start', 'users' (wątki czekające lub pobierające)}
+        self._hosts = {}
+
+    def _prune(self, now):
+        idle = [host for host, state in self._hosts.items()
+                if not state['users'] and state['next_start'] <= now]
+        for host in idle:
+            del self._hosts[host]
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                if len(self._hosts) >= self.max_hosts:
+                    self._prune(time.monotonic())
+                state = self._hosts[host] = {'semaphore': threading.BoundedSemaphore(self.per_host),
+                                             'next_start': 0.0, 'users': 0}
+            state['users'] += 1
+
+        try:
+            with state['semaphore']:
+                # Rezerwacja terminu startu pod blokadą, czekanie już poza nią
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, state['next_start'])
+                    state['next_start'] = start + self.delay
+                if start > now:
+                    time.sleep(start - now)
+                yield
+        finally:
+            with self._lock:
+                state['users'] -= 1
+
+    def tracked_hosts(self):
+        with self._lock:
+            return len(self._hosts)
+
+
+class JobPipeline:
+    """
+    Jeden potok analizy oferty: pobranie -> dane strukturalne -> DOM -> (opcjonalnie) AI.
+    Strona jest pobierana raz na URL (cache z krótkim TTL), a wynik każdego etapu
+    jest zapamiętywany pod skrótem treści, więc ta sama oferta otwarta z /analyze-url,
+    /process-cv i /analyze-job-posting nie jest ponownie pobierana ani streszczana.
+    """
+
+    def __init__(self, page_ttl=900, stage_ttl=6 * 3600, maxsize=256):
+        self.pages = TTLCache(maxsize=maxsize, ttl=page_ttl)
+        self.structured = TTLCache(maxsize=maxsize, ttl=stage_ttl)
+        self.dom = TTLCache(maxsize=maxsize, ttl=stage_ttl)
+        self.enhanced = TTLCache(maxsize=maxsize, ttl=stage_ttl)
+        self.summaries = TTLCache(maxsize=maxsize, ttl=stage_ttl)
+        self.throttle = HostThrottle()
+
+    def fetch(self, url):
+        """Pobiera stronę oferty; zwraca (html, skrót treści)"""
+        parsed_url = urllib.parse.urlparse(url)
+        if parsed_url.scheme not in ('http', 'https') or not parsed_url.netloc:
+            raise ValueError("Nieprawidłowy format URL")
+
+        cached = self.pages.get(url)
+        if cached:
+            return cached
+
+        with self.throttle.slot(parsed_url.netloc.lower()):
+            response = requests.get(url, headers=FETCH_HEADERS, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        page = (response.text, content_hash(response.text))
+        return self.pages.set(url, page)
+
+    def extract_structured(self, html, digest):
+        return self.structured.get_or_set(digest, lambda: extract_structured_job_data(html))
+
+    def extract_dom(self, html, url, digest):
+        # Ekstraktor zależy od domeny, więc host jest częścią klucza
+        key = (digest, urllib.parse.urlparse(url).netloc.lower())
+        return dict(self.dom.get_or_set(key, lambda: self._extract_dom(html, url)))
+
+    @staticmethod
+    def _extract_dom(html, url):
+        job_info = extract_job_info_from_html(html, url)
+        # Ogólne selektory (article, [class*=description]) potrafią złapać całą stronę
+        if len(job_info['job_description']) > DOM_TRIM_THRESHOLD:
+            job_info['job_description'] = trim_to_relevant_paragraphs(job_info['job_description'])
+        return job_info
+
+    def enhance(self, job_info, url):
+        key = content_hash(*(job_info[field] for field in JOB_FIELDS))
+        return dict(self.enhanced.get_or_set(key, lambda: enhance_with_ai(dict(job_info), url)))
+
+    def summarize(self, job_text, use_ai=False):
+        if len(job_text) <= SUMMARY_THRESHOLD:
+            return job_text
+        key = (content_hash(job_text), use_ai)
+        return self.summaries.get_or_set(key, lambda: summarize_job_description(job_text, use_ai=use_ai))
+
+    def run(self, url, use_ai=False, ai_summary=False):
+        """
+        Analizuje ofertę pod podanym URL.
+        Zwraca {'job_title', 'job_description', 'company', 'job_text', 'source', 'content_hash'},
+        gdzie job_text to opis gotowy do promptów (streszczony, jeśli jest długi).
+        """
+        html, digest = self.fetch(url)
+
+        structured = self.extract_structured(html, digest)
+        if is_complete_job_data(structured):
+            job_info = {field: structured[field] for field in JOB_FIELDS}
+            source = structured['source']
+        else:
+            job_info = fill_missing_fields(self.extract_dom(html, url, digest), structured)
+            source = 'dom'
+            if use_ai and (job_info['job_title'] or job_info['job_description']):
+                job_info = self.enhance(job_info, url)
+                source = 'ai'
+
+        job_info['job_description'] = normalize_job_text(job_info['job_description'])
+        if not job_info['job_description']:
+            raise ValueError("Nie udało się wyciągnąć opisu stanowiska z podanego URL")
+
+        # Dane strukturalne są już zwięzłe - streszczamy tylko tekst z DOM
+        if source == 'dom':
+            job_info['job_text'] = self.summarize(job_info['job_description'], use_ai=ai_summary)
+        else:
+            job_info['job_text'] = job_info['job_description']
+
+        job_info['source'] = source
+        job_info['content_hash'] = digest
+        logger.debug(f"Job pipeline {url}: source={source}, {len(job_info['job_description'])} chars")
+        return job_info
+
+    def run_many(self, urls, workers=BATCH_WORKERS, use_ai=False, ai_summary=False):
+        """
+        Analizuje wiele ofert równolegle w puli wątków (pobieranie to głównie I/O).
+        Generator zwraca (indeks, url, wynik, błąd) w kolejności ukończenia,
+        więc wyniki można wysyłać klientowi, zanim skończą się wolniejsze portale.
+        """
+        if not urls:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls))),
+                                      thread_name_prefix='job-batch')
+        try:
+            futures = {
+                executor.submit(self.run, url, use_ai=use_ai, ai_summary=ai_summary): (index, url)
+                for index, url in enumerate(urls)
+            }
+            for future in as_completed(futures):
+                index, url = futures[future]
+                try:
+                    yield index, url, future.result(), None
+                except Exception as e:
+                    logger.warning(f"Batch job analysis failed for {url}: {str(e)}")
+                    yield index, url, None, e
+        finally:
+            # Klient się rozłączył - nie pobieraj stron, których nikt nie odbierze
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'pages': self.pages.stats(),
+            'structured': self.structured.stats(),
+            'dom': self.dom.stats(),
+            'enhanced': self.enhanced.stats(),
+            'summaries': self.summaries.stats(),
+            'throttled_hosts': self.throttle.tracked_hosts(),
+        }
+
+
+job_pipeline = JobPipeline()
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, JobPosting
+from utils.cache import content_hash
+from utils.job_summarizer import split_sentences, extract_keywords, summarize_job_text, SUMMARY_THRESHOLD
+from utils.job_pipeline import job_pipeline, normalize_job_text
+
+logger = logging.getLogger(__name__)
+
+# Po tym czasie oferta z URL jest pobierana ponownie (mogła się zmienić lub wygasnąć)
+JOB_POSTING_MAX_AGE = timedelta(hours=int(os.environ.get('JOB_POSTING_MAX_AGE_HOURS', '24')))
+
+MAX_STORED_REQUIREMENTS = 15
+MAX_STORED_KEYWORDS = 15
+
+# Licznik odczytów ofert jest zapisywany zbiorczo, a nie osobnym commitem przy każdym odczycie
+HIT_FLUSH_INTERVAL = 60
+HIT_FLUSH_MAX_PENDING = 100
+
+# Parametry śledzące, które nie zmieniają treści oferty - dokładne nazwy (refNo, sourceId
+# czy src_offer mogą wskazywać ofertę) i jeden prawdziwy prefiks utm_
+TRACKING_PARAMS = frozenset(('gclid', 'fbclid', 'msclkid', 'trk', 'trackingid', 'refid', 'ref', 'src', 'source', 's_id'))
+TRACKING_PARAM_PREFIX = 'utm_'
+
+
+def is_tracking_param(key):
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIX)
+
+
+def normalize_job_url(url):
+    """
+    Sprowadza URL oferty do postaci kanonicznej, żeby ta sama oferta z różnych
+    linków (www, parametry śledzące, kotwice, końcowy ukośnik) była jednym wpisem.
+    """
+    parsed = urllib.parse.urlsplit((url or '').strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parsed.port and parsed.port not in (80, 443):
+        host = f"{host}:{parsed.port}"
+
+    query = sorted(
+        (key, value) for key, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    )
+    path = re.sub(r'/{2,}', '/', parsed.path).rstrip('/') or '/'
+    return urllib.parse.urlunsplit(('https', host, path, urllib.parse.urlencode(query), ''))
+
+
+def parse_json_object(text):
+    """Obiekt JSON z odpowiedzi AI (także otoczony tekstem) albo None"""
+    try:
+        parsed = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        json_match = re.search(r'\{.*\}', text or '', re.DOTALL)
+        if not json_match:
+            return None
+        try:
+            parsed = json.loads(json_match.group())
+        except json.JSONDecodeError:
+            return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def parse_analysis_response(analysis_result):
+    """Wyciąga JSON z odpowiedzi AI; gdy się nie da, zwraca surowy tekst jako {'analysis': ...}"""
+    parsed = parse_json_object(analysis_result)
+    if parsed is None:
+        return {'analysis': analysis_result}
+    return parsed
+
+
+def string_list(value):
+    """Lista tekstów z pola odpowiedzi AI; inne typy (tekst, słownik, None) dają pustą listę"""
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+
+class JobStore:
+    """
+    Wspólny magazyn ofert pracy. Treść, streszczenie, wymagania i słowa kluczowe
+    liczone są raz na ofertę (klucz: znormalizowany URL lub skrót treści),
+    a nie przy każdej analizie CV każdego użytkownika.
+    """
+
+    def __init__(self, max_age=JOB_POSTING_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pending_hits = {}  # id oferty -> odczyty jeszcze niezapisane w bazie
+        self._last_flush = time.monotonic()
+
+    def _apply_text(self, posting, description, summary=None):
+        """Ustawia treść oferty i przelicza lokalną analizę; analiza AI jest unieważniana"""
+        sentences = split_sentences(description)
+        requirements = [sentence for _, section, sentence in sentences if section == 'requirements']
+
+        posting.description = description
+        posting.text_hash = content_hash(description)
+        posting.summary = summary or summarize_job_text(description)
+        posting.requirements = json.dumps(requirements[:MAX_STORED_REQUIREMENTS], ensure_ascii=False)
+        posting.keywords = json.dumps(extract_keywords(sentences, MAX_STORED_KEYWORDS), ensure_ascii=False)
+        posting.analysis = None
+
+    def _save(self, posting, lookup):
+        """Zapisuje ofertę; przy wyścigu dwóch żądań zwraca wpis utworzony przez drugie"""
+        try:
+            db.session.add(posting)
+            db.session.commit()
+            return posting
+        except IntegrityError:
+            db.session.rollback()
+            existing = lookup()
+            if existing is None:
+                raise
+            return existing
+
+    def _touch(self, posting):
+        """Liczy odczyt oferty; hit_count w bazie jest aktualizowany zbiorczo (flush_hits)"""
+        with self._lock:
+            self._pending_hits[posting.id] = self._pending_hits.get(posting.id, 0) + 1
+            due = (len(self._pending_hits) >= HIT_FLUSH_MAX_PENDING
+                   or time.monotonic() - self._last_flush >= HIT_FLUSH_INTERVAL)
+        if due:
+            self.flush_hits()
+        return posting
+
+    def flush_hits(self):
+        """Zapisuje zebrane odczyty jednym commitem (UPDATE hit_count = hit_count + n)"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            for posting_id, hits in pending.items():
+                JobPosting.query.filter_by(id=posting_id).update(
+                    {JobPosting.hit_count: db.func.coalesce(JobPosting.hit_count, 0) + hits},
+                    synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Saving job posting hit counts failed: {e}")
+
+    def get_for_url(self, url, ai_summary=False):
+        """Zwraca JobPosting dla URL, pobierając ofertę tylko gdy nie ma jej w bazie lub jest nieaktualna"""
+        normalized_url = normalize_job_url(url)
+        posting = JobPosting.query.filter_by(normalized_url=normalized_url).first()
+        if posting and not posting.is_stale(self.max_age):
+            return self._touch(posting)
+
+        try:
+            result = job_pipeline.run(url, ai_summary=ai_summary)
+        except Exception as e:
+            if posting is None:
+                raise
+            # Portal chwilowo niedostępny - lepsza nieco starsza treść niż błąd
+            logger.warning(f"Refreshing job posting {normalized_url} failed, serving stale copy: {str(e)}")
+            return self._touch(posting)
+
+        description = result['job_description']
+        summary = result['job_text'] if result['job_text'] != description else None
+
+        if posting is None:
+            posting = JobPosting(normalized_url=normalized_url, hit_count=0)
+            self._apply_text(posting, description, summary)
+        elif posting.text_hash != content_hash(description):
+            logger.info(f"Job posting {normalized_url} changed, recomputing job-side analysis")
+            self._apply_text(posting, description, summary)
+
+        posting.title = result['job_title'][:300] or posting.title
+        posting.company = result['company'][:200] or posting.company
+        posting.source = result['source']
+        posting.fetched_at = datetime.utcnow()
+        posting = self._save(posting, lambda: JobPosting.query.filter_by(normalized_url=normalized_url).first())
+        return self._touch(posting)
+
+    def get_for_text(self, job_description):
+        """Zwraca JobPosting dla wklejonego opisu (deduplikacja po skrócie treści)"""
+        description = normalize_job_text(job_description)
+        if not description:
+            return None
+
+        text_hash = content_hash(description)
+        posting = JobPosting.query.filter_by(text_hash=text_hash).first()
+        if posting:
+            return self._touch(posting)
+
+        # pasted_text_hash jest unikalny - równoległe żądanie z tym samym opisem dostaje IntegrityError
+        posting = JobPosting(hit_count=0, source='text', pasted_text_hash=text_hash)
+        self._apply_text(posting, description)
+        posting = self._save(posting, lambda: JobPosting.query.filter_by(pasted_text_hash=text_hash).first())
+        return self._touch(posting)
+
+    def get(self, job_url='', job_description='', ai_summary=False):
+        """Oferta z URL albo z wklejonego opisu (opis ma pierwszeństwo, jak w formularzu)"""
+        if job_description:
+            return self.get_for_text(job_description)
+        if job_url:
+            return self.get_for_url(job_url, ai_summary=ai_summary)
+        return None
+
+    def ensure_analysis(self, posting, language='pl'):
+        """
+        Analiza AI oferty (analyze_polish_job_posting) liczona raz na ofertę i język.
+        Odpowiedź, która nie jest obiektem JSON, jest zwracana jako {'analysis': ...} i nie
+        trafia do bazy (następne żądanie spróbuje ponownie).
+        """
+        analysis = posting.get_analysis(language)
+        if isinstance(analysis, dict):
+            return analysis
+
+        from utils.openrouter_api import analyze_polish_job_posting
+
+        ai_result = analyze_polish_job_posting(posting.description, language)
+        analysis = parse_json_object(ai_result)
+        if analysis is None:
+            logger.warning("Job posting analysis is not a JSON object, not storing it")
+            return {'analysis': ai_result}
+        posting.set_analysis(language, analysis)
+
+        # Wymagania i słowa kluczowe z AI są dokładniejsze niż lokalna heurystyka
+        requirements = string_list(analysis.get('key_requirements')) + string_list(analysis.get('technical_skills'))
+        if requirements:
+            posting.requirements = json.dumps(requirements[:MAX_STORED_REQUIREMENTS], ensure_ascii=False)
+        keywords = string_list(analysis.get('industry_keywords'))
+        if keywords:
+            posting.keywords = json.dumps(keywords[:MAX_STORED_KEYWORDS], ensure_ascii=False)
+
+        db.session.commit()
+        return analysis
+
+    def prompt_text(self, posting):
+        """Opis oferty do promptów: streszczenie dla długich ogłoszeń, pełny tekst dla krótkich"""
+        # Wklejony opis użytkownik widzi i kontroluje - przekazujemy go w całości
+        if posting.normalized_url and posting.summary and len(posting.description) > SUMMARY_THRESHOLD:
+            return posting.summary
+        return posting.description
+
+
+job_store = JobStore()
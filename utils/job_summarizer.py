@@ -0,0 +1,236 @@
+import re
+import math
+from collections import Counter
+
+# Lokalny, deterministyczny streszczacz ogłoszeń o pracę (bez wywołania LLM).
+# Każde zdanie to wektor częstości słów; waga zdania to iloczyn skalarny z wektorem
+# wag dokumentu plus premia za słowa-wskaźniki wymagań i obowiązków.
+
+MAX_SUMMARY_CHARS = 2000
+# Opisy dłuższe niż ten limit są streszczane przed wysłaniem do promptów
+SUMMARY_THRESHOLD = 4000
+TOP_KEYWORDS = 5
+
+WORD_RE = re.compile(r"[a-ząćęłńóśźżA-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźżA-ZĄĆĘŁŃÓŚŹŻ0-9+#./-]*[a-ząćęłńóśźżA-ZĄĆĘŁŃÓŚŹŻ0-9+#]|[A-Za-z]")
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?;])\s+(?=[A-ZĄĆĘŁŃÓŚŹŻ0-9•\-])')
+BULLET_RE = re.compile(r'^\s*(?:[-•*·▪●–]|\d+[.)])\s*')
+HEADING_RE = re.compile(r'^[^.!?]{2,60}:$')
+# Skróty, po których kropka nie kończy zdania ("kat. C+E", "min. 3 lata")
+ABBREVIATION_RE = re.compile(r'(?:^|\s)(?:[a-ząćęłńóśźż]{1,3}|np|itd|itp|tzw|ang|godz)\.$', re.IGNORECASE)
+
+STOPWORDS = frozenset('''
+a aby ale am an and are as at be by być bo ci co czy dla do for from gdy go i ich in is it
+ja jak jako je jego jej jest jeśli już każdy lub ma mamy na nad nas nie niż o od of on or oraz
+po pod przez przy się są ta tak także te tego tej the ten to too tu tym u w we will with wraz
+z za ze że our you your we're who which this that these those their they było będzie będziesz
+który która które których którym naszego naszej nasz nasza nasze twoje twój twoja oferujemy
+'''.split())
+
+# Słowa-wskaźniki zdań z wymaganiami i obowiązkami (rdzenie, dopasowanie prefiksem)
+REQUIREMENT_CUES = (
+    'wymag', 'oczekuj', 'doświadcz', 'znajomoś', 'umiejętn', 'wykształc', 'kwalifik', 'uprawnien',
+    'certyfik', 'prawo jazdy', 'mile widzian', 'biegł', 'min.', 'minimum',
+    'requir', 'experience', 'knowledge', 'skill', 'qualif', 'proficien', 'familiar', 'degree',
+    'must', 'nice to have', 'years',
+)
+RESPONSIBILITY_CUES = (
+    'obowiązk', 'zadani', 'odpowiedzialn', 'zakres', 'będziesz', 'prowadzeni', 'tworzeni',
+    'współprac', 'realizacj', 'obsług', 'przygotow', 'zarządz', 'analiz', 'projektow',
+    'responsib', 'duties', 'you will', 'develop', 'maintain', 'manage', 'design', 'build', 'support',
+)
+# Klauzule RODO i formułki rekrutacyjne - nie wnoszą nic do optymalizacji CV
+BOILERPLATE_CUES = (
+    'administrator', 'dane osobowe', 'danych osobowych', 'rodo', 'klauzul', 'zgodę na przetwarzanie',
+    'skontaktujemy się', 'wybranymi osobami', 'personal data', 'privacy', 'equal opportunit',
+    'cookies', 'aplikuj', 'apply now',
+)
+
+SECTION_HEADINGS = (
+    ('requirements', ('wymagani', 'oczekuj', 'kwalifikacj', 'profil kandydata', 'szukamy osoby', 'requirements',
+                      'qualifications', 'what we expect', 'must have', 'nice to have', 'mile widziane')),
+    ('responsibilities', ('obowiązki', 'zakres', 'zadania', 'czym będziesz', 'responsibilities', 'your role',
+                          'what you will do', 'duties')),
+    ('benefits', ('oferujemy', 'benefity', 'co oferujemy', 'we offer', 'benefits', 'perks')),
+)
+
+SECTION_LABELS = (
+    ('requirements', 'WYMAGANIA'),
+    ('responsibilities', 'OBOWIĄZKI'),
+    ('other', 'INNE INFORMACJE'),
+    ('benefits', 'OFERUJEMY'),
+)
+
+SECTION_BONUS = {'requirements': 2.0, 'responsibilities': 1.5, 'other': 0.0, 'benefits': -0.5}
+
+
+def _tokens(text):
+    return [word.lower().strip('./-') for word in WORD_RE.findall(text)]
+
+
+def _content_tokens(text):
+    return [token for token in _tokens(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _cue_score(text_lower, cues):
+    return sum(1 for cue in cues if cue in text_lower)
+
+
+def _detect_heading(line):
+    """Zwraca nazwę sekcji, jeśli linia jest nagłówkiem (np. 'Wymagania:')"""
+    candidate = line.strip().lower().rstrip(':').strip()
+    if not HEADING_RE.match(line.strip()) and len(candidate) > 40:
+        return None
+    for section, prefixes in SECTION_HEADINGS:
+        if any(candidate.startswith(prefix) for prefix in prefixes):
+            return section
+    return None
+
+
+def _split_line(line):
+    """Dzieli linię na zdania, sklejając fragmenty rozcięte po skrótach"""
+    sentences = []
+    for chunk in SENTENCE_SPLIT_RE.split(line):
+        chunk = ' '.join(chunk.split())
+        if sentences and ABBREVIATION_RE.search(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {chunk}"
+        else:
+            sentences.append(chunk)
+    return sentences
+
+
+def split_sentences(job_text):
+    """
+    Dzieli ogłoszenie na zdania i punkty listy, przypisując każde do sekcji.
+    Zwraca listę (pozycja, sekcja, zdanie).
+    """
+    sentences = []
+    section = 'other'
+    for raw_line in job_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        heading = _detect_heading(line)
+        if heading:
+            section = heading
+            # Nagłówek z treścią w tej samej linii: "Wymagania: Python, SQL"
+            if ':' in line and not line.endswith(':'):
+                line = line.split(':', 1)[1].strip()
+            else:
+                continue
+
+        line = BULLET_RE.sub('', line)
+        for sentence in _split_line(line):
+            if len(sentence) >= 12:
+                sentences.append((len(sentences), section, sentence))
+    return sentences
+
+
+def score_sentences(sentences):
+    """Liczy wagę każdego zdania; wynik zależy wyłącznie od treści (deterministyczny)"""
+    vectors = [Counter(_content_tokens(sentence)) for _, _, sentence in sentences]
+
+    # Wektor wag dokumentu: log-częstość termu tłumiona przez liczbę zdań, w których występuje
+    document_frequency = Counter()
+    for vector in vectors:
+        document_frequency.update(vector.keys())
+    total_sentences = max(len(sentences), 1)
+    term_weights = {
+        term: (1 + math.log(count)) * math.log(1 + total_sentences / count)
+        for term, count in document_frequency.items()
+    }
+
+    scores = []
+    for (position, section, sentence), vector in zip(sentences, vectors):
+        length = sum(vector.values())
+        text_lower = sentence.lower()
+        # Zdania bez treści i formułki RODO nigdy nie trafiają do streszczenia
+        if not length or _cue_score(text_lower, BOILERPLATE_CUES):
+            scores.append(float('-inf'))
+            continue
+
+        relevance = sum(term_weights[term] * count for term, count in vector.items()) / math.sqrt(length)
+        score = relevance
+        score += 1.5 * min(_cue_score(text_lower, REQUIREMENT_CUES), 2)
+        score += 1.0 * min(_cue_score(text_lower, RESPONSIBILITY_CUES), 2)
+        score += SECTION_BONUS.get(section, 0.0)
+        # Lekka premia za początek ogłoszenia (stanowisko, kontekst)
+        score += 1.0 / (1 + position)
+        scores.append(score)
+    return scores
+
+
+def extract_keywords(sentences, limit=TOP_KEYWORDS):
+    """Najważniejsze terminy: częste w sekcjach wymagań/obowiązków, z zachowaniem oryginalnej pisowni"""
+    weights = Counter()
+    surface_forms = {}
+    first_seen = {}
+
+    for position, section, sentence in sentences:
+        section_weight = {'requirements': 3.0, 'responsibilities': 2.0, 'benefits': 0.3}.get(section, 1.0)
+        if _cue_score(sentence.lower(), BOILERPLATE_CUES):
+            continue
+        for word_index, word in enumerate(WORD_RE.findall(sentence)):
+            token = word.lower().strip('./-')
+            if len(token) < 2 or token in STOPWORDS:
+                continue
+            # Nazwy technologii i skróty (SQL, Python, C#) są cenniejsze niż zwykłe słowa
+            is_term = any(char.isupper() for char in word[1:]) or word.isupper() or any(c in word for c in '+#.')
+            # Wielka litera na początku zdania nic nie znaczy
+            is_capitalized = word_index > 0 and word[0].isupper()
+            weight = section_weight * (2.0 if is_term else 1.3 if is_capitalized else 1.0)
+            if len(token) <= 3 and not is_term:
+                weight *= 0.3
+            weights[token] += weight
+            surface_forms.setdefault(token, Counter())[word.strip('./-')] += 1
+            first_seen.setdefault(token, position)
+
+    ranked = sorted(weights, key=lambda token: (-weights[token], first_seen[token], token))
+    return [surface_forms[token].most_common(1)[0][0] for token in ranked[:limit]]
+
+
+def summarize_job_text(job_text, max_chars=MAX_SUMMARY_CHARS, keyword_count=TOP_KEYWORDS):
+    """
+    Ekstrakcyjne streszczenie ogłoszenia w formacie zgodnym z dotychczasowym
+    podsumowaniem AI: sekcje z najważniejszymi zdaniami i na końcu 'KLUCZOWE SŁOWA:'.
+    """
+    sentences = split_sentences(job_text or '')
+    if not sentences:
+        return (job_text or '')[:max_chars]
+
+    scores = score_sentences(sentences)
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+
+    selected = []
+    used_chars = 0
+    seen = set()
+    for index in ranked:
+        if scores[index] == float('-inf'):
+            break
+        sentence = sentences[index][2]
+        key = sentence.lower()
+        if key in seen:
+            continue
+        if used_chars + len(sentence) > max_chars:
+            continue
+        selected.append(index)
+        seen.add(key)
+        used_chars += len(sentence) + 3
+
+    # Zachowaj kolejność z ogłoszenia w obrębie każdej sekcji
+    selected.sort()
+    by_section = {}
+    for index in selected:
+        _, section, sentence = sentences[index]
+        by_section.setdefault(section, []).append(sentence)
+
+    parts = []
+    for section, label in SECTION_LABELS:
+        if by_section.get(section):
+            parts.append(label + ':\n' + '\n'.join(f"- {sentence}" for sentence in by_section[section]))
+
+    keywords = extract_keywords(sentences, keyword_count)
+    if keywords:
+        parts.append('KLUCZOWE SŁOWA: ' + ', '.join(keywords))
+
+    return '\n\n'.join(parts)
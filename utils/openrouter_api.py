@@ -2,9 +2,9 @@ import os
 import json
 import logging
 import requests
-import urllib.parse
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from utils.job_summarizer import summarize_job_text
+from utils.cache import TTLCache, content_hash
 
 # Load environment variables from .env file with override
 load_dotenv(override=True)
@@ -86,6 +86,20 @@ headers = {
     "HTTP-Referer": "https://cv-optimizer-pro.repl.co/"
 }
 
+# Wyniki etapów zależnych tylko od oferty (bez CV) - współdzielone przez wszystkich użytkowników
+JOB_STAGE_CACHE_TTL = int(os.environ.get('JOB_STAGE_CACHE_TTL', str(24 * 3600)))
+job_stage_cache = TTLCache(maxsize=512, ttl=JOB_STAGE_CACHE_TTL)
+
+
+def cached_job_stage(stage, job_description, job_title, language, compute):
+    """
+    Zwraca wynik etapu, który zależy wyłącznie od ogłoszenia i stanowiska.
+    Klucz: nazwa etapu, skrót treści ogłoszenia, znormalizowany tytuł i język.
+    """
+    key = (stage, content_hash(job_description or ''), ' '.join((job_title or '').lower().split()), language)
+    return job_stage_cache.get_or_set(key, compute)
+
+
 def send_api_request(prompt, max_tokens=2000, language='pl', user_tier='free', task_type='default', industry='general'):
     """
     Send a request to the OpenRouter API with enhanced configuration
@@ -315,17 +329,86 @@ def optimize_for_position(cv_text, job_title, job_description="", language='pl')
         task_type='cv_optimization'
     )
 
-def generate_interview_tips(cv_text, job_description="", language='pl'):
+def prepare_interview_job_brief(job_description, job_title="", language='pl'):
     """
-    Generuje spersonalizowane tipy na rozmowę kwalifikacyjną
+    Część przygotowania do rozmowy zależna tylko od oferty: na czym skupi się rekruter,
+    o co warto zapytać i co sprawdzić o firmie. Liczona raz na ofertę i stanowisko.
     """
+    def compute():
+        prompt = f"""
+    Na podstawie opisu stanowiska przygotuj materiał do rozmowy kwalifikacyjnej, wspólny dla wszystkich kandydatów.
+
+    {"Stanowisko: " + job_title if job_title else ""}
+    Opis stanowiska:
+    {job_description[:3000]}
+
+    Odpowiedź w formacie JSON:
+    {{
+        "role_focus": [
+            "Kompetencja lub temat, który rekruter na pewno sprawdzi",
+            "Kolejny kluczowy obszar stanowiska"
+        ],
+        "questions_to_ask": [
+            "Przemyślane pytanie o firmę/zespół",
+            "Pytanie o rozwój w roli",
+            "Pytanie o wyzwania stanowiska"
+        ],
+        "research_suggestions": [
+            "Sprawdź informacje o: [aspekt firmy]",
+            "Poznaj ostatnie projekty firmy",
+            "Zbadaj kulturę organizacyjną"
+        ]
+    }}
+    """
+        return send_api_request(
+            prompt,
+            max_tokens=1000,
+            language=language,
+            user_tier='free',
+            task_type='interview_prep'
+        )
+
+    return cached_job_stage('interview_job_brief', job_description, job_title, language, compute)
+
+def generate_interview_tips(cv_text, job_description="", language='pl', job_title=""):
+    """
+    Generuje spersonalizowane tipy na rozmowę kwalifikacyjną.
+    Część zależna od oferty pochodzi ze współdzielonego cache, a osobne, mniejsze
+    wywołanie dopasowuje tylko elementy wynikające z CV.
+    """
+    job_brief = {}
+    if job_description or job_title:
+        job_brief = intelligent_response_parser(prepare_interview_job_brief(job_description, job_title, language))
+        if 'error' in job_brief:
+            job_brief = {}
+
+    focus = "\n".join(f"- {item}" for item in job_brief.get('role_focus', []))
+    if focus:
+        job_context = f"Obszary, które rekruter sprawdzi na tym stanowisku:\n{focus}"
+    else:
+        job_context = f"Stanowisko: {job_description}" if job_description else ""
+
+    # Pytania do pracodawcy i research firmy pochodzą z części wspólnej dla oferty
+    job_fields = "" if job_brief else """
+        "questions_to_ask": [
+            "Przemyślane pytanie o firmę/zespół",
+            "Pytanie o rozwój w roli",
+            "Pytanie o wyzwania stanowiska"
+        ],
+        "research_suggestions": [
+            "Sprawdź informacje o: [aspekt firmy]",
+            "Poznaj ostatnie projekty firmy",
+            "Zbadaj kulturę organizacyjną"
+        ],"""
+
     prompt = f"""
-    Na podstawie CV i opisu stanowiska, przygotuj spersonalizowane tipy na rozmowę kwalifikacyjną.
+    Na podstawie CV przygotuj spersonalizowane tipy na rozmowę kwalifikacyjną.
 
     CV:
     {cv_text}
 
-    {"Stanowisko: " + job_description if job_description else ""}
+    {"Stanowisko: " + job_title if job_title else ""}
+    {job_context}
 
     Odpowiedź w formacie JSON:
     {{
@@ -341,27 +424,27 @@ def generate_interview_tips(cv_text, job_description="", language='pl'):
         "weakness_preparation": [
             {{"potential_weakness": "obszar do poprawy", "how_to_address": "jak to przedstawić pozytywnie"}},
             {{"potential_weakness": "luka w CV", "how_to_address": "jak wytłumaczyć"}}
-        ],
-        "questions_to_ask": [
-            "Przemyślane pytanie o firmę/zespół",
-            "Pytanie o rozwój w roli",
-            "Pytanie o wyzwania stanowiska"
-        ],
-        "research_suggestions": [
-            "Sprawdź informacje o: [aspekt firmy]",
-            "Poznaj ostatnie projekty firmy",
-            "Zbadaj kulturę organizacyjną"
-        ],
+        ],{job_fields}
         "summary": "Kluczowe rady dla tego kandydata"
     }}
     """
-    return send_api_request(
+    personal = send_api_request(
         prompt, 
-        max_tokens=2000,
+        max_tokens=1200 if job_brief else 2000,
         language=language,
         user_tier='free',
         task_type='interview_prep'
     )
+    if not job_brief:
+        return personal
+
+    tips = intelligent_response_parser(personal)
+    if 'error' in tips:
+        return personal
+
+    tips['questions_to_ask'] = job_brief.get('questions_to_ask', [])
+    tips['research_suggestions'] = job_brief.get('research_suggestions', [])
+    return json.dumps(tips, ensure_ascii=False)
 
 def apply_recruiter_feedback_to_cv(cv_text, feedback, job_description, language='pl', is_premium=False, payment_verified=False):
     """Apply recruiter feedback to improve CV"""
@@ -394,7 +477,8 @@ def apply_recruiter_feedback_to_cv(cv_text, feedback, job_description, language=
 
 def analyze_polish_job_posting(job_description, language='pl'):
     """
-    Analizuje polskie ogłoszenia o pracę i wyciąga kluczowe informacje
+    Analizuje polskie ogłoszenia o pracę i wyciąga kluczowe informacje.
+    Wynik zależy tylko od ogłoszenia, więc jest współdzielony między użytkownikami.
     """
     prompt = f"""
     Przeanalizuj poniższe polskie ogłoszenie o pracę i wyciągnij z niego najważniejsze informacje.
@@ -480,13 +564,13 @@ def analyze_polish_job_posting(job_description, language='pl'):
         "summary": "zwięzłe podsumowanie stanowiska i wymagań"
     }}
     """
-    return send_api_request(
-        prompt, 
+    return cached_job_stage('job_posting_analysis', job_description, '', language, lambda: send_api_request(
+        prompt,
         max_tokens=2000,
         language=language,
         user_tier='free',
         task_type='cv_optimization'
-    )
+    ))
 
 def optimize_cv_for_specific_position(cv_text, target_position, job_description, company_name="", language='pl', is_premium=False, payment_verified=False):
     """
@@ -614,6 +698,94 @@ def generate_complete_cv_content(target_position, experience_level, industry, br
         task_type='cv_optimization'
     )
 
+def generate_generic_cv_content(target_position, experience_level, industry, language='pl'):
+    """
+    Ogólna treść CV dla stanowiska, poziomu i branży - bez danych konkretnej osoby.
+    Wynik trafia do katalogu (utils/cv_content_catalog.py) i jest współdzielony przez użytkowników.
+    """
+    prompt = f"""
+    ZADANIE: Wygeneruj WZORCOWĄ treść CV dla typowego kandydata. Treść będzie później
+    dopasowywana do opisu konkretnej osoby, więc NIE wymyślaj szczegółów osobistych.
+
+    DANE WEJŚCIOWE:
+    - Docelowe stanowisko: {target_position}
+    - Poziom doświadczenia: {experience_level} (junior/mid/senior)
+    - Branża: {industry}
+
+    WYMAGANIA:
+    1. PROFESSIONAL SUMMARY (80-120 słów) - typowe dla stanowiska i poziomu
+    2. DOŚWIADCZENIE (2-4 stanowiska, ścieżka kariery odpowiednia do poziomu):
+       - firmy opisowo, bez nazw własnych (np. "Firma z branży {industry}")
+       - 3-4 typowe obowiązki i osiągnięcia na stanowisko
+    3. WYKSZTAŁCENIE - kierunek pasujący do stanowiska, uczelnia opisowo (np. "Uczelnia techniczna")
+    4. UMIEJĘTNOŚCI - 8-12 pozycji, hard i soft skills, aktualne narzędzia branżowe
+
+    Odpowiedź w formacie JSON:
+    {{
+        "professional_title": "Tytuł zawodowy do CV",
+        "professional_summary": "Podsumowanie zawodowe 80-120 słów",
+        "experience_suggestions": [
+            {{
+                "title": "Stanowisko",
+                "company": "Opis firmy",
+                "startDate": "2022-01",
+                "endDate": "obecnie",
+                "description": "Opis obowiązków i osiągnięć (3-4 punkty)"
+            }}
+        ],
+        "education_suggestions": [
+            {{
+                "degree": "Kierunek studiów",
+                "school": "Opis uczelni",
+                "startYear": "2018",
+                "endYear": "2022"
+            }}
+        ],
+        "skills_list": "Umiejętność 1, Umiejętność 2, Umiejętność 3, Umiejętność 4, Umiejętność 5, Umiejętność 6, Umiejętność 7, Umiejętność 8"
+    }}
+    """
+    return send_api_request(
+        prompt,
+        max_tokens=3000,
+        language=language,
+        user_tier='free',
+        task_type='cv_optimization'
+    )
+
+def personalize_cv_content(generic_content, brief_background, target_position, experience_level, language='pl'):
+    """
+    Dopasowuje ogólną treść z katalogu do opisu użytkownika. Przepisywane są tylko
+    podsumowanie i doświadczenie - tytuł, wykształcenie i umiejętności zostają z katalogu.
+    """
+    draft = json.dumps({
+        'professional_summary': generic_content.get('professional_summary', ''),
+        'experience_suggestions': generic_content.get('experience_suggestions', []),
+    }, ensure_ascii=False)
+    prompt = f"""
+    ZADANIE: Dopasuj wzorcową treść CV do krótkiego opisu kandydata.
+
+    STANOWISKO: {target_position} ({experience_level})
+    OPIS KANDYDATA: {brief_background}
+
+    WZORCOWA TREŚĆ (JSON):
+    {draft}
+
+    ZASADY:
+    - Przepisz professional_summary (80-120 słów), uwzględniając fakty z opisu kandydata
+    - W experience_suggestions zachowaj strukturę; jeśli opis podaje firmy, okresy
+      lub obowiązki - użyj ich zamiast wzorcowych, pozostałe pola zostaw bez zmian
+    - Nie dodawaj faktów, których nie ma w opisie ani we wzorcu
+
+    Odpowiedź wyłącznie w formacie JSON z kluczami "professional_summary" i "experience_suggestions".
+    """
+    return send_api_request(
+        prompt,
+        max_tokens=1500,
+        language=language,
+        user_tier='free',
+        task_type='cv_optimization'
+    )
+
 def optimize_cv(cv_text, job_description, language='pl', is_premium=False, payment_verified=False):
     """
     Create a clean, optimized version of CV using ONLY authentic data from the original CV
@@ -802,91 +974,17 @@ def generate_cover_letter(cv_text, job_description, language='pl'):
         task_type='cover_letter'
     )
 
-def analyze_job_url(url):
+def analyze_job_url(url, ai_summary=False):
     """
-    Extract job description from a URL with improved handling for popular job sites
+    Extract job description from a URL with improved handling for popular job sites.
+    Long descriptions are summarized locally; ai_summary=True uses the LLM summary (premium).
+    The page is fetched and parsed once by the shared job pipeline and reused from its cache.
     """
+    from utils.job_pipeline import job_pipeline
+
     try:
         logger.debug(f"Analyzing job URL: {url}")
-
-        parsed_url = urllib.parse.urlparse(url)
-        if not parsed_url.scheme or not parsed_url.netloc:
-            raise ValueError("Invalid URL format")
-
-        response = requests.get(url, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        })
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        job_text = ""
-        domain = parsed_url.netloc.lower()
-
-        if 'linkedin.com' in domain:
-            containers = soup.select('.description__text, .show-more-less-html, .jobs-description__content')
-            if containers:
-                job_text = containers[0].get_text(separator='\n', strip=True)
-
-        elif 'indeed.com' in domain:
-            container = soup.select_one('#jobDescriptionText')
-            if container:
-                job_text = container.get_text(separator='\n', strip=True)
-
-        elif 'pracuj.pl' in domain:
-            containers = soup.select('[data-test="section-benefit-expectations-text"], [data-test="section-description-text"]')
-            if containers:
-                job_text = '\n'.join([c.get_text(separator='\n', strip=True) for c in containers])
-
-        elif 'olx.pl' in domain or 'praca.pl' in domain:
-            containers = soup.select('.offer-description, .offer-content, .description')
-            if containers:
-                job_text = containers[0].get_text(separator='\n', strip=True)
-
-        if not job_text:
-            potential_containers = soup.select('.job-description, .description, .details, article, .job-content, [class*=job], [class*=description], [class*=offer]')
-            if potential_containers:
-                for container in potential_containers:
-                    container_text = container.get_text(separator='\n', strip=True)
-                    if len(container_text) > len(job_text):
-                        job_text = container_text
-
-            if not job_text and soup.body:
-                for tag in soup.select('nav, header, footer, script, style, iframe'):
-                    tag.decompose()
-
-                job_text = soup.body.get_text(separator='\n', strip=True)
-
-                if len(job_text) > 10000:
-                    paragraphs = job_text.split('\n')
-                    keywords = ['requirements', 'responsibilities', 'qualifications', 'skills', 'experience', 'about the job',
-                                'wymagania', 'obowiązki', 'kwalifikacje', 'umiejętności', 'doświadczenie', 'o pracy']
-
-                    relevant_paragraphs = []
-                    found_relevant = False
-
-                    for paragraph in paragraphs:
-                        if any(keyword.lower() in paragraph.lower() for keyword in keywords):
-                            found_relevant = True
-                        if found_relevant and len(paragraph.strip()) > 50:
-                            relevant_paragraphs.append(paragraph)
-
-                    if relevant_paragraphs:
-                        job_text = '\n'.join(relevant_paragraphs)
-
-
-        job_text = '\n'.join([' '.join(line.split()) for line in job_text.split('\n') if line.strip()])
-
-        if not job_text:
-            raise ValueError("Could not extract job description from the URL")
-
-        logger.debug(f"Successfully extracted job description from URL")
-
-        if len(job_text) > 4000:
-            logger.debug(f"Job description is long ({len(job_text)} chars), summarizing with AI")
-            job_text = summarize_job_description(job_text)
-
-        return job_text
+        return job_pipeline.run(url, ai_summary=ai_summary)['job_text']
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching job URL: {str(e)}")
@@ -896,10 +994,15 @@ def analyze_job_url(url):
         logger.error(f"Error analyzing job URL: {str(e)}")
         raise Exception(f"Failed to analyze job posting: {str(e)}")
 
-def summarize_job_description(job_text):
+def summarize_job_description(job_text, use_ai=False):
     """
-    Summarize a long job description using the AI
+    Summarize a long job description.
+    By default uses the local extractive summarizer (no API call, deterministic);
+    use_ai=True sends the text to the LLM instead.
     """
+    if not use_ai:
+        return summarize_job_text(job_text)
+
     prompt = f"""
     ZADANIE: Wyciągnij i podsumuj kluczowe informacje z tego ogłoszenia o pracę w języku polskim.
 
@@ -1042,29 +1145,76 @@ def analyze_cv_strengths(cv_text, job_title="analityk danych", language='pl'):
         task_type='cv_optimization'
     )
 
-def generate_interview_questions(cv_text, job_description="", language='pl'):
+def prepare_interview_question_bank(job_description, job_title="", language='pl'):
     """
-    Generate likely interview questions based on CV and job description
+    Pytania rekrutacyjne wynikające z samej oferty (bez CV), ze wskazówkami,
+    czego oczekuje rekruter. Liczone raz na ofertę i stanowisko.
     """
-    context = ""
-    if job_description:
-        context = f"Uwzględnij poniższe ogłoszenie o pracę przy tworzeniu pytań:\n{job_description[:2000]}"
+    def compute():
+        prompt = f"""
+    TASK: Wygeneruj zestaw pytań rekrutacyjnych typowych dla tego stanowiska, niezależnych od konkretnego kandydata.
 
-    prompt = f"""
-    TASK: Wygeneruj zestaw potencjalnych pytań rekrutacyjnych, które kandydat może otrzymać podczas rozmowy kwalifikacyjnej.
+    {"Stanowisko: " + job_title if job_title else ""}
+    Ogłoszenie o pracę:
+    {job_description[:2000]}
 
-    Pytania powinny być:
-    1. Specyficzne dla doświadczenia i umiejętności kandydata wymienionych w CV
-    2. Dopasowane do stanowiska (jeśli podano opis stanowiska)
-    3. Zróżnicowane - połączenie pytań technicznych, behawioralnych i sytuacyjnych
-    4. Realistyczne i często zadawane przez rekruterów
+    Uwzględnij po co najmniej 2 pytania z każdej kategorii:
+    - Pytania techniczne/o umiejętności wymagane w ogłoszeniu
+    - Pytania behawioralne
+    - Pytania sytuacyjne
+    - Pytania o motywację i dopasowanie do firmy/stanowiska
 
-    Uwzględnij po co najmniej 3 pytania z każdej kategorii:
+    Do każdego pytania dodaj krótką wskazówkę, czego oczekuje rekruter.
+    Format odpowiedzi:
+    - Pytanie rekrutacyjne
+      * Wskazówka jak odpowiedzieć: [wskazówka]
+    """
+        return send_api_request(
+            prompt,
+            max_tokens=1200,
+            language=language,
+            user_tier='free',
+            task_type='interview_prep'
+        )
+
+    return cached_job_stage('interview_question_bank', job_description, job_title, language, compute)
+
+# Pełny zakres kategorii, gdy nie ma oferty (a więc i wspólnego zestawu pytań o stanowisko)
+INTERVIEW_QUESTION_CATEGORIES = """Uwzględnij po co najmniej 3 pytania z każdej kategorii:
     - Pytania o doświadczenie zawodowe
     - Pytania techniczne/o umiejętności
     - Pytania behawioralne
     - Pytania sytuacyjne
-    - Pytania o motywację i dopasowanie do firmy/stanowiska
+    - Pytania o motywację i dopasowanie do firmy/stanowiska"""
+
+def generate_interview_questions(cv_text, job_description="", language='pl', job_title=""):
+    """
+    Generate likely interview questions based on CV and job description.
+    Role-level questions come from the shared per-job cache; the CV call only adds
+    questions about the candidate's own experience.
+    """
+    if not job_description and not job_title:
+        return _generate_cv_interview_questions(cv_text, language, max_tokens=2000,
+                                                context=INTERVIEW_QUESTION_CATEGORIES)
+
+    question_bank = prepare_interview_question_bank(job_description, job_title, language)
+    personal = _generate_cv_interview_questions(
+        cv_text, language, max_tokens=1000,
+        context=f"Kandydat aplikuje na stanowisko: {job_title or 'opisane w ogłoszeniu'}. "
+                f"Pytania ogólne o to stanowisko są już przygotowane - skup się wyłącznie na CV.")
+
+    if language == 'en':
+        return f"ROLE QUESTIONS:\n{question_bank}\n\nQUESTIONS ABOUT YOUR CV:\n{personal}"
+    return f"PYTANIA DOTYCZĄCE STANOWISKA:\n{question_bank}\n\nPYTANIA DOTYCZĄCE TWOJEGO CV:\n{personal}"
+
+def _generate_cv_interview_questions(cv_text, language='pl', max_tokens=2000, context=""):
+    prompt = f"""
+    TASK: Wygeneruj zestaw potencjalnych pytań rekrutacyjnych, które kandydat może otrzymać podczas rozmowy kwalifikacyjnej.
+
+    Pytania powinny być:
+    1. Specyficzne dla doświadczenia i umiejętności kandydata wymienionych w CV
+    2. Zróżnicowane - połączenie pytań o doświadczenie, projekty, osiągnięcia i luki w CV
+    3. Realistyczne i często zadawane przez rekruterów
 
     {context}
 
@@ -1079,7 +1229,7 @@ def generate_interview_questions(cv_text, job_description="", language='pl'):
     """
     return send_api_request(
         prompt,
-        max_tokens=2000,
+        max_tokens=max_tokens,
         language=language,
         user_tier='free',
         task_type='interview_prep'
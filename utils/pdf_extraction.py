@@ -1,53 +1,425 @@
 import logging
 import os
+import re
+import time
+import threading
 import PyPDF2
 import io
+from contextlib import contextmanager
+from concurrent.futures import Future
+from utils.sandbox_pool import SandboxPool, SandboxTimeout, SandboxCrashed, SandboxBusy, per_worker_size
 
-def extract_text(pdf_path):
-    """Extract text using PyPDF2 as primary method"""
+logger = logging.getLogger(__name__)
+
+EXTRACTION_FAILED_MESSAGE = "Nie udało się wyodrębnić tekstu z PDF. Proszę wkleić tekst CV ręcznie."
+TOO_COMPLEX_MESSAGE = "PDF jest zbyt złożony do przetworzenia. Zapisz go ponownie lub wklej tekst CV."
+
+# Konfiguracja silnika ekstrakcji
+PDF_EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS', str(min(4, per_worker_size(os.cpu_count() or 1)))))
+PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', '50'))
+
+# Piaskownica: parsowanie PDF w osobnych procesach z limitami zasobów
+PDF_SANDBOX_ENABLED = os.environ.get('PDF_SANDBOX_ENABLED', 'true').lower() == 'true'
+PDF_SANDBOX_CPU_SECONDS = int(os.environ.get('PDF_SANDBOX_CPU_SECONDS', '10'))
+PDF_SANDBOX_MEMORY_MB = int(os.environ.get('PDF_SANDBOX_MEMORY_MB', '768'))
+PDF_SANDBOX_TIMEOUT = float(os.environ.get('PDF_SANDBOX_TIMEOUT', '15'))
+PDF_SANDBOX_MAX_JOBS = int(os.environ.get('PDF_SANDBOX_MAX_JOBS', '200'))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '4'))
+PDF_PAGES_PER_CHUNK = int(os.environ.get('PDF_PAGES_PER_CHUNK', '2'))
+PDF_QUALITY_THRESHOLD = float(os.environ.get('PDF_QUALITY_THRESHOLD', '0.6'))
+
+# Generatory PDF, dla których PyPDF2 zwykle skleja słowa - od razu używamy PDFMiner
+PDFMINER_PREFERRED_PRODUCERS = ('pdftex', 'xetex', 'luatex', 'latex', 'ghostscript', 'dvipdf')
+
+BACKENDS = ('pypdf2', 'pdfminer')
+
+PDF_MAGIC = b'%PDF-'
+# Specyfikacja dopuszcza śmieci przed nagłówkiem - szukamy go w pierwszym kilobajcie
+PDF_HEADER_WINDOW = 1024
+PAGE_OBJECT_RE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+CID_RE = re.compile(r'\(cid:\d+\)')
+GARBAGE_CHARS_RE = re.compile('[\ufffd\u25a0\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+@contextmanager
+def open_pdf_source(source):
+    """
+    Udostępnia PDF jako binarny strumień niezależnie od formy wejścia:
+    ścieżka na dysku, bytes albo obiekt plikowy (np. strumień przesłanego pliku).
+    Strumienie przekazane z zewnątrz nie są zamykane.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield file
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+def describe_pdf_source(source):
+    """Krótki opis źródła do logów (bez zrzucania zawartości bajtów)"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes>"
+    return f"<{type(source).__name__}>"
+
+
+class PDFRejected(ValueError):
+    """PDF odrzucony przed lub w trakcie parsowania (nie PDF, za dużo stron, zbyt kosztowny)"""
+
+
+class PDFExtractionFailed(Exception):
+    """Z PDF nie udało się wyodrębnić tekstu (skan, sam obraz, błąd parsera)"""
+
+    def __init__(self, message=EXTRACTION_FAILED_MESSAGE):
+        super().__init__(message)
+
+
+def precheck_pdf(data):
+    """
+    Tanie sprawdzenia przed parsowaniem: nagłówek %PDF- i przybliżona liczba stron
+    (obiekty /Type /Page poza strumieniami obiektów - to dolne oszacowanie).
+    """
+    if PDF_MAGIC not in data[:PDF_HEADER_WINDOW]:
+        raise PDFRejected("Plik nie jest poprawnym dokumentem PDF")
+
+    estimated_pages = len(PAGE_OBJECT_RE.findall(data))
+    if estimated_pages > PDF_MAX_PAGES:
+        raise PDFRejected(f"PDF ma zbyt wiele stron ({estimated_pages}). Maksimum: {PDF_MAX_PAGES}")
+    return estimated_pages
+
+
+def read_pdf_bytes(source):
+    with open_pdf_source(source) as file:
+        return bytes(file.read())
+
+
+def iter_page_texts(backend, data, page_numbers=None):
+    """Zwraca tekst kolejnych stron wybranym backendem (page_numbers=None - wszystkie)"""
+    if backend == 'pypdf2':
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        numbers = range(len(reader.pages)) if page_numbers is None else page_numbers
+        for number in numbers:
+            yield reader.pages[number].extract_text() or ''
+
+    elif backend == 'pdfminer':
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams, LTTextContainer
+
+        for page in extract_pages(io.BytesIO(data), page_numbers=page_numbers, laparams=LAParams()):
+            yield ''.join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+
+    else:
+        raise ValueError(f"Unknown PDF backend: {backend}")
+
+
+def collect_pages(page_texts, max_chars=None):
+    """Skleja strony do osiągnięcia limitu; zwraca (tekst, liczba stron, czy przerwano)"""
+    collected = []
+    total = 0
+    for text in page_texts:
+        collected.append(text)
+        total += len(text)
+        if max_chars and total > max_chars:
+            return ''.join(collected), len(collected), True
+    return ''.join(collected), len(collected), False
+
+
+# Funkcje poniżej są wykonywane w procesach piaskownicy - muszą być na poziomie modułu
+
+def extract_page_chunk(backend, data, page_numbers):
+    """Ekstrakcja fragmentu stron"""
+    return list(iter_page_texts(backend, data, page_numbers))
+
+
+def extract_document(backend, data, max_chars=None):
+    """Ekstrakcja kolejnych stron całego dokumentu z przerwaniem po max_chars"""
+    return collect_pages(iter_page_texts(backend, data), max_chars)
+
+
+def probe_pdf(data):
+    """Liczba stron i producent dokumentu (PyPDF2 czyta tylko xref i trailer)"""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    metadata = reader.metadata or {}
+    producer = ' '.join(str(metadata.get(key) or '') for key in ('/Producer', '/Creator'))
+    return len(reader.pages), producer.lower()
+
+
+def score_text_quality(text, page_count=None):
+    """
+    Ocena jakości wyodrębnionego tekstu w skali 0-1:
+    udział poprawnych znaków, sklejone słowa (brak spacji) i gęstość tekstu na stronę
+    (skany i PDF-y z samymi obrazkami dają prawie pusty tekst).
+    """
+    stripped = text.strip()
+    if not stripped:
+        return 0.0
+
+    garbage = len(GARBAGE_CHARS_RE.findall(stripped)) + 6 * len(CID_RE.findall(stripped))
+    clean_ratio = max(0.0, 1.0 - garbage / len(stripped))
+
+    words = stripped.split()
+    merged_ratio = sum(1 for word in words if len(word) > 25) / len(words)
+    spacing_factor = max(0.0, 1.0 - 5 * merged_ratio)
+
+    chars_per_page = len(stripped) / max(page_count or 1, 1)
+    density_factor = min(1.0, chars_per_page / 200)
+
+    return round(clean_ratio * spacing_factor * density_factor, 3)
+
+
+class ExtractionStats:
+    """Liczniki i czasy per backend (na proces), widoczne w /debug-stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.documents = 0
+        self.fallbacks = 0
+        self.truncated = 0
+        self.backends = {backend: {'runs': 0, 'pages': 0, 'total_ms': 0.0, 'failures': 0, 'quality_sum': 0.0}
+                         for backend in BACKENDS}
+
+    def record_run(self, backend, pages, elapsed_ms, quality=None, failed=False):
+        with self._lock:
+            entry = self.backends[backend]
+            entry['runs'] += 1
+            entry['pages'] += pages
+            entry['total_ms'] += elapsed_ms
+            if failed:
+                entry['failures'] += 1
+            else:
+                entry['quality_sum'] += quality or 0.0
+
+    def record_document(self, fallback, truncated):
+        with self._lock:
+            self.documents += 1
+            self.fallbacks += int(fallback)
+            self.truncated += int(truncated)
+
+    def snapshot(self):
+        with self._lock:
+            backends = {}
+            for backend, entry in self.backends.items():
+                successful = entry['runs'] - entry['failures']
+                backends[backend] = {
+                    'runs': entry['runs'],
+                    'failures': entry['failures'],
+                    'pages': entry['pages'],
+                    'avg_ms': round(entry['total_ms'] / entry['runs'], 2) if entry['runs'] else 0.0,
+                    'ms_per_page': round(entry['total_ms'] / entry['pages'], 2) if entry['pages'] else 0.0,
+                    'avg_quality': round(entry['quality_sum'] / successful, 3) if successful else 0.0,
+                }
+            return {
+                'documents': self.documents,
+                'fallbacks': self.fallbacks,
+                'truncated': self.truncated,
+                'backends': backends,
+            }
+
+
+class PDFExtractionEngine:
+    """
+    Silnik ekstrakcji tekstu z PDF:
+    - odrzuca pliki bez nagłówka PDF lub z nadmierną liczbą stron przed parsowaniem,
+    - parsuje w piaskownicy (osobne procesy z limitami CPU, pamięci i czasu),
+    - wybiera backend (PyPDF2 / PDFMiner) na podstawie metadanych dokumentu,
+    - wielostronicowe pliki dzieli na fragmenty przetwarzane równolegle w piaskownicy,
+    - przerywa po zebraniu max_chars znaków,
+    - ocenia jakość tekstu i tylko przy słabym wyniku próbuje drugiego backendu.
+    """
+
+    def __init__(self, sandbox=None, parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+                 pages_per_chunk=PDF_PAGES_PER_CHUNK, quality_threshold=PDF_QUALITY_THRESHOLD,
+                 max_pages=PDF_MAX_PAGES):
+        self.sandbox = sandbox
+        self.parallel_min_pages = parallel_min_pages
+        self.pages_per_chunk = max(1, pages_per_chunk)
+        self.quality_threshold = quality_threshold
+        self.max_pages = max_pages
+        self.stats = ExtractionStats()
+
+    @property
+    def workers(self):
+        return self.sandbox.size if self.sandbox else 1
+
+    def _call(self, func, *args):
+        if self.sandbox:
+            return self.sandbox.run(func, *args)
+        return func(*args)
+
+    def _submit(self, func, *args):
+        if self.sandbox:
+            return self.sandbox.submit(func, *args)
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def probe(self, data):
+        try:
+            return self._call(probe_pdf, data)
+        except (SandboxTimeout, SandboxCrashed, SandboxBusy):
+            raise
+        except Exception as e:
+            logger.debug(f"PyPDF2 could not open PDF for probing: {e}")
+            return None, ''
+
+    def choose_backend(self, page_count, producer):
+        if page_count is None:
+            return 'pdfminer'  # PyPDF2 nie otworzył pliku - PDFMiner jest bardziej tolerancyjny
+        if any(name in producer for name in PDFMINER_PREFERRED_PRODUCERS):
+            return 'pdfminer'
+        return 'pypdf2'
+
+    def _run_parallel(self, backend, data, page_count, max_chars):
+        chunks = [list(range(start, min(start + self.pages_per_chunk, page_count)))
+                  for start in range(0, page_count, self.pages_per_chunk)]
+        futures = [self._submit(extract_page_chunk, backend, data, chunk) for chunk in chunks]
+
+        def ordered_pages():
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                # Po osiągnięciu limitu nie czekamy na pozostałe fragmenty
+                for future in futures:
+                    future.cancel()
+
+        return collect_pages(ordered_pages(), max_chars)
+
+    def run_backend(self, backend, data, page_count, max_chars=None):
+        """Ekstrakcja jednym backendem; zwraca (tekst, liczba stron, przerwano, jakość)"""
+        start = time.perf_counter()
+        parallel = (page_count is not None and page_count >= self.parallel_min_pages
+                    and self.workers > 1)
+        try:
+            if parallel:
+                text, pages, truncated = self._run_parallel(backend, data, page_count, max_chars)
+            else:
+                text, pages, truncated = self._call(extract_document, backend, data, max_chars)
+        except SandboxBusy:
+            raise
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats.record_run(backend, 0, elapsed_ms, failed=True)
+            if isinstance(e, (SandboxTimeout, SandboxCrashed)) or getattr(e, 'error_type', None) == 'MemoryError':
+                # Dokument przekroczył limity zasobów - drugi backend tylko zmarnowałby kolejny proces
+                raise PDFRejected(TOO_COMPLEX_MESSAGE) from e
+            logger.warning(f"PDF backend {backend} failed after {elapsed_ms:.1f} ms: {e}")
+            return '', 0, False, 0.0
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        quality = score_text_quality(text, pages)
+        self.stats.record_run(backend, pages, elapsed_ms, quality)
+        logger.debug(f"PDF backend {backend}: {pages} pages, {len(text)} chars, "
+                     f"quality={quality}, {elapsed_ms:.1f} ms{' (parallel)' if parallel else ''}")
+        return text, pages, truncated, quality
+
+    def extract(self, source, max_chars=None):
+        """
+        Zwraca {'text', 'backend', 'page_count', 'pages_extracted', 'truncated', 'quality', 'fallback'}.
+        max_chars - po przekroczeniu tej liczby znaków kolejne strony nie są czytane.
+        Zgłasza PDFRejected dla plików odrzuconych przez sprawdzenia lub limity piaskownicy.
+        """
+        data = read_pdf_bytes(source)
+        precheck_pdf(data)
+
+        try:
+            page_count, producer = self.probe(data)
+        except (SandboxTimeout, SandboxCrashed) as e:
+            raise PDFRejected(TOO_COMPLEX_MESSAGE) from e
+        if page_count and page_count > self.max_pages:
+            raise PDFRejected(f"PDF ma zbyt wiele stron ({page_count}). Maksimum: {self.max_pages}")
+
+        primary = self.choose_backend(page_count, producer)
+        text, pages, truncated, quality = self.run_backend(primary, data, page_count, max_chars)
+        result = {'text': text, 'backend': primary, 'page_count': page_count, 'pages_extracted': pages,
+                  'truncated': truncated, 'quality': quality, 'fallback': False}
+
+        if quality < self.quality_threshold:
+            secondary = next(backend for backend in BACKENDS if backend != primary)
+            logger.info(f"PDF text quality {quality} from {primary} below {self.quality_threshold}, trying {secondary}")
+            alt_text, alt_pages, alt_truncated, alt_quality = self.run_backend(secondary, data, page_count, max_chars)
+            result['fallback'] = True
+            if alt_quality > quality:
+                result.update(text=alt_text, backend=secondary, pages_extracted=alt_pages,
+                              truncated=alt_truncated, quality=alt_quality)
+
+        self.stats.record_document(result['fallback'], result['truncated'])
+        return result
+
+
+pdf_sandbox = SandboxPool(
+    'pdf',
+    size=PDF_EXTRACTION_WORKERS,
+    cpu_seconds=PDF_SANDBOX_CPU_SECONDS,
+    memory_mb=PDF_SANDBOX_MEMORY_MB,
+    timeout=PDF_SANDBOX_TIMEOUT,
+    max_jobs_per_worker=PDF_SANDBOX_MAX_JOBS,
+) if PDF_SANDBOX_ENABLED else None
+
+pdf_engine = PDFExtractionEngine(sandbox=pdf_sandbox)
+
+
+def extract_text(source, max_chars=None):
+    """Extract text with the multi-backend engine (PyPDF2 / PDFMiner); raises PDFExtractionFailed"""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-        return text
+        text = pdf_engine.extract(source, max_chars=max_chars)['text']
+    except (PDFRejected, SandboxBusy):
+        # Odrzucony plik i przeciążona piaskownica nie są błędami ekstrakcji
+        raise
     except Exception as e:
-        logging.error(f"PyPDF2 extraction failed: {e}")
-        return "Nie udało się wyodrębnić tekstu z PDF. Proszę wkleić tekst CV ręcznie."
+        logging.error(f"PDF extraction failed: {e}")
+        raise PDFExtractionFailed() from e
+    if not text.strip():
+        raise PDFExtractionFailed()
+    return text
 
-logger = logging.getLogger(__name__)
-
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_pdf(source, max_chars=None):
     """
-    Extracts text from a PDF file using PDFMiner.
-    
+    Extracts text from a PDF without writing it to disk first.
+
     Args:
-        pdf_path (str): Path to the PDF file
-        
+        source: Path to the PDF file, raw PDF bytes or a binary file-like
+            object (e.g. the upload stream from request.files)
+        max_chars (int): Stop reading further pages once this many characters
+            have been collected (None - read the whole document)
+
     Returns:
         str: Extracted text from the PDF
-        
+
     Raises:
+        PDFRejected: If the file is not a PDF, has too many pages or exceeds
+            the sandbox CPU/memory/time limits
+        SandboxBusy: If all sandbox workers stayed busy (retry later)
+        PDFExtractionFailed: If no text could be extracted (e.g. a scanned
+            document); the failure is never returned as text
         Exception: If there's an error during extraction
     """
     try:
-        logger.debug(f"Extracting text from PDF: {pdf_path}")
-        
-        # Check if file exists
-        if not os.path.isfile(pdf_path):
-            raise FileNotFoundError(f"PDF file not found at path: {pdf_path}")
-        
-        # Extract text using PDFMiner
-        text = extract_text(pdf_path)
-        
-        if not text.strip():
-            logger.warning(f"No text extracted from PDF: {pdf_path}")
-            return "No text could be extracted from this PDF. The file might be scanned or contain only images."
-        
+        logger.debug(f"Extracting text from PDF: {describe_pdf_source(source)}")
+
+        if isinstance(source, (str, os.PathLike)) and not os.path.isfile(source):
+            raise FileNotFoundError(f"PDF file not found at path: {source}")
+
+        text = extract_text(source, max_chars=max_chars)
         logger.debug(f"Successfully extracted {len(text)} characters from PDF")
         return text
-    
+
+    except PDFExtractionFailed:
+        logger.warning(f"No text extracted from PDF: {describe_pdf_source(source)}")
+        raise
+    except (PDFRejected, SandboxBusy):
+        raise
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {str(e)}")
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
@@ -0,0 +1,217 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+import unicodedata
+from utils.cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Zmienić przy każdej zmianie wyglądu PDF (style, układ szablonów) - stare wpisy przestaną pasować
+RENDERER_VERSION = 2
+
+PDF_RENDER_CACHE_ENABLED = os.environ.get('PDF_RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+PDF_RENDER_CACHE_DIR = os.environ.get('PDF_RENDER_CACHE_DIR',
+                                      os.path.join(tempfile.gettempdir(), 'cv_pdf_cache'))
+PDF_RENDER_CACHE_MAX_MB = int(os.environ.get('PDF_RENDER_CACHE_MAX_MB', '200'))
+# Po przekroczeniu limitu usuwamy najdawniej używane pliki aż do tego ułamka limitu
+EVICTION_TARGET = 0.9
+CACHE_SUFFIX = '.pdf'
+
+
+def normalize_cv_data(value):
+    """
+    Postać kanoniczna danych CV: NFC i obcięte odstępy w tekstach, posortowane klucze.
+    Puste pola zostają - szablony rozróżniają brak pola od pustej wartości (np. endDate).
+    """
+    if isinstance(value, dict):
+        return {str(key): normalize_cv_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_cv_data(item) for item in value]
+    if isinstance(value, str):
+        return unicodedata.normalize('NFC', value).strip()
+    return value
+
+
+def render_cache_key(cv_data, template):
+    canonical = json.dumps(normalize_cv_data(cv_data), sort_keys=True, ensure_ascii=False,
+                           separators=(',', ':'), default=str)
+    return content_hash('cv-pdf', RENDERER_VERSION, template, canonical)
+
+
+class PDFRenderCache:
+    """
+    Dyskowa pamięć podręczna wygenerowanych PDF z CV, ograniczona rozmiarem (LRU po mtime).
+    Katalog może być współdzielony przez procesy gunicorna: zapis jest atomowy
+    (plik tymczasowy + os.replace), a plik usunięty przez inny proces to zwykły brak w cache.
+    """
+
+    def __init__(self, directory=PDF_RENDER_CACHE_DIR, max_bytes=PDF_RENDER_CACHE_MAX_MB * 1024 * 1024,
+                 enabled=PDF_RENDER_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._approx_bytes = None  # liczone przy pierwszym zapisie, potem szacowane przyrostowo
+        self._stats = {'hits': 0, 'misses': 0, 'renders': 0, 'writes': 0, 'write_errors': 0,
+                       'evictions': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """Bajty PDF z cache albo None; trafienie odświeża pozycję wpisu w kolejce LRU"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return data
+
+    def put(self, key, data):
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            self._count('write_errors')
+            logger.warning(f"PDF render cache write failed: {e}")
+            return
+
+        self._count('writes')
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(data)
+            needs_eviction = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if needs_eviction:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(CACHE_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def evict(self):
+        """Usuwa najdawniej używane pliki, gdy katalog przekracza limit rozmiaru"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICTION_TARGET
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass  # usunięty równolegle przez inny proces
+                except OSError as e:
+                    logger.warning(f"PDF render cache eviction failed for {path}: {e}")
+                    continue
+                total -= size
+        with self._lock:
+            self._approx_bytes = total
+            self._stats['evictions'] += removed
+
+    def cached_path(self, key):
+        """Ścieżka pliku z PDF (do wysłania bez wczytywania do pamięci) albo None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def ensure_rendered(self, cv_data, template, render):
+        """
+        Dba o to, żeby PDF był w cache, bez wczytywania go przy trafieniu.
+        Zwraca (klucz, None), gdy plik jest na dysku, albo (klucz, bajty), gdy
+        zapis się nie powiódł (albo cache jest wyłączony) i PDF trzeba oddać od razu.
+        """
+        key = render_cache_key(cv_data, template)
+        if self.cached_path(key):
+            self._count('hits')
+            return key, None
+        self._count('misses')
+
+        data = render()
+        self._count('renders')
+        self.put(key, data)
+        return key, None if self.cached_path(key) else data
+
+    def get_or_render(self, cv_data, template, render):
+        """
+        PDF (bajty) dla danych CV i szablonu. render() zwraca bajty PDF i jest
+        wywoływane tylko przy braku w cache.
+        """
+        key = render_cache_key(cv_data, template)
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        data = render()
+        self._count('renders')
+        self.put(key, data)
+        return data
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._approx_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            approx_bytes = self._approx_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'max_mb': round(self.max_bytes / (1024 * 1024), 1),
+            'approx_mb': round(approx_bytes / (1024 * 1024), 2) if approx_bytes is not None else None,
+            'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+        })
+        return stats
+
+
+pdf_render_cache = PDFRenderCache()
@@ -0,0 +1,165 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from utils.sandbox_pool import (SandboxPool, SandboxTimeout, SandboxCrashed, SandboxBusy, SandboxJobError,
+                                per_worker_size)
+
+logger = logging.getLogger(__name__)
+
+# Renderowanie w osobnych procesach, żeby reportlab (czysty Python) nie trzymał GIL
+# wątków obsługujących żądania. Pula startuje leniwie w każdym procesie gunicorna.
+PDF_RENDER_POOL_ENABLED = os.environ.get('PDF_RENDER_POOL_ENABLED', 'true').lower() == 'true'
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', str(per_worker_size(os.cpu_count() or 2))))
+PDF_RENDER_TIMEOUT = float(os.environ.get('PDF_RENDER_TIMEOUT', '20'))
+PDF_RENDER_MEMORY_MB = int(os.environ.get('PDF_RENDER_MEMORY_MB', '512'))
+PDF_RENDER_MAX_JOBS = int(os.environ.get('PDF_RENDER_MAX_JOBS', '500'))
+# Ile zadań może czekać na wolny proces, zanim kolejne dostaną 503
+PDF_RENDER_MAX_QUEUE = int(os.environ.get('PDF_RENDER_MAX_QUEUE', str(2 * PDF_RENDER_WORKERS)))
+PDF_RENDER_MAX_RETRY_AFTER = 30
+
+# Liczba ostatnich czasów renderowania, z których liczone są percentyle
+DURATION_WINDOW = 200
+
+
+class RenderError(Exception):
+    """Nie udało się wygenerować PDF"""
+
+
+class RenderTimeout(RenderError):
+    """Renderowanie przekroczyło PDF_RENDER_TIMEOUT"""
+
+
+class RenderOverloaded(RenderError):
+    """Kolejka renderowania jest pełna - klient powinien ponowić po retry_after sekundach"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"PDF render queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def render_cv_pdf(cv_data, template):
+    """Bajty PDF dla danych CV i szablonu - wykonywane w procesie potomnym"""
+    from utils.cv_templates import generate_cv_with_template
+
+    return generate_cv_with_template(cv_data, template).getvalue()
+
+
+class PDFRenderService:
+    """
+    Ograniczona pula procesów renderujących PDF z CV:
+    - liczba zadań w toku (wykonywane + oczekujące) jest ograniczona do size + max_queue,
+      nadmiarowe żądania od razu dostają RenderOverloaded (503 + Retry-After),
+    - każde zadanie ma twardy limit czasu (proces jest zabijany i zastępowany),
+    - czasy renderowania (z oczekiwaniem na wolny proces) są zbierane do /debug-stats.
+    Bez puli (PDF_RENDER_POOL_ENABLED=false) renderuje w wątku żądania z tym samym limitem kolejki.
+    """
+
+    def __init__(self, pool=None, size=PDF_RENDER_WORKERS, max_queue=PDF_RENDER_MAX_QUEUE,
+                 timeout=PDF_RENDER_TIMEOUT):
+        self.pool = pool
+        self.size = pool.size if pool else max(1, size)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.size + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._durations = deque(maxlen=DURATION_WINDOW)
+        self._stats = {'jobs': 0, 'rejected': 0, 'timeouts': 0, 'failures': 0, 'peak_in_flight': 0,
+                       'render_seconds_total': 0.0}
+
+    def _enter(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise RenderOverloaded(self.retry_after())
+        with self._lock:
+            self._in_flight += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def retry_after(self):
+        """Szacowany czas (s) do zwolnienia kolejki: mediana renderowania x zadania na proces"""
+        with self._lock:
+            durations = sorted(self._durations)
+            in_flight = self._in_flight
+        median = durations[len(durations) // 2] if durations else 1.0
+        return min(PDF_RENDER_MAX_RETRY_AFTER, max(1, math.ceil(median * in_flight / self.size)))
+
+    def render(self, cv_data, template):
+        """Bajty PDF; zgłasza RenderOverloaded, RenderTimeout albo RenderError"""
+        self._enter()
+        started = time.monotonic()
+        try:
+            if self.pool:
+                result = self.pool.run(render_cv_pdf, cv_data, template, timeout=self.timeout)
+            else:
+                result = render_cv_pdf(cv_data, template)
+        except SandboxTimeout as e:
+            self._record_failure('timeouts')
+            raise RenderTimeout(str(e)) from e
+        except SandboxBusy as e:
+            # Proces nie zwolnił się w czasie acquire_timeout - traktujemy jak przeciążenie
+            self._record_failure('rejected')
+            raise RenderOverloaded(self.retry_after()) from e
+        except (SandboxCrashed, SandboxJobError) as e:
+            self._record_failure('failures')
+            raise RenderError(str(e)) from e
+        except Exception as e:
+            self._record_failure('failures')
+            raise RenderError(f"{type(e).__name__}: {e}") from e
+        else:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._stats['jobs'] += 1
+                self._stats['render_seconds_total'] += elapsed
+                self._durations.append(elapsed)
+            return result
+        finally:
+            self._exit()
+
+    def _record_failure(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            durations = sorted(self._durations)
+            stats['in_flight'] = self._in_flight
+
+        def percentile(fraction):
+            if not durations:
+                return None
+            return round(durations[min(len(durations) - 1, int(len(durations) * fraction))] * 1000, 1)
+
+        stats.update({
+            'size': self.size,
+            'max_queue': self.max_queue,
+            'pooled': self.pool is not None,
+            'render_ms_p50': percentile(0.5),
+            'render_ms_p95': percentile(0.95),
+            'render_ms_avg': round(stats['render_seconds_total'] / stats['jobs'] * 1000, 1) if stats['jobs'] else None,
+        })
+        stats['render_seconds_total'] = round(stats['render_seconds_total'], 3)
+        if self.pool:
+            stats['pool'] = self.pool.stats()
+        return stats
+
+
+pdf_render_pool = SandboxPool(
+    'pdf-render',
+    size=PDF_RENDER_WORKERS,
+    cpu_seconds=max(1, math.ceil(PDF_RENDER_TIMEOUT)),
+    memory_mb=PDF_RENDER_MEMORY_MB,
+    timeout=PDF_RENDER_TIMEOUT,
+    max_jobs_per_worker=PDF_RENDER_MAX_JOBS,
+) if PDF_RENDER_POOL_ENABLED else None
+
+pdf_render_service = PDFRenderService(pool=pdf_render_pool)
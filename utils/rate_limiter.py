@@ -1,45 +1,303 @@
+import os
+import math
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify
-import time
-from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# 'sqlite' - counters in a local SQLite file (WAL) shared by all workers on this machine,
+# 'database' - counters in the app database (shared by all nodes), 'memory' - per worker only
+RATE_LIMIT_BACKENDS = ('sqlite', 'database', 'memory')
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite').lower()
+if RATE_LIMIT_BACKEND not in RATE_LIMIT_BACKENDS:
+    # A typo must not silently fall back to per-worker counters (limit x worker count)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND={RATE_LIMIT_BACKEND!r}, expected one of: "
+                     f"{', '.join(RATE_LIMIT_BACKENDS)}")
+RATE_LIMIT_SQLITE_PATH = os.environ.get(
+    'RATE_LIMIT_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'cv_optimizer_rate_limits.sqlite3'))
+# Max identifiers kept by the in-process store (least recently used are evicted first)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+# How often (seconds) each worker deletes expired windows from a shared store
+RATE_LIMIT_CLEANUP_INTERVAL = 300
+
+
+def _estimate(current, previous, elapsed, time_window):
+    # Sliding window counter: the previous window's count decays linearly over the current one
+    return previous * (time_window - elapsed) / time_window + current
+
+
+def _retry_after(current, previous, elapsed, time_window, max_requests):
+    # Seconds until one more request fits; current/previous exclude the rejected request
+    spare = max_requests - current - 1
+    if spare >= 0 and previous:
+        needed = time_window * (1 - spare / previous)
+        if needed < time_window:
+            return max(1, math.ceil(needed - elapsed))
+    # Next window: this window's count becomes the decaying one
+    next_window = 0 if current < max_requests else time_window * (1 - (max_requests - 1) / current)
+    return max(1, math.ceil(time_window - elapsed + next_window))
+
+
+class MemoryRateLimitStore:
+    # key -> [window_start, current, previous, expires_at] in least recently used order;
+    # idle keys are evicted once their windows expire, the key count is capped at max_keys
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def _rolled(entry, window_start, time_window):
+        if entry[0] == window_start:
+            return entry
+        previous = entry[1] if entry[0] == window_start - time_window else 0
+        return [window_start, 0, previous, window_start + 2 * time_window]
+
+    def add(self, key, window_start, time_window, amount=1):
+        """Adds amount to the current window; returns (current, previous)"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = [window_start, 0, 0, window_start + 2 * time_window]
+            entry = self._rolled(entry, window_start, time_window)
+            entry[1] += amount
+            self._data[key] = entry
+            self._data.move_to_end(key)
+
+            while self._data:
+                oldest_key, oldest = next(iter(self._data.items()))
+                if len(self._data) <= self.max_keys and oldest[3] > now:
+                    break
+                del self._data[oldest_key]
+                self.evictions += 1
+            return entry[1], entry[2]
+
+    def counts(self, key, window_start, time_window):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return 0, 0
+            entry = self._rolled(entry, window_start, time_window)
+            return entry[1], entry[2]
+
+    def stats(self):
+        with self._lock:
+            keys = len(self._data)
+        return {'backend': 'memory', 'keys': keys, 'max_keys': self.max_keys, 'evictions': self.evictions}
+
+
+class SqlRateLimitStore:
+    # One row per key and window (models.RateLimitCounter) updated with an atomic upsert,
+    # so all workers (and nodes, with the app database) share the same counts.
+    # engine_factory is called lazily in each process - connections must not cross gunicorn's fork.
+
+    def __init__(self, name, engine_factory, create_table=False):
+        self.name = name
+        self.engine_factory = engine_factory
+        self.create_table = create_table
+        self._engine = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._stats = {'writes': 0, 'expired_removed': 0}
+
+    @property
+    def table(self):
+        from models import RateLimitCounter
+
+        return RateLimitCounter.__table__
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None or self._pid != os.getpid():
+                engine = self.engine_factory()
+                if self.create_table:
+                    self._create_table(engine)
+                self._engine, self._pid = engine, os.getpid()
+            return self._engine
+
+    def _create_table(self, engine):
+        from sqlalchemy import inspect
+        from sqlalchemy.exc import OperationalError
+
+        try:
+            self.table.create(engine, checkfirst=True)
+        except OperationalError:
+            # Another worker created it at the same time
+            if not inspect(engine).has_table(self.table.name):
+                raise
+
+    def add(self, key, window_start, time_window, amount=1):
+        """Adds amount to the current window; returns (current, previous)"""
+        from sqlalchemy import select
+
+        engine = self.engine
+        if engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = self.table
+        upsert = (insert(table)
+                  .values(key=key, window_start=window_start, hits=amount,
+                          expires_at=window_start + 2 * time_window)
+                  .on_conflict_do_update(index_elements=[table.c.key, table.c.window_start],
+                                         set_={'hits': table.c.hits + amount})
+                  .returning(table.c.hits))
+        with engine.begin() as connection:
+            current = connection.execute(upsert).scalar()
+            previous = connection.execute(
+                select(table.c.hits).where(table.c.key == key,
+                                           table.c.window_start == window_start - time_window)).scalar()
+        with self._lock:
+            self._stats['writes'] += 1
+        self._cleanup_expired()
+        return current, previous or 0
+
+    def counts(self, key, window_start, time_window):
+        from sqlalchemy import select
+
+        table = self.table
+        with self.engine.connect() as connection:
+            rows = dict(connection.execute(
+                select(table.c.window_start, table.c.hits).where(
+                    table.c.key == key,
+                    table.c.window_start.in_((window_start, window_start - time_window)))).all())
+        return rows.get(window_start, 0), rows.get(window_start - time_window, 0)
+
+    def _cleanup_expired(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < RATE_LIMIT_CLEANUP_INTERVAL:
+                return
+            self._last_cleanup = now
+        table = self.table
+        try:
+            with self.engine.begin() as connection:
+                result = connection.execute(table.delete().where(table.c.expires_at < int(now)))
+            with self._lock:
+                self._stats['expired_removed'] += result.rowcount or 0
+        except Exception as e:
+            logger.warning(f"Rate limit cleanup failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = self.name
+        return stats
+
+
+def sqlite_engine(path=RATE_LIMIT_SQLITE_PATH):
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 5})
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        # WAL: readers do not block the single writer; writers wait up to the timeout
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    return engine
+
+
+def database_engine():
+    from models import db
+
+    return db.engine
+
+
+def create_store(backend=RATE_LIMIT_BACKEND):
+    if backend == 'database':
+        return SqlRateLimitStore('database', database_engine)
+    if backend == 'sqlite':
+        return SqlRateLimitStore('sqlite', sqlite_engine, create_table=True)
+    if backend == 'memory':
+        return MemoryRateLimitStore()
+    raise ValueError(f"Unknown rate limit backend: {backend!r}")
+
 
 class RateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(deque)
+    def __init__(self, store=None):
+        self.store = store or MemoryRateLimitStore()
+        # Used only while the shared store is unavailable
+        self.fallback_store = MemoryRateLimitStore()
         self.limits = {
             'cv_upload': (5, 300),  # 5 uploads per 5 minutes
             'cv_process': (10, 3600),  # 10 processes per hour
             'ai_analysis': (20, 3600),  # 20 AI calls per hour
+            'job_batch': (10, 3600),  # 10 batch URL analyses per hour
+            'cv_preview': (600, 3600),  # 600 live preview refreshes per hour (debounced in the browser)
             'general': (100, 3600)  # 100 general requests per hour
         }
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'store_errors': 0}
 
-    def is_allowed(self, identifier, limit_type='general'):
-        now = time.time()
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception as e:
+            # Shared store unavailable (locked file, database down) - limit per worker instead of failing
+            logger.warning(f"Rate limit store error, using in-process counters: {e}")
+            self._count('store_errors')
+            return getattr(self.fallback_store, method)(*args)
+
+    def _window(self, identifier, limit_type, now):
         max_requests, time_window = self.limits.get(limit_type, (100, 3600))
+        # Separate counters per limit type - previews must not use up upload limits
+        key = f'{identifier}:{limit_type}'
+        window_start = int(now // time_window * time_window)
+        return key, max_requests, time_window, window_start
 
-        # Clean old requests
-        user_requests = self.requests[identifier]
-        while user_requests and user_requests[0] < now - time_window:
-            user_requests.popleft()
+    def hit(self, identifier, limit_type='general'):
+        """Counts the request if it fits the limit; returns (allowed, retry_after in seconds)"""
+        now = time.time()
+        key, max_requests, time_window, window_start = self._window(identifier, limit_type, now)
+        current, previous = self._call('add', key, window_start, time_window, 1)
+        elapsed = now - window_start
+        if _estimate(current, previous, elapsed, time_window) <= max_requests:
+            self._count('allowed')
+            return True, 0
 
-        # Check if limit exceeded
-        if len(user_requests) >= max_requests:
-            return False
+        # Rejected requests do not count towards the limit
+        self._call('add', key, window_start, time_window, -1)
+        self._count('limited')
+        return False, _retry_after(current - 1, previous, elapsed, time_window, max_requests)
 
-        # Add current request
-        user_requests.append(now)
-        return True
+    def is_allowed(self, identifier, limit_type='general'):
+        return self.hit(identifier, limit_type)[0]
 
     def get_reset_time(self, identifier, limit_type='general'):
         now = time.time()
-        _, time_window = self.limits.get(limit_type, (100, 3600))
-        user_requests = self.requests[identifier]
+        key, max_requests, time_window, window_start = self._window(identifier, limit_type, now)
+        current, previous = self._call('counts', key, window_start, time_window)
+        elapsed = now - window_start
+        if _estimate(current + 1, previous, elapsed, time_window) <= max_requests:
+            return 0
+        return _retry_after(current, previous, elapsed, time_window, max_requests)
 
-        if user_requests:
-            return int(user_requests[0] + time_window - now)
-        return 0
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({'store': self.store.stats(), 'fallback_store': self.fallback_store.stats()})
+        return stats
 
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(create_store())
 
 def rate_limit(limit_type='general'):
     def decorator(f):
@@ -54,8 +312,8 @@ def rate_limit(limit_type='general'):
             except ImportError:
                 pass
 
-            if not rate_limiter.is_allowed(identifier, limit_type):
-                reset_time = rate_limiter.get_reset_time(identifier, limit_type)
+            allowed, reset_time = rate_limiter.hit(identifier, limit_type)
+            if not allowed:
                 return jsonify({
                     'success': False,
                     'message': f'Rate limit exceeded. Try again in {reset_time} seconds.',
@@ -64,4 +322,4 @@ def rate_limit(limit_type='general'):
 
             return f(*args, **kwargs)
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,253 @@
+import os
+import math
+import time
+import queue
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows - brak rlimitów, zostaje tylko limit czasu
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Co ile sekund rodzic sprawdza, czy proces potomny jeszcze żyje, czekając na wynik
+POLL_INTERVAL = 0.05
+# Liczba procesów gunicorna na maszynie (gunicorn czyta tę samą zmienną) - każdy ma własne pule
+WEB_CONCURRENCY = max(1, int(os.environ.get('WEB_CONCURRENCY', '2')))
+
+
+def per_worker_size(total):
+    """Rozmiar puli jednego procesu gunicorna, tak by wszystkie razem miały ~total procesów"""
+    return max(1, total // WEB_CONCURRENCY)
+
+
+class SandboxError(Exception):
+    """Zadanie w piaskownicy nie zakończyło się poprawnie"""
+
+
+class SandboxTimeout(SandboxError):
+    """Przekroczono limit czasu - proces potomny został zabity"""
+
+
+class SandboxCrashed(SandboxError):
+    """Proces potomny zginął (limit CPU, limit pamięci, błąd parsera w C)"""
+
+
+class SandboxBusy(SandboxError):
+    """Wszystkie procesy piaskownicy są zajęte - klient może ponowić po retry_after sekundach"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SandboxJobError(SandboxError):
+    """Funkcja zgłosiła wyjątek wewnątrz piaskownicy"""
+
+    def __init__(self, error_type, message):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+def _apply_limits(cpu_seconds, memory_bytes):
+    if resource is None:
+        return
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    if cpu_seconds:
+        # Limit CPU jest liczony dla całego życia procesu, więc przed każdym zadaniem
+        # przesuwamy go o cpu_seconds ponad dotychczasowe zużycie
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, parent_conn, cpu_seconds, memory_bytes):
+    """Pętla procesu potomnego: odbiera (funkcja, argumenty), odsyła wynik lub błąd"""
+    parent_conn.close()
+    # Sygnały obsługiwane przez gunicorna w procesie rodzica nie dotyczą piaskownicy
+    for signum in (signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT, signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+
+        func, args, kwargs = job
+        try:
+            _apply_limits(cpu_seconds, memory_bytes)
+            result = func(*args, **kwargs)
+            conn.send(('ok', result))
+        except MemoryError:
+            conn.send(('error', ('MemoryError', 'memory limit exceeded')))
+        except Exception as e:
+            conn.send(('error', (type(e).__name__, str(e))))
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds, memory_bytes):
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, self.conn, cpu_seconds, memory_bytes),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+
+class SandboxPool:
+    """
+    Pula wcześniej uruchomionych procesów potomnych do wykonywania ryzykownego kodu
+    (np. parsowania niezaufanych PDF-ów) z limitami CPU i pamięci (rlimit) oraz twardym
+    limitem czasu. Proces, który przekroczy limit lub zginie, jest zastępowany nowym,
+    a proces roboczy aplikacji dostaje tylko wyjątek SandboxError.
+
+    Pula startuje leniwie osobno w każdym procesie (gunicorn --preload forkuje po imporcie).
+    """
+
+    def __init__(self, name, size=2, cpu_seconds=10, memory_mb=512, timeout=15,
+                 max_jobs_per_worker=200, acquire_timeout=None):
+        self.name = name
+        self.size = max(1, size)
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024 if memory_mb else None
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.acquire_timeout = timeout if acquire_timeout is None else acquire_timeout
+        self._context = multiprocessing.get_context('fork')
+        self._lock = threading.Lock()
+        self._idle = None
+        self._pid = None
+        self._executor = None
+        self._stats = {'jobs': 0, 'errors': 0, 'timeouts': 0, 'crashes': 0, 'busy': 0, 'respawns': 0}
+
+    def _spawn(self):
+        return _Worker(self._context, self.cpu_seconds, self.memory_bytes)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._idle = queue.Queue()
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f'{self.name}-sandbox')
+            self._pid = os.getpid()
+            logger.info(f"Started {self.size} '{self.name}' sandbox workers in process {self._pid}")
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _replace(self, worker, reason):
+        worker.kill()
+        self._count('respawns')
+        logger.warning(f"Replacing '{self.name}' sandbox worker {worker.process.pid}: {reason}")
+        return self._spawn()
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        """Wykonuje func(*args, **kwargs) w procesie potomnym i zwraca wynik"""
+        self._ensure_started()
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            self._count('busy')
+            raise SandboxBusy(f"All '{self.name}' sandbox workers are busy",
+                              retry_after=max(1, math.ceil(self.acquire_timeout or 1)))
+
+        try:
+            if not worker.process.is_alive():
+                worker = self._replace(worker, 'found dead before job')
+
+            self._count('jobs')
+            worker.conn.send((func, args, kwargs))
+            deadline = time.monotonic() + timeout
+            while not worker.conn.poll(POLL_INTERVAL):
+                if not worker.process.is_alive():
+                    self._count('crashes')
+                    exitcode = worker.process.exitcode
+                    worker = self._replace(worker, f'exit code {exitcode}')
+                    raise SandboxCrashed(f"Sandbox worker died (exit code {exitcode})")
+                if time.monotonic() > deadline:
+                    self._count('timeouts')
+                    worker = self._replace(worker, f'timeout after {timeout}s')
+                    raise SandboxTimeout(f"Sandbox job exceeded {timeout}s")
+
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._count('crashes')
+                worker = self._replace(worker, f'broken pipe: {e}')
+                raise SandboxCrashed("Sandbox worker closed the connection")
+
+            worker.jobs += 1
+            if self.max_jobs_per_worker and worker.jobs >= self.max_jobs_per_worker:
+                # Okresowa wymiana ogranicza skutki wycieków pamięci w parserach
+                worker.stop()
+                worker = self._spawn()
+
+            if status == 'error':
+                self._count('errors')
+                raise SandboxJobError(*payload)
+            return payload
+        finally:
+            self._idle.put(worker)
+
+    def submit(self, func, *args, **kwargs):
+        """Asynchroniczna wersja run() - zwraca concurrent.futures.Future"""
+        self._ensure_started()
+        return self._executor.submit(self.run, func, *args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(size=self.size, started=self._pid == os.getpid(),
+                     idle=self._idle.qsize() if self._pid == os.getpid() else 0)
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            while True:
+                try:
+                    self._idle.get_nowait().stop()
+                except queue.Empty:
+                    break
+            self._pid = None
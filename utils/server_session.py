@@ -0,0 +1,405 @@
+import os
+import time
+import secrets
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask.sessions import (SessionInterface, SessionMixin, SecureCookieSession, SecureCookieSessionInterface,
+                            session_json_serializer)
+from itsdangerous import Signer, BadSignature
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
+from utils.cache import TTLCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# 'database' - dane sesji w tabeli server_sessions, w cookie tylko podpisany identyfikator;
+# 'cookie' - domyślna sesja Flask (cała zawartość w podpisanym cookie)
+SESSION_BACKENDS = ('database', 'cookie')
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'database').lower()
+if SESSION_BACKEND not in SESSION_BACKENDS:
+    # Literówka nie może po cichu zostawić aplikacji bez żadnego z obu mechanizmów sesji
+    raise ValueError(f"Nieznany SESSION_BACKEND={SESSION_BACKEND!r}, dozwolone: {', '.join(SESSION_BACKENDS)}")
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '2048'))
+# Termin wygaśnięcia w bazie jest przesuwany najwyżej raz na tyle sekund (nie przy każdym żądaniu)
+SESSION_TOUCH_INTERVAL = int(os.environ.get('SESSION_TOUCH_INTERVAL', '600'))
+# Co ile sekund proces usuwa wygasłe sesje z bazy
+SESSION_CLEANUP_INTERVAL = 3600
+# Sesja w cookie: przeglądarki odrzucają cookie większe niż ~4 KB
+SESSION_COOKIE_LIMIT = int(os.environ.get('SESSION_COOKIE_LIMIT', '4000'))
+
+
+class SizeTrackingMixin:
+    """
+    Zapamiętuje klucze zmienione w trakcie żądania (changed_keys), żeby rozmiar liczyć
+    tylko dla nich. Zmiany wewnątrz zagnieżdżonych słowników nie są widoczne - tak samo
+    jak dla flagi modified we Flask.
+    """
+
+    def __setitem__(self, key, value):
+        self.changed_keys.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.changed_keys.add(key)
+        super().__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.changed_keys.add(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.changed_keys.add(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        item = super().popitem()
+        self.changed_keys.add(item[0])
+        return item
+
+    def update(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+        self.changed_keys.update(values)
+        super().update(values)
+
+    def clear(self):
+        self.changed_keys.update(self.keys())
+        super().clear()
+
+
+class SessionSizeTelemetry:
+    """Rozmiar zapisywanych sesji i kluczy (tagged JSON, bajty) - liczony tylko dla zmienionych kluczy"""
+
+    def __init__(self, serializer=session_json_serializer):
+        self.serializer = serializer
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._stats = {'saves': 0, 'bytes_last': 0, 'bytes_max': 0, 'trims': 0}
+
+    def count_trim(self):
+        with self._lock:
+            self._stats['trims'] += 1
+
+    def record(self, session, size):
+        """size: rozmiar zapisanej sesji (wartość cookie albo dane w bazie)"""
+        key_sizes = {key: len(self.serializer.dumps(dict.__getitem__(session, key)))
+                     for key in session.changed_keys if key in session}
+        with self._lock:
+            self._stats['saves'] += 1
+            self._stats['bytes_last'] = size
+            self._stats['bytes_max'] = max(self._stats['bytes_max'], size)
+            for key, key_size in key_sizes.items():
+                entry = self._keys.setdefault(key, {'writes': 0, 'bytes_last': 0, 'bytes_max': 0})
+                entry['writes'] += 1
+                entry['bytes_last'] = key_size
+                entry['bytes_max'] = max(entry['bytes_max'], key_size)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            keys = sorted(self._keys.items(), key=lambda item: item[1]['bytes_max'], reverse=True)
+            stats['keys'] = {key: dict(entry) for key, entry in keys}
+        return stats
+
+
+class CookieSession(SizeTrackingMixin, SecureCookieSession):
+    """Sesja Flask w podpisanym cookie ze śledzeniem zmienionych kluczy"""
+
+    def __init__(self, initial=None):
+        self.changed_keys = set()
+        super().__init__(initial)
+
+
+class CompactCookieSessionInterface(SecureCookieSessionInterface):
+    """
+    Sesja w podpisanym cookie (SESSION_BACKEND=cookie) bez mierzenia rozmiaru przy każdym żądaniu.
+    - rozmiar jest sprawdzany tylko przy zapisie zmienionej sesji, na gotowej wartości cookie
+      (itsdangerous kompresuje dane zlib przed podpisaniem, gdy to je skraca),
+    - gdy cookie przekracza cookie_limit, kolejno wywoływane są trim_steps (funkcje
+      przyjmujące sesję), aż zmieści się w limicie,
+    - telemetria rozmiaru kluczy liczona tylko dla kluczy zmienionych w żądaniu.
+    """
+
+    session_class = CookieSession
+
+    def __init__(self, trim_steps=(), cookie_limit=SESSION_COOKIE_LIMIT):
+        self.trim_steps = tuple(trim_steps)
+        self.cookie_limit = cookie_limit
+        self.telemetry = SessionSizeTelemetry(self.serializer)
+
+    def save_session(self, app, session, response):
+        if session and session.modified:
+            signing_serializer = self.get_signing_serializer(app)
+            size = len(signing_serializer.dumps(dict(session)))
+            for step in self.trim_steps:
+                if size <= self.cookie_limit:
+                    break
+                logger.warning(f"Session cookie over limit ({size} bytes), trimming: {step.__name__}")
+                step(session)
+                self.telemetry.count_trim()
+                size = len(signing_serializer.dumps(dict(session)))
+            if size > self.cookie_limit:
+                logger.error(f"Session cookie still over limit after trimming: {size} bytes")
+            self.telemetry.record(session, size)
+        super().save_session(app, session, response)
+
+    def stats(self):
+        stats = {'backend': 'cookie', 'cookie_limit': self.cookie_limit}
+        stats.update(self.telemetry.stats())
+        return stats
+
+
+class ServerSession(SizeTrackingMixin, CallbackDict, SessionMixin):
+    """Sesja z danymi po stronie serwera; sid to identyfikator z cookie"""
+
+    server_side = True
+
+    def __init__(self, initial=None, sid=None, new=False, read_only=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        self.changed_keys = set()
+        super().__init__(initial, on_update)
+        self.sid = sid
+        # Użytkownik zalogowany przy otwarciu sesji - jego zmiana wymusza nowy identyfikator
+        self.initial_user_id = dict.get(self, '_user_id')
+        self.new = new
+        self.read_only = read_only
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    @property
+    def user_changed(self):
+        """Czy w trakcie żądania zalogowano lub wylogowano użytkownika (Flask-Login: _user_id)"""
+        return dict.get(self, '_user_id') != self.initial_user_id
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """
+    Sesje w tabeli server_sessions (SQLite/Postgres) z pamięcią podręczną w procesie.
+    - cookie zawiera tylko podpisany, losowy identyfikator; w bazie kluczem jest jego
+      skrót SHA-256, więc wyciek tabeli nie pozwala przejąć sesji,
+    - dane są serializowane jak w sesji cookie Flask (tagged JSON, bez pickle),
+    - wpis w pamięci procesu jest ważny, dopóki zgadza się numer wersji w bazie
+      (tani odczyt jednej kolumny zamiast całych danych; procesy gunicorna nie widzą
+      nawzajem swoich pamięci podręcznych),
+    - zapis tylko przy rzeczywistej zmianie danych, termin wygaśnięcia przesuwany co
+      SESSION_TOUCH_INTERVAL,
+    - przy zalogowaniu i wylogowaniu sesja dostaje nowy identyfikator, a stary wpis jest
+      usuwany (identyfikator podrzucony ofierze przed logowaniem nie daje dostępu),
+    - żądania plików statycznych nie czytają sesji z bazy.
+    """
+
+    session_class = ServerSession
+    serializer = session_json_serializer
+    salt = 'cv-server-session'
+
+    def __init__(self, db, cache_size=SESSION_CACHE_SIZE, touch_interval=SESSION_TOUCH_INTERVAL):
+        self.db = db
+        self.touch_interval = timedelta(seconds=touch_interval)
+        # klucz wiersza -> (wersja, dane zserializowane, expires_at)
+        self.cache = TTLCache(maxsize=cache_size, ttl=SESSION_CLEANUP_INTERVAL)
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._stats = {'loads': 0, 'cache_hits': 0, 'writes': 0, 'touches': 0, 'skipped_writes': 0,
+                       'deletes': 0, 'rotations': 0, 'expired_removed': 0}
+        self.telemetry = SessionSizeTelemetry(self.serializer)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    @property
+    def table(self):
+        from models import SessionRecord
+
+        return SessionRecord.__table__
+
+    @staticmethod
+    def _is_static(app, request):
+        # Sesja jest otwierana przed dopasowaniem trasy - request.endpoint jest jeszcze None
+        return app.has_static_folder and request.path.startswith(app.static_url_path + '/')
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt, key_derivation='hmac')
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+
+        sid = None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+        if self._is_static(app, request):
+            return self.session_class(sid=sid, read_only=True)
+        if sid is None:
+            return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+        data = self._load(content_hash(sid))
+        if data is None:
+            # Wygasła albo usunięta - nowa sesja z nowym identyfikatorem
+            return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+        return self.session_class(data, sid=sid)
+
+    def _load(self, key):
+        table = self.table
+        now = datetime.utcnow()
+        with self.db.engine.connect() as connection:
+            row = connection.execute(
+                self.db.select(table.c.version, table.c.expires_at).where(table.c.id == key)).first()
+            if row is None or row.expires_at < now:
+                return None
+
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] == row.version:
+                self._count('cache_hits')
+                payload = cached[1]
+            else:
+                payload = connection.execute(self.db.select(table.c.data).where(table.c.id == key)).scalar()
+                self.cache.set(key, (row.version, payload, row.expires_at))
+                self._count('loads')
+        try:
+            return self.serializer.loads(payload)
+        except ValueError:
+            logger.warning("Unreadable server session data, starting a new session")
+            return None
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.read_only:
+            return
+
+        key = content_hash(session.sid)
+        rotated = session.user_changed and not session.new
+        if rotated:
+            self._delete(key)
+            self._count('rotations')
+            session.sid = secrets.token_urlsafe(32)
+            session.new = True
+            key = content_hash(session.sid)
+
+        if not session:
+            # Pusta sesja: usuń wpis i cookie (jeśli istniały)
+            if rotated or not session.new:
+                if not rotated:
+                    self._delete(key)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        now = datetime.utcnow()
+        expires_at = now + self._lifetime(app)
+        cached = self.cache.get(key)
+        if session.modified or session.new:
+            payload = self.serializer.dumps(dict(session))
+            if cached is not None and cached[1] == payload and not session.new:
+                self._count('skipped_writes')
+                self._touch(key, cached, expires_at)
+            else:
+                self._write(key, payload, expires_at, cached)
+                self.telemetry.record(session, len(payload))
+        elif cached is not None:
+            self._touch(key, cached, expires_at)
+        self._cleanup_expired()
+
+        if session.new or session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+            response.vary.add('Cookie')
+
+    def _write(self, key, payload, expires_at, cached):
+        table = self.table
+        version = (cached[0] if cached else 0) + 1
+        values = {'data': payload, 'version': version, 'expires_at': expires_at, 'updated_at': datetime.utcnow()}
+        with self.db.engine.begin() as connection:
+            result = connection.execute(
+                table.update().where(table.c.id == key).values(version=table.c.version + 1, data=payload,
+                                                               expires_at=expires_at,
+                                                               updated_at=values['updated_at']))
+            if result.rowcount:
+                version = connection.execute(self.db.select(table.c.version).where(table.c.id == key)).scalar()
+            else:
+                try:
+                    connection.execute(table.insert().values(id=key, **values))
+                except IntegrityError:
+                    # Ten sam identyfikator zapisany równolegle przez inny proces - ostatni zapis wygrywa
+                    connection.execute(table.update().where(table.c.id == key).values(**values))
+        self.cache.set(key, (version, payload, expires_at))
+        self._count('writes')
+
+    def _touch(self, key, cached, expires_at):
+        """Przesuwa termin wygaśnięcia, jeśli od ostatniego przesunięcia minęło touch_interval"""
+        version, payload, stored_expires_at = cached
+        if expires_at - stored_expires_at < self.touch_interval:
+            return
+        table = self.table
+        with self.db.engine.begin() as connection:
+            connection.execute(table.update().where(table.c.id == key).values(expires_at=expires_at))
+        self.cache.set(key, (version, payload, expires_at))
+        self._count('touches')
+
+    def _delete(self, key):
+        table = self.table
+        with self.db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.id == key))
+        self.cache.set(key, None)
+        self._count('deletes')
+
+    def _cleanup_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_cleanup < SESSION_CLEANUP_INTERVAL:
+                return
+            self._last_cleanup = now
+        table = self.table
+        try:
+            with self.db.engine.begin() as connection:
+                result = connection.execute(table.delete().where(table.c.expires_at < datetime.utcnow()))
+            self._count('expired_removed', result.rowcount or 0)
+        except Exception as e:
+            logger.warning(f"Expired session cleanup failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({'backend': 'database', 'cache': self.cache.stats(), 'sizes': self.telemetry.stats()})
+        return stats
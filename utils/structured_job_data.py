@@ -0,0 +1,181 @@
+import re
+import json
+import html
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Minimalna długość opisu, przy której dane strukturalne zastępują heurystyki DOM i AI
+MIN_STRUCTURED_DESCRIPTION = 200
+
+# Skan regexami zamiast budowania pełnego drzewa DOM
+LD_JSON_RE = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL)
+META_TAG_RE = re.compile(r'<meta\b[^>]*>', re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r'([a-zA-Z_:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+HEAD_END_RE = re.compile(r'</head\s*>', re.IGNORECASE)
+
+BLOCK_TAG_RE = re.compile(r'<\s*(?:br|/p|/div|/h[1-6]|/ul|/ol|/tr)\b[^>]*>', re.IGNORECASE)
+LIST_ITEM_RE = re.compile(r'<\s*li\b[^>]*>', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+INLINE_SPACE_RE = re.compile(r'[ \t\r\f\v\xa0]+')
+
+# og:site_name to nazwa portalu, nie pracodawcy - nie używamy go jako firmy
+OPENGRAPH_FIELDS = ('og:title', 'og:description')
+
+# Pola JobPosting dołączane do opisu jako osobne sekcje
+JOB_POSTING_SECTIONS = (
+    ('responsibilities', 'Obowiązki'),
+    ('qualifications', 'Kwalifikacje'),
+    ('skills', 'Umiejętności'),
+    ('experienceRequirements', 'Doświadczenie'),
+    ('educationRequirements', 'Wykształcenie'),
+    ('jobBenefits', 'Benefity'),
+)
+
+
+def html_fragment_to_text(fragment):
+    """Zamienia fragment HTML (np. description z JSON-LD) na czysty tekst z zachowaniem akapitów"""
+    if not fragment:
+        return ''
+
+    text = html.unescape(str(fragment))
+    # Opisy w JSON-LD bywają podwójnie zakodowane (&lt;p&gt;)
+    if '<' in text:
+        text = LIST_ITEM_RE.sub('\n• ', text)
+        text = BLOCK_TAG_RE.sub('\n', text)
+        text = TAG_RE.sub('', text)
+        text = html.unescape(text)
+
+    lines = [INLINE_SPACE_RE.sub(' ', line).strip() for line in text.split('\n')]
+    return '\n'.join(line for line in lines if line and line != '•')
+
+
+def _has_type(node, type_name):
+    node_type = node.get('@type')
+    if isinstance(node_type, list):
+        return type_name in node_type
+    return node_type == type_name
+
+
+def find_job_posting(data):
+    """Szuka obiektu JobPosting w dowolnie zagnieżdżonym JSON-LD (listy, @graph)"""
+    if isinstance(data, list):
+        for item in data:
+            found = find_job_posting(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        if _has_type(data, 'JobPosting'):
+            return data
+        for key in ('@graph', 'mainEntity', 'itemListElement'):
+            if key in data:
+                found = find_job_posting(data[key])
+                if found:
+                    return found
+    return None
+
+
+def _as_text(value):
+    """Normalizuje wartość pola schema.org (tekst, lista, obiekt) do tekstu"""
+    if not value:
+        return ''
+    if isinstance(value, list):
+        return '\n'.join(filter(None, (_as_text(item) for item in value)))
+    if isinstance(value, dict):
+        return _as_text(value.get('name') or value.get('description') or value.get('credentialCategory'))
+    return html_fragment_to_text(value)
+
+
+def parse_job_posting(posting):
+    """Mapuje JobPosting ze schema.org na format {'job_title', 'job_description', 'company'}"""
+    organization = posting.get('hiringOrganization')
+    if isinstance(organization, dict):
+        company = organization.get('name', '')
+    else:
+        company = organization or ''
+
+    parts = [html_fragment_to_text(posting.get('description', ''))]
+    for field, label in JOB_POSTING_SECTIONS:
+        section_text = _as_text(posting.get(field))
+        # Niektóre portale powielają wymagania w description - nie dubluj
+        if section_text and section_text not in parts[0]:
+            parts.append(f"{label}:\n{section_text}")
+
+    return {
+        'job_title': html_fragment_to_text(posting.get('title', '')),
+        'job_description': '\n\n'.join(part for part in parts if part),
+        'company': html_fragment_to_text(company),
+    }
+
+
+def extract_opengraph(page_html):
+    """Wyciąga znaczniki OpenGraph z sekcji <head> bez parsowania całego dokumentu"""
+    head_end = HEAD_END_RE.search(page_html)
+    head = page_html[:head_end.start()] if head_end else page_html
+
+    values = {}
+    for tag in META_TAG_RE.findall(head):
+        attributes = {name.lower(): first or second for name, first, second in ATTRIBUTE_RE.findall(tag)}
+        key = (attributes.get('property') or attributes.get('name') or '').lower()
+        if key in OPENGRAPH_FIELDS and 'content' in attributes:
+            values[key] = html.unescape(attributes['content']).strip()
+    return values
+
+
+def extract_structured_job_data(page_html):
+    """
+    Szybka ścieżka: szuka JobPosting w JSON-LD, a następnie uzupełnia braki z OpenGraph.
+    Zwraca {'job_title', 'job_description', 'company', 'source'} lub None, gdy strona
+    nie zawiera żadnych danych strukturalnych.
+    """
+    if not page_html:
+        return None
+
+    job_info = None
+    for block in LD_JSON_RE.findall(page_html):
+        try:
+            data = json.loads(block.strip(), strict=False)
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.debug(f"Pomijam niepoprawny blok JSON-LD: {e}")
+            continue
+
+        posting = find_job_posting(data)
+        if posting:
+            job_info = parse_job_posting(posting)
+            job_info['source'] = 'json-ld'
+            break
+
+    opengraph = extract_opengraph(page_html)
+    if not job_info and not opengraph:
+        return None
+
+    if not job_info:
+        job_info = {'job_title': '', 'job_description': '', 'company': '', 'source': 'opengraph'}
+
+    if not job_info['job_title']:
+        job_info['job_title'] = opengraph.get('og:title', '')
+    if not job_info['job_description']:
+        job_info['job_description'] = opengraph.get('og:description', '')
+
+    return job_info
+
+
+def is_complete_job_data(job_info):
+    """Czy dane strukturalne wystarczą, by pominąć heurystyki DOM i wywołanie AI"""
+    return bool(
+        job_info
+        and job_info.get('job_title')
+        and len(job_info.get('job_description', '')) >= MIN_STRUCTURED_DESCRIPTION
+    )
+
+
+def fill_missing_fields(job_info, structured):
+    """Uzupełnia puste pola wyniku DOM danymi strukturalnymi"""
+    if not structured:
+        return job_info
+    for key in ('job_title', 'job_description', 'company'):
+        if not job_info.get(key) and structured.get(key):
+            job_info[key] = structured[key]
+    return job_info